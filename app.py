@@ -1,43 +1,126 @@
-from flask import Flask, render_template, jsonify, request, redirect, url_for
+from flask import (Flask, render_template, jsonify, request, redirect, url_for, Response, stream_with_context,
+                   before_render_template, template_rendered, send_file, send_from_directory)
+from flask.json.provider import DefaultJSONProvider
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
 import os
+import csv
+import functools
+import io
 import json
+import mimetypes
 import random
 from datetime import datetime, date, timedelta
 from dotenv import load_dotenv
-from flask_apscheduler import APScheduler
 import logging
 import socket
+import threading
+import tracemalloc
+try:
+    import fcntl  # Scheduler ownership lock (Linux / Raspberry Pi)
+except ImportError:  # pragma: no cover - Windows development machines
+    fcntl = None
 from utils.db_connection import DatabaseConnection
 from utils.db_explorer import DatabaseExplorer
+from utils.completion_tracker import CompletionTracker
+from utils.normalization import completion_key, keys_for
+from utils.file_writer import GroupCommitWriter, NO_CHANGE, file_stamp, lock_file_path
+from utils.report_digest import ReportDigestCache
+from utils.report_catalog import GENERATION_FILE, ReportCatalog
+from utils.report_archive import ReportArchive
+from utils.report_orders import DayOrdersCache, SORT_FIELDS
+from utils.report_store import count_day, day_file_path, load_day, read_day_file
+from utils.snapshot import LastGoodSnapshot, SnapshotPublisher
+from utils.fragment_cache import FragmentCache
+from utils.assets import AssetManifest
+from utils.idempotency import DuplicateWindow, IdempotencyCache
+from utils.report_summary import (DaySummaryCache, GROUP_FIELDS, add_orders, aggregate_range, copy_summary,
+                                  summarize_orders)
+from utils.completion_index import (CompletionIndex, append_tombstone, day_signature,
+                                    read_tombstones, remove_tombstones)
+from utils.json_stream import iter_json_array
+from utils import json_backend, logging_setup, memory, profiling
+from utils.profiling import ProfilingMiddleware
+from config import performance
 from utils.mock_data import get_mock_orders, get_mock_stats, mark_mock_order_completed
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('app.log')
-    ]
+# Configure logging: every logger goes through a queue to a rotating log file
+logging_setup.setup_logging(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), performance.LOG_FILE),
+    level=performance.LOG_LEVEL,
+    logger_levels=performance.LOG_LEVELS,
+    max_bytes=performance.LOG_FILE_MAX_BYTES,
+    backup_count=performance.LOG_FILE_BACKUP_COUNT,
+    queue_size=performance.LOG_QUEUE_SIZE,
+    console=performance.LOG_CONSOLE
 )
 logger = logging.getLogger('app')
 
-# Also configure database loggers
-db_logger = logging.getLogger('db_connection')
-db_logger.setLevel(logging.INFO)
-db_logger.addHandler(logging.StreamHandler())
-
-db_explorer_logger = logging.getLogger('db_explorer')
-db_explorer_logger.setLevel(logging.INFO)
-db_explorer_logger.addHandler(logging.StreamHandler())
+memory.configure_gc(performance.GC_THRESHOLD)
+if performance.TRACEMALLOC_FRAMES and not tracemalloc.is_tracing():
+    tracemalloc.start(performance.TRACEMALLOC_FRAMES)
 
 # Load environment variables
 load_dotenv()
 
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by utils.json_backend (orjson/ujson when installed)"""
+    
+    def dumps(self, obj, **kwargs):
+        return json_backend.dumps(obj, pretty=bool(kwargs.get('indent')), default=kwargs.get('default', self.default),
+                                  sort_keys=kwargs.get('sort_keys', self.sort_keys))
+    
+    def loads(self, s, **kwargs):
+        return json_backend.loads(s)
+
 app = Flask(__name__, 
             static_folder='static',
             template_folder='templates')
-scheduler = APScheduler()
+app.json = FastJSONProvider(app)
+
+# Compiled templates are kept on disk, so a recycled or restarted worker does not recompile them
+if performance.JINJA_BYTECODE_CACHE_DIR:
+    jinja_cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), performance.JINJA_BYTECODE_CACHE_DIR)
+    os.makedirs(jinja_cache_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(jinja_cache_dir)
+
+# Minified, fingerprinted builds of the static files (python build_assets.py)
+asset_manifest = AssetManifest(app.static_folder)
+
+@app.template_global()
+def asset_url(filename):
+    """url_for('static') pointing at the fingerprinted build of an asset when there is one"""
+    return url_for('static', filename=asset_manifest.resolve(filename))
+
+@app.route('/static/dist/<path:filename>')
+def built_asset(filename):
+    """Serve a built asset, precompressed when the client accepts gzip, cached for good by the browser"""
+    gzipped = None
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        gzipped = asset_manifest.gzipped_path(filename)
+    if gzipped:
+        response = send_file(gzipped, mimetype=mimetypes.guess_type(filename)[0],
+                             max_age=performance.ASSET_MAX_AGE)
+        response.content_encoding = 'gzip'
+    else:
+        response = send_from_directory(asset_manifest.dist_dir, filename, max_age=performance.ASSET_MAX_AGE)
+    # A built file never changes under its name: browsers need not even revalidate it
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    return response
+
+# APScheduler is imported and its jobs registered only when the scheduler is started
+# (see start_scheduler): resolving its triggers costs more than the rest of app startup
+scheduler = None
+SCHEDULED_JOBS = []
+
+def scheduled_task(trigger, id, **trigger_args):
+    """Register a function as a scheduler job (added when start_scheduler runs)"""
+    def register(func):
+        SCHEDULED_JOBS.append(dict(id=id, func=func, trigger=trigger, **trigger_args))
+        return func
+    return register
 
 # Database connection parameters
 DB_SERVER = os.getenv('DB_SERVER')
@@ -60,7 +143,7 @@ COMPLETION_TRACKING_TIME = int(os.getenv('COMPLETION_TRACKING_TIME', '48'))  # H
 
 # Add more robust tracking for completed orders
 COMPLETION_TRACKING = {
-    'client_products': set(),  # Set of "client_name:product_code" strings
+    'client_products': CompletionTracker(COMPLETION_TRACKING_TIME),  # "client_name:product_code" keys with completion times
     'last_cleanup': datetime.now(),
     'persisted_to_disk': False,
     'loaded_from_disk': False
@@ -69,6 +152,112 @@ COMPLETION_TRACKING = {
 # Path for tracking completed orders persistence
 COMPLETION_TRACKING_FILE = os.path.join(COMPLETED_ORDERS_DIR, 'completion_tracking.json')
 
+# Select the JSON backend (orjson/ujson when installed) used for files and API responses
+json_backend.select_backend(performance.JSON_BACKEND)
+
+# Crash-safe writer shared by every report and tracking file update
+file_writer = GroupCommitWriter(
+    batch_window=performance.WRITE_BATCH_WINDOW_MS / 1000,
+    fsync=performance.WRITE_FSYNC,
+    encoder=lambda data: json_backend.dumps(data, pretty=performance.JSON_PRETTY_FILES)
+)
+
+# Id and completion-key index of live completed orders per day
+completion_index = CompletionIndex()
+
+# Completion keys extracted from each report file, reused while the file is unchanged
+report_digests = ReportDigestCache(
+    os.path.join(COMPLETED_ORDERS_DIR, 'report_digests.json'),
+    executor=performance.REPORT_DIGEST_EXECUTOR,
+    max_workers=performance.REPORT_DIGEST_WORKERS
+)
+
+# Closed months rolled into compressed bundles (data/archive/), read transparently
+report_archive = ReportArchive(
+    os.path.join(COMPLETED_ORDERS_DIR, 'archive'),
+    compression_level=performance.ARCHIVE_COMPRESSION_LEVEL
+)
+
+# Snapshot of the pending orders cache, served by async_server.py to long-lived kiosk connections
+snapshot_publisher = SnapshotPublisher(os.path.join(COMPLETED_ORDERS_DIR, 'snapshot.json'))
+
+# Rendered order table and page shells, keyed by the snapshot version they were rendered from
+page_fragments = FragmentCache(max_entries=performance.FRAGMENT_CACHE_ENTRIES)
+
+# Parsed day files and their filtered/sorted views, used to page through /api/reports/orders
+day_orders = DayOrdersCache(
+    path_for=lambda date_key: get_completion_file_path(date_key),
+    load_orders=lambda date_key: load_completed_orders(date_key),
+    max_days=performance.REPORT_ORDERS_CACHE_DAYS
+)
+
+# Report dates with per-day order counts; rescanned only when a report date is added
+report_catalog = ReportCatalog(
+    COMPLETED_ORDERS_DIR,
+    path_for=lambda date_key: get_completion_file_path(date_key),
+    count_for=lambda date_key: count_day(COMPLETED_ORDERS_DIR, date_key, report_archive),
+    cache_path=os.path.join(COMPLETED_ORDERS_DIR, 'report_catalog.json'),
+    archive=report_archive,
+    generation_path=os.path.join(COMPLETED_ORDERS_DIR, GENERATION_FILE)
+)
+
+# Per-day employee/product/client/hour counts, kept current by the write path in summary
+# sidecar files (data/summaries/) and read by the completed page and range reports
+day_summaries = DaySummaryCache(
+    path_for=lambda date_key: get_completion_file_path(date_key),
+    load_orders=lambda date_key: load_completed_orders(date_key),
+    max_days=performance.REPORT_SUMMARY_CACHE_DAYS,
+    sidecar_dir=os.path.join(COMPLETED_ORDERS_DIR, 'summaries')
+)
+
+# Running summary of the day list being built by the current group commit: date -> (orders, summary).
+# Every mutation of a batch sees the same pre-batch day signature, so each one builds on the
+# previous mutation's summary, and only the batch's last callback stores it.
+batch_summaries = {}
+
+def batch_summary(date_key, completed_orders, signature):
+    """Summary of completed_orders as handed to a mutation, or None if it must be rebuilt"""
+    chained = batch_summaries.get(date_key)
+    if chained is not None and chained[0] is completed_orders:
+        return chained[1]
+    return day_summaries.updated(date_key, signature)
+
+def finish_batch_summary(date_key, summary):
+    """True if summary is the last one built for the day, which then leaves the batch state"""
+    chained = batch_summaries.get(date_key)
+    if chained is None or chained[1] is not summary:
+        return False
+    del batch_summaries[date_key]
+    return True
+
+# Per-route latency histograms; slow (and sampled) requests are captured to data/profiles/
+request_profiler = None
+if performance.PROFILING_ENABLED:
+    request_profiler = ProfilingMiddleware(
+        app.wsgi_app,
+        os.path.join(COMPLETED_ORDERS_DIR, 'profiles'),
+        slow_threshold=performance.SLOW_REQUEST_THRESHOLD,
+        sample_rate=performance.PROFILE_SAMPLE_RATE,
+        stack_interval=performance.PROFILE_STACK_INTERVAL,
+        max_files=performance.PROFILE_MAX_FILES,
+        buckets_ms=performance.LATENCY_BUCKETS_MS
+    )
+    app.wsgi_app = request_profiler
+
+@app.before_request
+def tag_profiled_route():
+    """Group request timings by route rule rather than by path"""
+    profiling.set_route(request.url_rule.rule if request.url_rule else None)
+
+def start_render_timing(sender, **extra):
+    profiling.start_phase('render')
+
+def stop_render_timing(sender, **extra):
+    profiling.stop_phase('render')
+
+before_render_template.connect(start_render_timing, app)
+template_rendered.connect(stop_render_timing, app)
+
 # Cache for data
 data_cache = {
     'pending_orders': [],
@@ -78,6 +267,7 @@ data_cache = {
         'product_counts': []    # Changed from separator_counts
     },
     'is_cache': False,  # Flag to indicate if data is from cache
+    'published': ([], None),  # (pending orders, snapshot version) of the last publish, set together
     'connection_status': {
         'last_check': None,
         'status': 'unknown',  # 'connected', 'disconnected', 'unknown'
@@ -86,6 +276,28 @@ data_cache = {
     }
 }
 
+# Last pending orders read from the ERP: loaded at startup as cached data and served
+# instead of mock data while the ERP is unreachable
+last_good_snapshot = LastGoodSnapshot(os.path.join(COMPLETED_ORDERS_DIR, 'last_good_snapshot.json'))
+
+def load_warm_start():
+    """Fill the cache from the last good ERP snapshot, so the first request has real data"""
+    snapshot = last_good_snapshot.load()
+    if snapshot is None:
+        return False
+    data_cache['pending_orders'] = snapshot['orders']
+    data_cache['stats'] = snapshot['stats']
+    data_cache['last_update'] = snapshot['last_update']
+    data_cache['is_cache'] = True
+    version = snapshot_publisher.publish(snapshot['orders'], snapshot['stats'], snapshot['last_update'], True,
+                                         data_cache['connection_status']['status'])
+    data_cache['published'] = (snapshot['orders'], version)
+    logger.info("Loaded %s pending products from the last ERP snapshot (%s)",
+                len(snapshot['orders']), snapshot['last_update'])
+    return True
+
+load_warm_start()
+
 # Create database connection helper
 db = DatabaseConnection(
     server=DB_SERVER,
@@ -101,15 +313,78 @@ db = DatabaseConnection(
 # Create database explorer helper
 db_explorer = DatabaseExplorer(db)
 
-# Test database connection at startup and log the status
-logger.info("Testing database connection...")
-connection_success, connection_message, diagnostics = db.test_connection()
-if connection_success:
-    logger.info(f"✓ Successfully connected to SQL Server: {DB_SERVER}/{DB_DATABASE}")
-else:
-    logger.error(f"✗ Failed to connect to SQL Server: {connection_message}")
-    if OFFLINE_MODE:
-        logger.info("Running in OFFLINE mode - using mock data")
+# Startup work that waits on the ERP or reads many files runs in the background once the
+# app is serving, so importing the app (and booting a worker) never blocks on it
+warmup_thread = None
+warmup_lock = threading.Lock()
+tracking_loaded = threading.Event()
+
+def warm_up():
+    """Load completion tracking, test the database connection and fill the pending orders cache"""
+    try:
+        load_completion_tracking()
+    except Exception as e:
+        logger.error("Error loading completion tracking: %s", e)
+        # Continue anyway, this is not critical
+    finally:
+        tracking_loaded.set()
+    
+    logger.info("Testing database connection...")
+    # Holding the fetch lock lets requests serve the warm-start cache instead of waiting on the ERP
+    with fetch_lock:
+        connection_success, connection_message, diagnostics = db.test_connection()
+    data_cache['connection_status']['diagnostics'] = diagnostics
+    data_cache['connection_status']['last_check'] = datetime.now().strftime('%d/%m/%Y, %H:%M:%S')
+    if connection_success:
+        data_cache['connection_status']['status'] = 'connected'
+        logger.info("✓ Successfully connected to SQL Server: %s/%s", DB_SERVER, DB_DATABASE)
+    else:
+        data_cache['connection_status']['status'] = 'disconnected'
+        logger.error("✗ Failed to connect to SQL Server: %s", connection_message)
+        if OFFLINE_MODE:
+            logger.info("Running in OFFLINE mode - using mock data")
+    
+    try:
+        with app.app_context():
+            get_pending_orders()
+        logger.info("Startup warm-up finished")
+    except Exception as e:
+        logger.exception("Error warming up the pending orders cache: %s", e)
+
+def start_warmup():
+    """Run warm_up in a background thread, once per process"""
+    global warmup_thread
+    with warmup_lock:
+        if warmup_thread is None:
+            warmup_thread = threading.Thread(target=warm_up, name='warmup', daemon=True)
+            warmup_thread.start()
+    return warmup_thread
+
+def warm_templates():
+    """Compile every template up front (in the gunicorn master, so forked workers share them)"""
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+def reset_after_fork():
+    """Drop process-bound state inherited from the gunicorn master in a new worker"""
+    global warmup_thread
+    logging_setup.restart_after_fork()
+    db.reset_after_fork()
+    # Threads do not survive fork: each worker runs its own warm-up
+    warmup_thread = None
+    tracking_loaded.clear()
+
+def warm_worker():
+    """Ready a forked worker before it accepts traffic: fresh warm-start data and templates"""
+    load_warm_start()  # Other workers may have saved a newer snapshot since the master loaded it
+    warm_templates()
+    start_warmup()
+
+@app.before_request
+def ensure_warmup():
+    """Start the warm-up on the first request if the server did not start it"""
+    if warmup_thread is None:
+        start_warmup()
 
 @app.template_filter('format_datetime')
 def format_datetime(value, format='%H:%M:%S'):
@@ -128,36 +403,15 @@ def format_datetime(value, format='%H:%M:%S'):
         return value
 
 def get_completion_key(client_name, product_code):
-    """Generate a unique key for tracking completed orders - more robust implementation with type checking"""
-    if not client_name or product_code is None:  # Changed condition to handle 0 as valid product_code
-        logger.warning(f"Invalid completion key generation attempt: client='{client_name}', product='{product_code}'")
+    """Generate a unique key for tracking completed orders (see utils.normalization)"""
+    try:
+        key = completion_key(client_name, product_code)
+    except Exception as e:
+        logger.error("Failed to generate completion key: %s", e)
         return None
-        
-    # Ensure product_code is a string
-    if not isinstance(product_code, str):
-        try:
-            product_code = str(product_code)
-            logger.debug(f"Converted product_code from {type(product_code)} to string: '{product_code}'")
-        except Exception as e:
-            logger.error(f"Failed to convert product_code to string: {e}")
-            return None
-    
-    # Ensure client_name is a string
-    if not isinstance(client_name, str):
-        try:
-            client_name = str(client_name)
-            logger.debug(f"Converted client_name from {type(client_name)} to string: '{client_name}'")
-        except Exception as e:
-            logger.error(f"Failed to convert client_name to string: {e}")
-            return None
-        
-    # Create a normalized version of the client name (lowercase, no spaces, alphanumeric only)
-    normalized_client = ''.join(c.lower() for c in client_name if c.isalnum())
-    # Create a normalized version of the product code (lowercase, no spaces)
-    normalized_product = ''.join(c.lower() for c in product_code if c not in ' -_')
     
-    key = f"{normalized_client}:{normalized_product}"
-    logger.debug(f"Generated completion key: {key} from client='{client_name}', product='{product_code}'")
+    if key is None:  # product_code 0 is valid, only None/empty values are rejected
+        logger.warning("Invalid completion key generation attempt: client='%s', product='%s'", client_name, product_code)
     return key
 
 def was_order_completed(client_name, product_code):
@@ -168,21 +422,28 @@ def was_order_completed(client_name, product_code):
         
     is_completed = key in COMPLETION_TRACKING['client_products']
     if is_completed:
-        logger.debug(f"Order found in completion tracking: {client_name} - {product_code}")
+        logger.debug("Order found in completion tracking: %s - %s", client_name, product_code)
     return is_completed
 
 def mark_order_completed(client_name, product_code):
     """Mark an order as completed in the tracking system with immediate persistence"""
-    key = get_completion_key(client_name, product_code)
-    if not key:
-        logger.error(f"Failed to mark order as completed: Invalid key for {client_name} - {product_code}")
-        return False
-        
-    COMPLETION_TRACKING['client_products'].add(key)
-    logger.info(f"Marked order as completed: {client_name} - {product_code}")
+    return mark_orders_completed([(client_name, product_code)]) == 1
+
+def mark_orders_completed(pairs):
+    """Mark several (client_name, product_code) pairs as completed, persisting tracking once"""
+    marked_count = 0
+    for client_name, product_code in pairs:
+        key = get_completion_key(client_name, product_code)
+        if not key:
+            logger.error("Failed to mark order as completed: Invalid key for %s - %s", client_name, product_code)
+            continue
+            
+        COMPLETION_TRACKING['client_products'].add(key)
+        logger.info("Marked order as completed: %s - %s", client_name, product_code)
+        marked_count += 1
     
-    # Save tracking to disk immediately for persistence
-    save_completion_tracking()
+    if not marked_count:
+        return 0
     
     # Perform cleanup of old completions if needed
     current_time = datetime.now()
@@ -191,27 +452,40 @@ def mark_order_completed(client_name, product_code):
     # Only clean up once every 6 hours
     if hours_since_cleanup >= 6:
         cleanup_old_completions()
-        COMPLETION_TRACKING['last_cleanup'] = current_time
     
-    return True
+    # Save tracking to disk immediately for persistence
+    save_completion_tracking()
+    
+    return marked_count
+
+def cleanup_old_completions():
+    """Expire completions older than COMPLETION_TRACKING_TIME hours from tracking"""
+    removed = COMPLETION_TRACKING['client_products'].expire()
+    COMPLETION_TRACKING['last_cleanup'] = datetime.now()
+    
+    if removed:
+        logger.info("Cleanup removed %s completions older than %s hours", removed, COMPLETION_TRACKING_TIME)
+    return removed
 
 def save_completion_tracking():
     """Save current completion tracking to disk for persistence"""
     try:
         tracking_data = {
-            'client_products': list(COMPLETION_TRACKING['client_products']),
+            'client_products': COMPLETION_TRACKING['client_products'].to_dict(),
             'last_cleanup': COMPLETION_TRACKING['last_cleanup'].isoformat(),
             'last_updated': datetime.now().isoformat()
         }
         
-        with open(COMPLETION_TRACKING_FILE, 'w', encoding='utf-8') as f:
-            json.dump(tracking_data, f, ensure_ascii=False, indent=2)
+        ticket = file_writer.replace(COMPLETION_TRACKING_FILE, tracking_data)
+        if not ticket.wait(performance.WRITE_ACK_TIMEOUT):
+            logger.error("Error saving completion tracking to disk: %s", ticket.error)
+            return False
             
         COMPLETION_TRACKING['persisted_to_disk'] = True
-        logger.info(f"Saved {len(COMPLETION_TRACKING['client_products'])} completion tracking entries to disk")
+        logger.info("Saved %s completion tracking entries to disk", len(COMPLETION_TRACKING['client_products']))
         return True
     except Exception as e:
-        logger.exception(f"Error saving completion tracking to disk: {e}")
+        logger.exception("Error saving completion tracking to disk: %s", e)
         return False
 
 def load_completion_tracking():
@@ -221,22 +495,23 @@ def load_completion_tracking():
     # First try to load from tracking file for performance
     if os.path.exists(COMPLETION_TRACKING_FILE):
         try:
-            with open(COMPLETION_TRACKING_FILE, 'r', encoding='utf-8') as f:
-                tracking_data = json.load(f)
+            with open(COMPLETION_TRACKING_FILE, 'rb') as f:
+                tracking_data = json_backend.loads(f.read())
                 
-            # Ensure client_products is always converted to a set, even if it's stored as a list in the JSON
-            COMPLETION_TRACKING['client_products'] = set(tracking_data.get('client_products', []))
+            # Entries outside the tracking window are dropped while loading; legacy key lists are also accepted
+            COMPLETION_TRACKING['client_products'].clear()
+            COMPLETION_TRACKING['client_products'].load(tracking_data.get('client_products', {}))
             COMPLETION_TRACKING['last_cleanup'] = datetime.fromisoformat(tracking_data.get('last_cleanup'))
             COMPLETION_TRACKING['loaded_from_disk'] = True
             
-            logger.info(f"Loaded {len(COMPLETION_TRACKING['client_products'])} completion entries from tracking file")
+            logger.info("Loaded %s completion entries from tracking file", len(COMPLETION_TRACKING['client_products']))
             
             # Still rebuild from reports for safety, but only from today and yesterday
             rebuild_tracking_from_recent_reports()
             
             return True
         except Exception as e:
-            logger.error(f"Error loading completion tracking from file: {e}")
+            logger.error("Error loading completion tracking from file: %s", e)
             # Continue to rebuild from reports
     
     # Rebuild tracking from the saved JSON files if tracking file failed or doesn't exist
@@ -246,25 +521,20 @@ def load_completion_tracking():
 def rebuild_tracking_from_all_reports():
     """Rebuild the entire completion tracking from all report files"""
     # Recalculate tracking from the saved JSON files
-    COMPLETION_TRACKING['client_products'] = set()
+    COMPLETION_TRACKING['client_products'].clear()
     
     # Define the date range to track
     end_date = date.today()
-    start_date = end_date - timedelta(days=30)  # Track up to 30 days back
+    start_date = end_date - timedelta(days=performance.TRACKING_REBUILD_DAYS)
     
-    # Iterate through days in the range
-    current_date = start_date
-    while current_date <= end_date:
-        # Load completions for this day
-        load_day_completions_into_tracking(current_date)
-        
-        # Move to next day
-        current_date += timedelta(days=1)
+    # Load completions for every day in the range; unchanged days come from the digest cache
+    report_dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    load_completions_into_tracking(report_dates)
     
     # Update last cleanup timestamp
     COMPLETION_TRACKING['last_cleanup'] = datetime.now()
     
-    logger.info(f"Rebuilt tracking with {len(COMPLETION_TRACKING['client_products'])} completed orders")
+    logger.info("Rebuilt tracking with %s completed orders", len(COMPLETION_TRACKING['client_products']))
     
     # Save the rebuilt tracking for future use
     save_completion_tracking()
@@ -275,29 +545,37 @@ def rebuild_tracking_from_recent_reports():
     yesterday = today - timedelta(days=1)
     
     # Load completions for yesterday and today to catch any recent missing ones
-    load_day_completions_into_tracking(yesterday)
-    load_day_completions_into_tracking(today)
+    load_completions_into_tracking([yesterday, today])
     
     # Save any new entries found
     save_completion_tracking()
 
 def load_day_completions_into_tracking(report_date):
     """Load completions for a specific day into tracking"""
-    orders = load_completed_orders(report_date)
+    load_completions_into_tracking([report_date])
+
+def load_completions_into_tracking(report_dates):
+    """Load completions for several days into tracking using the report digest cache"""
+    files = []
+    for report_date in report_dates:
+        # Orders without a timestamp are treated as completed at the start of the report day
+        default_time = datetime.combine(report_date, datetime.min.time()).timestamp()
+        files.append((get_completion_file_path(report_date), default_time))
+    
+    digests = report_digests.get_many(files)
+    report_digests.save()
     
-    # Add each completion to tracking
+    # Add each completion to tracking, keyed by the time it was completed
+    tracked_completions = COMPLETION_TRACKING['client_products']
     added_count = 0
-    for order in orders:
-        client_name = order.get('client_name')
-        product_code = order.get('product_code')
-        if client_name and product_code:
-            key = get_completion_key(client_name, product_code)
-            if key and key not in COMPLETION_TRACKING['client_products']:
-                COMPLETION_TRACKING['client_products'].add(key)
+    for entries in digests.values():
+        for key, completed_at in entries:
+            is_new = key not in tracked_completions
+            if tracked_completions.add(key, completed_at) and is_new:
                 added_count += 1
     
     if added_count > 0:
-        logger.debug(f"Added {added_count} completions from {report_date} to tracking")
+        logger.debug("Added %s completions from %s report files to tracking", added_count, len(digests))
 
 def generate_order_id(order_data):
     """Generate a unique ID for a completed order"""
@@ -321,7 +599,7 @@ def get_completion_file_path(report_date=None):
             report_date = date.today()
     
     date_str = report_date.strftime('%Y-%m-%d')
-    file_path = os.path.join(COMPLETED_ORDERS_DIR, f'completed_{date_str}.json')
+    file_path = day_file_path(COMPLETED_ORDERS_DIR, date_str)
     
     # Ensure the directory exists
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
@@ -329,114 +607,335 @@ def get_completion_file_path(report_date=None):
     return file_path
 
 def load_completed_orders(report_date=None):
-    """Load completed orders for a specific date"""
+    """Load completed orders for a specific date, leaving out deleted (tombstoned) orders.
+    
+    Days rolled into the monthly archive are read from their bundle.
+    """
     file_path = get_completion_file_path(report_date)
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                if content:  # Check if file is not empty
-                    return json.loads(content)
-                return []  # Return empty list if file is empty
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error when loading completed orders: {e}")
-        except Exception as e:
-            logger.error(f"Error loading completed orders: {e}")
+    try:
+        return load_day(COMPLETED_ORDERS_DIR, report_date_key(file_path), report_archive)
+    except ValueError as e:
+        logger.error("JSON decode error when loading completed orders: %s", e)
+    except Exception as e:
+        logger.error("Error loading completed orders: %s", e)
     return []
 
+def report_date_key(file_path):
+    """Return the YYYY-MM-DD date of a completion file path"""
+    return os.path.basename(file_path)[len('completed_'):-len('.json')]
+
+def prepare_completed_order(order_data):
+    """Sanitize a completed order and add its timestamp, processing date and id"""
+    # Sanitize order data to ensure all values are JSON serializable
+    sanitized_data = {}
+    for key, value in order_data.items():
+        if value is None:
+            sanitized_data[key] = 'N/A'
+        elif isinstance(value, (str, int, float, bool)):
+            sanitized_data[key] = value
+        else:
+            try:
+                sanitized_data[key] = str(value)
+            except Exception as e:
+                logger.error("Error converting %s=%s to string: %s", key, value, e)
+                sanitized_data[key] = 'N/A'
+    
+    # Add timestamp and processing metadata
+    sanitized_data['timestamp'] = datetime.now().isoformat()
+    sanitized_data['processing_date'] = date.today().isoformat()
+    sanitized_data['id'] = generate_order_id(sanitized_data)
+    
+    # Ensure all critical fields are strings
+    for field in ['product_code', 'product_name', 'client_name', 'completed_by', 'separador']:
+        if field in sanitized_data:
+            if sanitized_data[field] is None:
+                sanitized_data[field] = 'N/A'  # Replace None with N/A
+            elif not isinstance(sanitized_data[field], str):
+                sanitized_data[field] = str(sanitized_data[field])  # Convert to string
+    
+    return sanitized_data
+
 def save_completed_order(order_data):
     """Save a completed order to the JSON file with improved type checking and error handling"""
-    file_path = get_completion_file_path()
+    success, error, _ = save_completed_orders([order_data])
+    return success, error
+
+def save_completed_orders(orders_data):
+    """Save several completed orders with one write to the day file and one tracking update.
+    
+    Returns (success, error, saved_records).
+    """
+    report_date = date.today()
+    date_key = report_date.isoformat()
+    file_path = get_completion_file_path(report_date)
     
     try:
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        records = [prepare_completed_order(order_data) for order_data in orders_data]
+        if not records:
+            return True, None, []
         
-        # Load existing data
-        completed_orders = []
-        if os.path.exists(file_path):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    if content:  # Check if file is not empty
-                        completed_orders = json.loads(content)
-                    # If file is empty, use an empty list (already initialized)
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON decode error when reading completion file: {e}")
-                # Use an empty list if the file is corrupted
-                completed_orders = []
-            except Exception as e:
-                logger.exception(f"Error reading completion file: {e}")
-                completed_orders = []
+        # Append to the day file; concurrent completions share a single disk commit.
+        # The file is rewritten anyway, so pending deletes (tombstones) are folded in here.
+        compacted = {}
         
-        # Sanitize order data to ensure all values are JSON serializable
-        sanitized_data = {}
-        for key, value in order_data.items():
-            if value is None:
-                sanitized_data[key] = 'N/A'
-            elif isinstance(value, (str, int, float, bool)):
-                sanitized_data[key] = value
+        def append_orders(completed_orders):
+            previous_signature = day_signature(file_path)
+            index_is_current = completion_index.is_current(date_key, previous_signature)
+            summary = batch_summary(date_key, completed_orders, previous_signature)
+            tombstones = compacted['tombstones'] = read_tombstones(file_path)
+            if tombstones:
+                completed_orders = [order for order in completed_orders if order.get('id') not in tombstones]
+            
+            start = len(completed_orders)
+            completed_orders.extend(records)
+            compacted['orders'] = len(completed_orders)
+            if summary is None:
+                summary = summarize_orders(completed_orders)
             else:
-                try:
-                    sanitized_data[key] = str(value)
-                except Exception as e:
-                    logger.error(f"Error converting {key}={value} to string: {e}")
-                    sanitized_data[key] = 'N/A'
-        
-        # Add timestamp and processing metadata
-        sanitized_data['timestamp'] = datetime.now().isoformat()
-        sanitized_data['processing_date'] = date.today().isoformat()
-        sanitized_data['id'] = generate_order_id(sanitized_data)
-        
-        # Ensure all critical fields are strings
-        for field in ['product_code', 'product_name', 'client_name', 'completed_by', 'separador']:
-            if field in sanitized_data:
-                if sanitized_data[field] is None:
-                    sanitized_data[field] = 'N/A'  # Replace None with N/A
-                elif not isinstance(sanitized_data[field], str):
-                    sanitized_data[field] = str(sanitized_data[field])  # Convert to string
-        
-        # Add to the list
-        completed_orders.append(sanitized_data)
-        
-        # Write to file with explicit error handling
-        try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(completed_orders, f, ensure_ascii=False, indent=2, default=str)
-        except Exception as write_error:
-            logger.exception(f"Error writing to completion file: {write_error}")
-            return False, f"Error writing to file: {str(write_error)}"
+                summary = add_orders(copy_summary(summary), records)
+            compacted['summary'] = summary
+            batch_summaries[date_key] = (completed_orders, summary)
             
-        # Mark as completed in tracking
-        client_name = sanitized_data.get('client_name')
-        product_code = sanitized_data.get('product_code')
+            if index_is_current and not tombstones:
+                completion_index.append(date_key, completed_orders, start)
+            else:
+                completion_index.index_day(date_key, completed_orders)
+            return completed_orders
         
-        # Extra safety checks
-        if product_code is None:
-            logger.warning("product_code is None in completed order data")
-            product_code = "unknown"
+        def after_commit(stamp):
+            with file_writer.locked(file_path):
+                # Only the batch's last write holds the day's full summary
+                if not finish_batch_summary(date_key, compacted['summary']):
+                    return
+                # A later commit or delete already changed the day; it records its own state
+                if file_stamp(file_path) != stamp or read_tombstones(file_path) != compacted['tombstones']:
+                    return
+                if compacted['tombstones']:
+                    remove_tombstones(file_path)
+                    logger.info("Folded %s deleted orders into %s", len(compacted['tombstones']),
+                                os.path.basename(file_path))
+                completion_index.set_signature(date_key, day_signature(file_path))
+                report_catalog.record(date_key, compacted['orders'])
+                day_summaries.store(date_key, compacted['summary'])
         
-        if client_name is None:
-            logger.warning("client_name is None in completed order data")
-            client_name = "unknown"
+        ticket = file_writer.submit(file_path, append_orders, on_commit=after_commit)
+        if not ticket.wait(performance.WRITE_ACK_TIMEOUT):
+            logger.error("Error writing to completion file: %s", ticket.error)
+            completion_index.invalidate(date_key)
+            return False, ticket.error, []
+            
+        # Mark as completed in tracking
+        completed_pairs = []
+        for record in records:
+            client_name = record.get('client_name')
+            product_code = record.get('product_code')
+            
+            # Extra safety checks
+            if product_code is None:
+                logger.warning("product_code is None in completed order data")
+                product_code = "unknown"
+            
+            if client_name is None:
+                logger.warning("client_name is None in completed order data")
+                client_name = "unknown"
+            
+            if client_name and product_code:
+                completed_pairs.append((client_name, product_code))
+            logger.info("Order completed successfully: %s - %s", client_name, product_code)
         
-        if client_name and product_code:
-            try:
-                mark_order_completed(client_name, product_code)
-            except Exception as tracking_error:
-                logger.exception(f"Error marking order as completed in tracking: {tracking_error}")
-                # Continue anyway, this is not critical
+        try:
+            mark_orders_completed(completed_pairs)
+        except Exception as tracking_error:
+            logger.exception("Error marking orders as completed in tracking: %s", tracking_error)
+            # Continue anyway, this is not critical
                 
-        logger.info(f"Order completed successfully: {client_name} - {product_code}")
-        return True, None
+        return True, None, records
     except Exception as e:
-        logger.exception(f"Error saving completed order: {e}")
-        return False, str(e)
+        logger.exception("Error saving completed orders: %s", e)
+        return False, str(e), []
+
+def index_completed_day(report_date, file_path):
+    """Make sure the completion index for a day matches its files (caller holds the file lock)"""
+    date_key = report_date.isoformat() if isinstance(report_date, date) else report_date
+    signature = day_signature(file_path)
+    if not completion_index.is_current(date_key, signature):
+        orders = load_completed_orders(report_date)
+        completion_index.index_day(date_key, orders, signature, tombstones=len(read_tombstones(file_path)))
+    return date_key
+
+def compact_completed_orders(report_date):
+    """Fold a day's tombstones into its file, dropping the deleted orders for good"""
+    file_path = get_completion_file_path(report_date)
+    date_key = report_date.isoformat() if isinstance(report_date, date) else report_date
+    folded = {}
+    
+    def fold_tombstones(completed_orders):
+        tombstones = read_tombstones(file_path)
+        if not tombstones:
+            return NO_CHANGE
+        folded['tombstones'] = tombstones
+        # The live orders do not change, so a current summary carries over as is
+        summary = batch_summary(date_key, completed_orders, day_signature(file_path))
+        completed_orders = [order for order in completed_orders if order.get('id') not in tombstones]
+        folded['remaining'] = len(completed_orders)
+        folded['summary'] = summarize_orders(completed_orders) if summary is None else copy_summary(summary)
+        batch_summaries[date_key] = (completed_orders, folded['summary'])
+        completion_index.index_day(date_key, completed_orders)
+        return completed_orders
+    
+    def after_commit(stamp):
+        if not folded:
+            return
+        with file_writer.locked(file_path):
+            # Only the batch's last write holds the day's full summary
+            if not finish_batch_summary(date_key, folded['summary']):
+                return
+            # A later commit or delete already changed the day; it records its own state
+            if file_stamp(file_path) != stamp or read_tombstones(file_path) != folded['tombstones']:
+                return
+            remove_tombstones(file_path)
+            completion_index.set_signature(date_key, day_signature(file_path))
+            report_catalog.record(date_key, folded['remaining'])
+            day_summaries.store(date_key, folded['summary'])
+    
+    ticket = file_writer.submit(file_path, fold_tombstones, on_commit=after_commit)
+    if not ticket.wait(performance.WRITE_ACK_TIMEOUT):
+        logger.error("Error compacting %s: %s", file_path, ticket.error)
+        completion_index.invalidate(date_key)
+        return False
+    
+    if folded:
+        logger.info("Compacted %s deleted orders from %s", len(folded['tombstones']), os.path.basename(file_path))
+    return True
 
-def get_pending_orders():
+def archive_old_reports():
+    """Roll closed months into compressed archive bundles and apply the retention policy.
+    
+    A month is archived once its last day is older than ARCHIVE_AFTER_DAYS. Returns
+    {'archived_days': n, 'removed_months': [...]}.
+    """
+    result = {'archived_days': 0, 'removed_months': []}
+    cutoff = date.today() - timedelta(days=performance.ARCHIVE_AFTER_DAYS)
+    
+    # Group the plain day files by month (archived days have no file any more)
+    months = {}
+    date_keys, _ = report_catalog.query(end=cutoff.isoformat(), newest_first=False)
+    for date_key in date_keys:
+        if os.path.exists(get_completion_file_path(date_key)):
+            months.setdefault(date_key[:7], []).append(date_key)
+    
+    for month_key, month_dates in sorted(months.items()):
+        year, month = map(int, month_key.split('-'))
+        next_month = date(year + month // 12, month % 12 + 1, 1)
+        if next_month - timedelta(days=1) > cutoff:
+            continue  # Month not closed yet
+        result['archived_days'] += archive_report_month(month_key, month_dates)
+    
+    # Retention: drop whole archived months older than ARCHIVE_RETENTION_MONTHS
+    if performance.ARCHIVE_RETENTION_MONTHS > 0:
+        today = date.today()
+        oldest_kept = today.year * 12 + today.month - 1 - performance.ARCHIVE_RETENTION_MONTHS
+        for month_key in report_archive.months():
+            year, month = map(int, month_key.split('-'))
+            if year * 12 + month - 1 < oldest_kept:
+                archived_dates = [date_key for date_key in report_archive.dates() if date_key.startswith(month_key)]
+                report_archive.remove_month(month_key)
+                for date_key in archived_dates:
+                    day_summaries.discard(date_key)
+                result['removed_months'].append(month_key)
+    
+    report_catalog.save()
+    report_digests.save()
+    return result
+
+def archive_report_month(month_key, month_dates):
+    """Move a month's day files into its archive bundle; returns how many days were archived"""
+    os.makedirs(report_archive.archive_dir, exist_ok=True)
+    with file_writer.locked(report_archive.index_path(month_key)):
+        days = {}
+        signatures = {}
+        for date_key in month_dates:
+            file_path = get_completion_file_path(date_key)
+            with file_writer.locked(file_path):
+                if not os.path.exists(file_path):
+                    continue
+                try:
+                    signatures[date_key] = day_signature(file_path)
+                    days[date_key] = read_day_file(file_path)
+                except Exception as e:
+                    # Never archive (and delete) a day that cannot be read
+                    logger.error("Skipping %s while archiving: %s", os.path.basename(file_path), e)
+        
+        if not days:
+            return 0
+        report_archive.write_month(month_key, days)
+        
+        # Only remove day files that did not change while the bundle was written
+        archived = 0
+        for date_key, orders in days.items():
+            file_path = get_completion_file_path(date_key)
+            with file_writer.locked(file_path):
+                if day_signature(file_path) != signatures[date_key]:
+                    logger.warning("%s changed while archiving; keeping the day file", os.path.basename(file_path))
+                    continue
+                os.remove(file_path)
+                remove_tombstones(file_path)
+                # Safe while we hold it: nobody writes an archived day again
+                try:
+                    os.remove(lock_file_path(os.path.abspath(file_path)))
+                except FileNotFoundError:
+                    pass
+                completion_index.invalidate(date_key)
+                report_catalog.record(date_key, len(orders))
+                archived += 1
+            report_digests.discard([file_path])
+        
+        logger.info("Archived %s report days of %s", archived, month_key)
+        return archived
+
+# One ERP query at a time; see get_pending_orders
+fetch_lock = threading.Lock()
+
+def get_pending_orders(force=False):
+    """Fetch pending orders and publish them to the snapshot served by the async tier.
+    
+    While another thread is querying the ERP (or the warm-up is still loading completion
+    tracking), requests get the cached orders right away when there are any, instead of
+    queuing behind a slow or unreachable server. force=True always waits for a fetch.
+    """
+    has_cache = bool(data_cache['pending_orders']) and not force
+    if has_cache and warmup_thread is not None and not tracking_loaded.is_set():
+        return data_cache['pending_orders']
+    if not fetch_lock.acquire(blocking=not has_cache):
+        return data_cache['pending_orders']
+    try:
+        orders = fetch_pending_orders()
+    finally:
+        fetch_lock.release()
+    
+    if not data_cache['is_cache'] and data_cache['connection_status']['status'] == 'connected':
+        last_good_snapshot.save(orders, data_cache['stats'], data_cache['last_update'])
+    try:
+        version = snapshot_publisher.publish(
+            orders,
+            data_cache['stats'],
+            data_cache['last_update'],
+            data_cache['is_cache'],
+            data_cache['connection_status']['status']
+        )
+        data_cache['published'] = (orders, version)
+    except Exception as e:
+        logger.error("Error publishing pending orders snapshot: %s", e)
+    return orders
+
+def fetch_pending_orders():
     """Fetch pending orders from the database with improved completion filtering."""
     global OFFLINE_MODE
     
+    # Until the warm-up has loaded completion tracking, completed orders would show as pending
+    if warmup_thread is not None and not tracking_loaded.is_set():
+        tracking_loaded.wait(performance.WARMUP_TRACKING_WAIT)
+    
     # If offline mode is enabled, return mock data
     if OFFLINE_MODE:
         logger.info("Using mock data (offline mode enabled)")
@@ -480,7 +979,7 @@ def get_pending_orders():
         data_cache['connection_status']['last_check'] = datetime.now().strftime('%d/%m/%Y, %H:%M:%S')
         
         if (error):
-            logger.error(f"Error executing query: {error}")
+            logger.error("Error executing query: %s", error)
             data_cache['connection_status']['status'] = 'disconnected'
             data_cache['connection_status']['error_message'] = str(error)
             
@@ -492,22 +991,10 @@ def get_pending_orders():
                 similar_tables, _ = db_explorer.search_similar_tables(table_name.split(".")[0])
                 
                 if (similar_tables):
-                    logger.info(f"Found {len(similar_tables)} similar tables: {', '.join([t['table_name'] for t in similar_tables])}")
+                    logger.info("Found %s similar tables: %s", len(similar_tables), ', '.join([t['table_name'] for t in similar_tables]))
                     data_cache['connection_status']['similar_tables'] = similar_tables
             
-            # Return cached data if available
-            if data_cache['pending_orders']:
-                logger.info("Using cached data due to database error")
-                data_cache['is_cache'] = True
-                return data_cache['pending_orders']
-                
-            # If no cached data, try mock data
-            logger.info("No cached data available, using mock data")
-            mock_orders = get_mock_orders()
-            data_cache['pending_orders'] = mock_orders
-            data_cache['stats'] = get_mock_stats()
-            data_cache['is_cache'] = True
-            return mock_orders
+            return fallback_pending_orders("database error")
         
         # Process the results
         processed_results = []
@@ -519,40 +1006,36 @@ def get_pending_orders():
             'product_counts': []
         }
         
+        # Drop completions that fell out of the tracking window before filtering
+        tracked_completions = COMPLETION_TRACKING['client_products']
+        tracked_completions.expire()
+        
+        # Normalize every completion key in one pass (memoized across refreshes)
+        try:
+            completion_keys = keys_for((row['Cliente'], row['Produto_Codigo']) for row in results)
+        except Exception as e:
+            logger.error("Error generating completion keys: %s", e)
+            # Continue processing every row even if the completion check fails
+            completion_keys = [None] * len(results)
+        
         # First pass: group by product and collect clients with individual details
-        for row in results:
+        for row, row_completion_key in zip(results, completion_keys):
+            # Skip this client-product combination if it was already completed
+            if row_completion_key in tracked_completions:
+                continue
+            
             # Format product name for display and stats
             product_name = f"{row['Produto']} ({row['Produto_Codigo']})"
             client_name = row['Cliente']
-            product_code = row['Produto_Codigo']
             
             # Type validation to prevent errors
-            if not isinstance(product_code, str):
-                try:
-                    product_code = str(product_code)
-                    logger.debug(f"Converted product_code from {type(product_code)} to string: '{product_code}'")
-                except Exception as e:
-                    logger.error(f"Failed to convert product_code to string: {e}")
-                    continue  # Skip this row on conversion error
-            
             if not isinstance(client_name, str):
                 try:
                     client_name = str(client_name)
-                    logger.debug(f"Converted client_name from {type(client_name)} to string: '{client_name}'")
                 except Exception as e:
-                    logger.error(f"Failed to convert client_name to string: {e}")
+                    logger.error("Failed to convert client_name to string: %s", e)
                     continue  # Skip this row on conversion error
             
-            # Skip this client-product combination if it was already completed - now with more robust type checking
-            try:
-                completion_key = get_completion_key(client_name, product_code)
-                if completion_key in COMPLETION_TRACKING['client_products']:
-                    logger.debug(f"Filtering out completed order: {client_name} - {product_code}")
-                    continue
-            except Exception as e:
-                logger.error(f"Error checking completion status: {e}")
-                # Continue processing this row even if the completion check fails
-            
             # Store client info with individual details
             client_info = {
                 'nome': client_name,
@@ -616,46 +1099,74 @@ def get_pending_orders():
         
         return processed_results
     except Exception as e:
-        logger.exception(f"Unexpected error fetching pending orders: {str(e)}")
+        logger.exception("Unexpected error fetching pending orders: %s", e)
         data_cache['connection_status']['status'] = 'error'
         data_cache['connection_status']['error_message'] = str(e)
         
-        # Return cached data if available
-        if data_cache['pending_orders']:
-            logger.info("Using cached data due to unexpected error")
-            data_cache['is_cache'] = True
-            return data_cache['pending_orders']
-            
-        # If no cached data, use mock data
-        mock_orders = get_mock_orders()
-        data_cache['pending_orders'] = mock_orders
-        data_cache['stats'] = get_mock_stats()
+        return fallback_pending_orders("unexpected error")
+
+def fallback_pending_orders(reason):
+    """Orders served while the ERP cannot be read: the cached ones, else the last good snapshot.
+    
+    Mock data is only used when neither exists. Completions made since the ERP read are
+    filtered out, so a completed order does not come back during an outage.
+    """
+    orders = data_cache['pending_orders']
+    if orders:
+        logger.info("Using cached data due to %s", reason)
+    else:
+        snapshot = last_good_snapshot.load()
+        if snapshot is not None:
+            logger.info("Using the last good ERP snapshot (%s) due to %s", snapshot['last_update'], reason)
+            orders = snapshot['orders']
+            data_cache['last_update'] = snapshot['last_update']
+    
+    if orders:
+        orders = without_completed(orders)
+        data_cache['pending_orders'] = orders
+        data_cache['stats'] = {
+            'product_labels': [order['produto'] for order in orders],
+            'product_counts': [len(order['clientes']) for order in orders]
+        }
         data_cache['is_cache'] = True
-        return mock_orders
+        return orders
+    
+    logger.info("No cached data available, using mock data")
+    mock_orders = get_mock_orders()
+    data_cache['pending_orders'] = mock_orders
+    data_cache['stats'] = get_mock_stats()
+    data_cache['is_cache'] = True
+    return mock_orders
 
-def get_available_report_dates():
-    """Get a list of all dates for which reports are available"""
+def without_completed(orders):
+    """Drop the clients completed since orders were read from the ERP (and products left without any)"""
+    tracked_completions = COMPLETION_TRACKING['client_products']
+    remaining = []
+    for order in orders:
+        details = [detail for detail in order.get('clientes_detalhes', [])
+                   if get_completion_key(detail['nome'], order['codigo']) not in tracked_completions]
+        if len(details) == len(order.get('clientes_detalhes', [])):
+            remaining.append(order)
+        elif details:
+            clients = [detail['nome'] for detail in details]
+            remaining.append(dict(order, clientes_detalhes=details, clientes=clients,
+                                  cliente=f"{len(clients)} cliente(s): {', '.join(clients)}"))
+    return remaining
+
+def get_available_report_dates(start=None, end=None, offset=0, limit=None):
+    """Get report dates (newest first) with their order counts, plus the total matching dates"""
+    date_keys, total = report_catalog.query(start, end, offset, limit)
     dates = []
-    try:
-        # Look for all completed_*.json files
-        for filename in os.listdir(COMPLETED_ORDERS_DIR):
-            if filename.startswith('completed_') and filename.endswith('.json'):
-                date_part = filename[len('completed_'):-len('.json')]
-                try:
-                    # Parse the date and add to list
-                    report_date = datetime.strptime(date_part, '%Y-%m-%d').date()
-                    dates.append({
-                        'date': report_date.isoformat(),
-                        'formatted_date': report_date.strftime('%d/%m/%Y'),
-                    })
-                except ValueError:
-                    continue
-    except Exception as e:
-        logger.error(f"Error listing report dates: {e}")
-        
-    # Sort dates in reverse order (newest first)
-    dates.sort(key=lambda x: x['date'], reverse=True)
-    return dates
+    for date_key in date_keys:
+        report_date = date.fromisoformat(date_key)
+        dates.append({
+            'date': date_key,
+            'formatted_date': report_date.strftime('%d/%m/%Y'),
+            'count': report_catalog.count(date_key),
+        })
+    # Persist any counts computed for this page
+    report_catalog.save()
+    return dates, total
 
 @app.route('/')
 def index():
@@ -663,8 +1174,18 @@ def index():
     # Get pending orders (from cache if available)
     pending_orders = get_pending_orders()
     
+    # The order table only changes with the data: render it once per snapshot version
+    published_orders, version = data_cache['published']
+    def render_table():
+        return render_template('_pending_orders.html', pending_orders=pending_orders)
+    if version is not None and published_orders is pending_orders:
+        orders_fragment = page_fragments.get_or_render(('orders', version), render_table)
+    else:
+        orders_fragment = Markup(render_table())
+    
     return render_template('index.html', 
                           pending_orders=pending_orders, 
+                          orders_fragment=orders_fragment,
                           total_pending=len(pending_orders),
                           last_update=data_cache['last_update'],
                           is_cache=data_cache['is_cache'],
@@ -697,7 +1218,7 @@ def get_stats():
             'connection_status': data_cache['connection_status']['status']
         })
     except Exception as e:
-        logger.exception(f"Error getting stats: {str(e)}")
+        logger.exception("Error getting stats: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/refresh', methods=['GET'])
@@ -713,38 +1234,71 @@ def api_refresh():
             'error_message': data_cache['connection_status'].get('error_message')
         })
     except Exception as e:
-        logger.exception(f"Error refreshing data: {str(e)}")
+        logger.exception("Error refreshing data: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Kiosks retry and operators double-tap: a request resent with the same Idempotency-Key gets
+# the first response back, and a client/product completed moments ago is not saved again.
+# Both are claimed in data/claims/ too, so a retry landing on another gunicorn worker is caught.
+CLAIMS_DIR = os.path.join(COMPLETED_ORDERS_DIR, 'claims')
+idempotency_cache = IdempotencyCache(ttl=performance.IDEMPOTENCY_TTL, max_keys=performance.IDEMPOTENCY_MAX_KEYS,
+                                     shared_dir=os.path.join(CLAIMS_DIR, 'idempotency'))
+recent_completions = DuplicateWindow(window=performance.DUPLICATE_COMPLETION_WINDOW,
+                                     shared_dir=os.path.join(CLAIMS_DIR, 'completions'))
+
+def idempotent(view):
+    """Replay the stored response when a request repeats an Idempotency-Key header"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > 200:
+            return jsonify({
+                'success': False,
+                'error': 'Idempotency-Key inválida.'
+            }), 400
+        
+        scoped_key = f"{request.path}:{key}"
+        state, stored = idempotency_cache.begin(scoped_key)
+        if state == IdempotencyCache.REPLAY:
+            logger.info("Replaying response for repeated request %s", scoped_key)
+            body, status = stored
+            response = app.response_class(body, status=status, mimetype='application/json')
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        if state == IdempotencyCache.IN_PROGRESS:
+            return jsonify({
+                'success': False,
+                'error': 'Requisição ainda em processamento. Tente novamente.'
+            }), 409
+        
+        try:
+            response = app.make_response(view(*args, **kwargs))
+        except BaseException:
+            idempotency_cache.abandon(scoped_key)
+            raise
+        if response.status_code >= 500:
+            # Server errors may be retried for real
+            idempotency_cache.abandon(scoped_key)
+        else:
+            idempotency_cache.finish(scoped_key, response.get_data(), response.status_code)
+        return response
+    return wrapper
+
 @app.route('/api/complete-order', methods=['POST'])
+@idempotent
 def complete_order():
     """API endpoint to mark an order as completed with improved validation and persistence"""
+    claimed_key = None
+    completed = False
     try:
         data = request.json
-        logger.info(f"Received completion request: {data}")
+        logger.debug("Received completion request: %s", data)
         
         # Enhanced validation with better error messages
-        if not data:
-            logger.error("Empty request data received")
-            return jsonify({
-                'success': False,
-                'error': 'Dados vazios ou inválidos.'
-            }), 400
-            
-        # Check each field individually for better error messages
-        missing_fields = []
-        if not data.get('product_code'):
-            missing_fields.append('código do produto')
-        if not data.get('product_name'):
-            missing_fields.append('nome do produto')
-        if not data.get('client_name'):
-            missing_fields.append('nome do cliente')
-        if not data.get('completed_by'):
-            missing_fields.append('nome do funcionário')
-            
-        if missing_fields:
-            error_msg = f"Dados incompletos. Os seguintes campos são obrigatórios: {', '.join(missing_fields)}."
-            logger.error(f"Validation error: {error_msg}")
+        error_msg = validate_completion_data(data)
+        if error_msg:
             return jsonify({
                 'success': False,
                 'error': error_msg
@@ -756,29 +1310,17 @@ def complete_order():
         client_name = data.get('client_name')
         product_code = data.get('product_code')
         
-        # Enhanced validation for client name and product code
-        if not client_name or not product_code:
+        # A second tap on the same client/product within the window is answered without saving
+        key = get_completion_key(client_name, product_code)
+        if key and not recent_completions.claim(key):
+            logger.info("Ignoring duplicate completion of %s - %s", client_name, product_code)
             return jsonify({
-                'success': False,
-                'error': 'Cliente e código do produto são obrigatórios e não podem estar vazios.'
-            }), 400
-            
-        # Make sure string fields are strings (important for non-string inputs)
-        for field in ['product_code', 'product_name', 'client_name', 'completed_by', 'separador']:
-            if field in data:
-                if data[field] is None:
-                    data[field] = 'N/A'  # Replace None with N/A
-                else:
-                    try:
-                        data[field] = str(data[field])  # Convert to string with explicit error handling
-                    except Exception as e:
-                        logger.warning(f"Failed to convert {field} to string: {e}, using 'N/A' instead")
-                        data[field] = 'N/A'
-        
-        # Ensure separador is never None or empty
-        if not data.get('separador'):
-            data['separador'] = 'N/A'
-            
+                'success': True,
+                'duplicate': True,
+                'message': 'Pedido já marcado como concluído há instantes.'
+            })
+        claimed_key = key
+        
         # If in offline/mock mode, handle differently
         if OFFLINE_MODE:
             # Mark as completed in mock data
@@ -787,72 +1329,256 @@ def complete_order():
             success, error = save_completed_order(data)
             
             if not success:
-                logger.error(f"Failed to save completed order in offline mode: {error}")
+                logger.error("Failed to save completed order in offline mode: %s", error)
                 return jsonify({
                     'success': False,
                     'error': f'Erro ao salvar registro: {error}'
                 }), 500
                 
+            completed = True
             return jsonify({
                 'success': True,
                 'message': 'Pedido marcado como concluído com sucesso (modo offline).'
             })
         
         # Debug the data before saving to help troubleshoot
-        logger.debug(f"Order data before saving: {json.dumps(data, ensure_ascii=False, default=str)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Order data before saving: %s", json.dumps(data, ensure_ascii=False, default=str))
         
         # Normal mode - save the completion record with more robust error handling
         try:
             success, error = save_completed_order(data)
         except Exception as specific_error:
-            logger.exception(f"Exception during save_completed_order: {specific_error}")
+            logger.exception("Exception during save_completed_order: %s", specific_error)
             return jsonify({
                 'success': False,
                 'error': f'Erro ao salvar registro: {str(specific_error)}'
             }), 500
         
         if success:
-            # Mark this client-product combination as completed in our tracking
-            try:
-                tracking_success = mark_order_completed(client_name, product_code)
-                if not tracking_success:
-                    logger.warning(f"Failed to mark order as completed in tracking: {client_name} - {product_code}")
-                    # Continue anyway, this is not critical
-            except Exception as tracking_error:
-                logger.exception(f"Error in mark_order_completed: {tracking_error}")
-                # Continue anyway, this is not critical
-            
+            # save_completed_order already marked the pair in the completion tracking
             # Force refresh of the data cache
             try:
                 refresh_data_cache()
             except Exception as cache_error:
-                logger.exception(f"Error refreshing data cache: {cache_error}")
+                logger.exception("Error refreshing data cache: %s", cache_error)
                 # Continue anyway, this is not critical
-                
+            
+            completed = True
             return jsonify({
                 'success': True,
                 'message': 'Pedido marcado como concluído com sucesso.'
             })
         else:
-            logger.error(f"Failed to save completed order: {error}")
+            logger.error("Failed to save completed order: %s", error)
             return jsonify({
                 'success': False,
                 'error': f'Erro ao salvar registro: {error}'
             }), 500
             
     except Exception as e:
-        logger.exception(f"Error completing order: {str(e)}")
+        logger.exception("Error completing order: %s", e)
         return jsonify({
             'success': False,
             'error': f'Erro interno: {str(e)}'
         }), 500
+    finally:
+        # A failed save must not turn the operator's retry into a "duplicate"
+        if claimed_key and not completed:
+            recent_completions.release(claimed_key)
+
+def validate_completion_data(data):
+    """Validate a completion record in place; returns an error message or None"""
+    if not data:
+        logger.error("Empty request data received")
+        return 'Dados vazios ou inválidos.'
+        
+    # Check each field individually for better error messages
+    missing_fields = []
+    if not data.get('product_code'):
+        missing_fields.append('código do produto')
+    if not data.get('product_name'):
+        missing_fields.append('nome do produto')
+    if not data.get('client_name'):
+        missing_fields.append('nome do cliente')
+    if not data.get('completed_by'):
+        missing_fields.append('nome do funcionário')
+        
+    if missing_fields:
+        error_msg = f"Dados incompletos. Os seguintes campos são obrigatórios: {', '.join(missing_fields)}."
+        logger.error("Validation error: %s", error_msg)
+        return error_msg
+        
+    # Make sure string fields are strings (important for non-string inputs)
+    for field in ['product_code', 'product_name', 'client_name', 'completed_by', 'separador']:
+        if field in data:
+            if data[field] is None:
+                data[field] = 'N/A'  # Replace None with N/A
+            else:
+                try:
+                    data[field] = str(data[field])  # Convert to string with explicit error handling
+                except Exception as e:
+                    logger.warning("Failed to convert %s to string: %s, using 'N/A' instead", field, e)
+                    data[field] = 'N/A'
+    
+    # Ensure separador is never None or empty
+    if not data.get('separador'):
+        data['separador'] = 'N/A'
+    
+    return None
+
+@app.route('/api/complete-orders', methods=['POST'])
+@idempotent
+def complete_orders():
+    """API endpoint to mark several client/product pairs as completed in a single request.
+    
+    Accepts {"completed_by", "items": [{"client_name", "product_code", "product_name", ...}]}
+    or {"completed_by", "product_code", "all_clients": true} to complete every client currently
+    waiting on a product. Top-level fields are defaults for every item.
+    """
+    claimed_keys = []
+    completed = False
+    try:
+        data = request.json
+        logger.debug("Received bulk completion request: %s", data)
+        
+        if not isinstance(data, dict):
+            return jsonify({
+                'success': False,
+                'error': 'Dados vazios ou inválidos.'
+            }), 400
+        
+        defaults = {field: data[field] for field in ('product_code', 'product_name', 'completed_by', 'separador')
+                    if data.get(field)}
+        
+        if data.get('all_clients'):
+            # Expand to every client currently waiting on this product
+            product_code = str(data.get('product_code') or '')
+            product = next((order for order in data_cache['pending_orders']
+                            if str(order.get('codigo')) == product_code), None)
+            if not product_code or not product:
+                return jsonify({
+                    'success': False,
+                    'error': f'Produto {product_code} não encontrado entre os pedidos pendentes.'
+                }), 404
+            defaults.setdefault('product_name', product['produto'].split('(')[0].strip())
+            items = [{'client_name': client_name} for client_name in product['clientes']]
+        else:
+            items = data.get('items')
+            if not isinstance(items, list) or not items:
+                return jsonify({
+                    'success': False,
+                    'error': 'Informe a lista de itens (items) ou all_clients com o código do produto.'
+                }), 400
+        
+        # Validate every item together, skipping duplicates of the same client/product
+        results = []
+        valid_records = []
+        duplicates = 0
+        seen_keys = set()
+        for item in items:
+            record = {**defaults, **item} if isinstance(item, dict) else None
+            result = {
+                'client_name': record.get('client_name') if record else None,
+                'product_code': record.get('product_code') if record else None,
+                'success': False
+            }
+            results.append(result)
+            
+            error_msg = validate_completion_data(record)
+            if error_msg:
+                result['error'] = error_msg
+                continue
+            
+            key = get_completion_key(record['client_name'], record['product_code'])
+            if key in seen_keys:
+                result['error'] = 'Item duplicado na requisição.'
+                continue
+            seen_keys.add(key)
+            
+            if key and not recent_completions.claim(key):
+                # Completed moments ago (a double tap): report it done without saving it again
+                result['success'] = True
+                result['duplicate'] = True
+                duplicates += 1
+                continue
+            if key:
+                claimed_keys.append(key)
+            
+            record['client_ip'] = request.remote_addr
+            record['user_agent'] = str(request.user_agent)
+            valid_records.append((result, record))
+        
+        if not valid_records and duplicates:
+            return jsonify({
+                'success': duplicates == len(results),
+                'completed': 0,
+                'duplicates': duplicates,
+                'failed': len(results) - duplicates,
+                'results': results,
+                'message': 'Pedido(s) já marcado(s) como concluído(s) há instantes.'
+            })
+        if not valid_records:
+            return jsonify({
+                'success': False,
+                'error': 'Nenhum item válido para concluir.',
+                'results': results
+            }), 400
+        
+        if OFFLINE_MODE:
+            # Mark as completed in mock data
+            for _, record in valid_records:
+                mark_mock_order_completed(record['client_name'], record['product_code'])
+        
+        # Persist every record with one write and one tracking update
+        success, error, saved_records = save_completed_orders([record for _, record in valid_records])
+        if not success:
+            logger.error("Failed to save completed orders: %s", error)
+            for result, _ in valid_records:
+                result['error'] = f'Erro ao salvar registro: {error}'
+            return jsonify({
+                'success': False,
+                'error': f'Erro ao salvar registros: {error}',
+                'results': results
+            }), 500
+        
+        completed = True
+        for (result, _), saved_record in zip(valid_records, saved_records):
+            result['success'] = True
+            result['id'] = saved_record['id']
+        
+        # Refresh the data cache once for the whole batch
+        if not OFFLINE_MODE:
+            try:
+                refresh_data_cache()
+            except Exception as cache_error:
+                logger.exception("Error refreshing data cache: %s", cache_error)
+                # Continue anyway, this is not critical
+        
+        completed_count = len(saved_records)
+        return jsonify({
+            'success': completed_count + duplicates == len(results),
+            'completed': completed_count,
+            'duplicates': duplicates,
+            'failed': len(results) - completed_count - duplicates,
+            'results': results,
+            'message': f'{completed_count} pedido(s) marcado(s) como concluído(s).'
+        })
+        
+    except Exception as e:
+        logger.exception("Error completing orders: %s", e)
+        return jsonify({
+            'success': False,
+            'error': f'Erro interno: {str(e)}'
+        }), 500
+    finally:
+        if not completed:
+            for key in claimed_keys:
+                recent_completions.release(key)
 
 def refresh_data_cache():
-    """Force refresh of the data cache"""
-    global data_cache
-    data_cache['pending_orders'] = []
-    data_cache['is_cache'] = False
-    get_pending_orders()
+    """Force refresh of the data cache (a failed refresh keeps the orders already cached)"""
+    get_pending_orders(force=True)
 
 @app.route('/report')
 @app.route('/completed')
@@ -868,41 +1594,169 @@ def completed_orders():
     else:
         report_date = date.today()
         
-    # Load orders for selected date
-    completed_orders = load_completed_orders(report_date)
-    
-    # Group by employee
-    employees = {}
-    for order in completed_orders:
-        employee = order.get('completed_by', 'Desconhecido')
-        if employee not in employees:
-            employees[employee] = []
-        employees[employee].append(order)
-    
-    # Get today's date for template comparison
-    today_date = date.today()
+    # Header and charts come from the day's summary; the table loads its rows from the API.
+    # Only the bounded parts are embedded: clients and products grow with the day.
+    summary = day_summaries.get(report_date.isoformat())
+    chart_data = {field: summary[field] for field in ('total', 'hour', 'employee')}
     
     return render_template('completed.html',
-                          completed_orders=completed_orders,
-                          employees=employees,
+                          summary=summary,
+                          chart_data=chart_data,
+                          first_completion=format_datetime(summary['first']),
+                          last_completion=format_datetime(summary['last']),
                           report_date=report_date.strftime('%d/%m/%Y'),
                           report_date_iso=report_date.isoformat(),
                           last_update=datetime.now().strftime('%d/%m/%Y, %H:%M:%S'),
                           is_cache=False,
                           connection_status=data_cache['connection_status']['status'],
-                          total_count=len(completed_orders))
+                          total_count=summary['total'])
 
 @app.route('/api/reports/dates')
 def get_available_report_dates_api():
-    """API endpoint to get all dates for which reports are available"""
+    """API endpoint to get the dates for which reports are available.
+    
+    Optional query params: from/to (YYYY-MM-DD, inclusive) and page/per_page.
+    """
+    try:
+        start = request.args.get('from')
+        end = request.args.get('to')
+        try:
+            for value in (start, end):
+                if value:
+                    datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Datas devem estar no formato AAAA-MM-DD.'
+            }), 400
+        
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = request.args.get('per_page', type=int)
+        if per_page is not None:
+            per_page = min(max(per_page, 1), performance.REPORT_DATES_MAX_PER_PAGE)
+            offset = (page - 1) * per_page
+        else:
+            offset = 0
+        
+        available_dates, total = get_available_report_dates(start, end, offset, per_page)
+        response = {
+            'success': True,
+            'dates': available_dates,
+            'total': total
+        }
+        if per_page is not None:
+            response['page'] = page
+            response['per_page'] = per_page
+        return jsonify(response)
+    except Exception as e:
+        logger.exception("Error getting report dates: %s", e)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/reports/orders')
+def report_orders_api():
+    """API endpoint to page through one day's completed orders.
+    
+    Query params: date, page, per_page, employee, product, client, q (free text),
+    sort (timestamp, product_name, product_code, client_name, completed_by) and order (asc/desc).
+    """
+    try:
+        date_str = request.args.get('date')
+        try:
+            report_date = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else date.today()
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Data deve estar no formato AAAA-MM-DD.'
+            }), 400
+        
+        sort = request.args.get('sort') or None
+        if sort is not None and sort not in SORT_FIELDS:
+            return jsonify({
+                'success': False,
+                'error': f'sort deve ser um de: {", ".join(SORT_FIELDS)}.'
+            }), 400
+        descending = request.args.get('order', 'asc') == 'desc'
+        
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 100, type=int), 1), performance.REPORT_ORDERS_MAX_PER_PAGE)
+        
+        orders = day_orders.query(
+            report_date.isoformat(),
+            employee=request.args.get('employee') or None,
+            product=request.args.get('product') or None,
+            client=request.args.get('client') or None,
+            query=request.args.get('q') or None,
+            sort=sort,
+            descending=descending
+        )
+        offset = (page - 1) * per_page
+        
+        return jsonify({
+            'success': True,
+            'date': report_date.isoformat(),
+            'orders': orders[offset:offset + per_page],
+            'total': len(orders),
+            'page': page,
+            'per_page': per_page
+        })
+    except Exception as e:
+        logger.exception("Error listing report orders: %s", e)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/reports/range')
+def report_range_api():
+    """API endpoint to aggregate completed orders over a date range.
+    
+    Query params: from/to (YYYY-MM-DD, inclusive) and group_by (employee, product or client).
+    """
     try:
-        available_dates = get_available_report_dates()
+        group_by = request.args.get('group_by', 'employee')
+        if group_by not in GROUP_FIELDS:
+            return jsonify({
+                'success': False,
+                'error': f'group_by deve ser um de: {", ".join(GROUP_FIELDS)}.'
+            }), 400
+        
+        try:
+            start = datetime.strptime(request.args.get('from', ''), '%Y-%m-%d').date()
+            end = datetime.strptime(request.args.get('to', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Parâmetros from e to são obrigatórios no formato AAAA-MM-DD.'
+            }), 400
+        
+        if end < start:
+            return jsonify({
+                'success': False,
+                'error': 'A data final deve ser igual ou posterior à data inicial.'
+            }), 400
+        
+        if (end - start).days + 1 > performance.REPORT_RANGE_MAX_DAYS:
+            return jsonify({
+                'success': False,
+                'error': f'O período máximo é de {performance.REPORT_RANGE_MAX_DAYS} dias.'
+            }), 400
+        
+        # Only days that have a report file; each day is summarized (or served from cache) in turn
+        date_keys, _ = report_catalog.query(start.isoformat(), end.isoformat(), newest_first=False)
+        result = aggregate_range(date_keys, group_by, day_summaries)
+        
         return jsonify({
             'success': True,
-            'dates': available_dates
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'group_by': group_by,
+            **result
         })
     except Exception as e:
-        logger.exception(f"Error getting report dates: {str(e)}")
+        logger.exception("Error building range report: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -913,7 +1767,7 @@ def delete_order():
     """API endpoint to delete a completed order"""
     try:
         data = request.json
-        logger.info(f"Received delete order request: {data}")
+        logger.debug("Received delete order request: %s", data)
         
         # Validate required fields
         if not data or not data.get('order_id'):
@@ -925,91 +1779,84 @@ def delete_order():
         order_id = data.get('order_id')
         report_date = data.get('report_date')
         
-        # If no report date is provided, use today's date
-        if not report_date:
-            report_date = date.today().isoformat()
+        # If no report date is provided (or it is invalid), use today's date
+        try:
+            report_date = datetime.strptime(str(report_date), '%Y-%m-%d').date()
+        except ValueError:
+            report_date = date.today()
         
         # Get the file path for the specified date
         file_path = get_completion_file_path(report_date)
         
-        # Check if the file exists
+        # Check if the file exists; archived days are read-only
         if not os.path.exists(file_path):
+            if report_archive.has_day(report_date.isoformat()):
+                return jsonify({
+                    'success': False,
+                    'error': f'Os registros de {report_date.strftime("%d/%m/%Y")} estão arquivados e não podem ser alterados.'
+                }), 409
             return jsonify({
                 'success': False,
                 'error': f'Não foram encontrados registros para a data {report_date}.'
             }), 404
             
-        # Load the orders from the file
+        # Look the order up in the index and record the delete as a tombstone (O(1) append)
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                if content:
-                    completed_orders = json.loads(content)
-                else:
-                    completed_orders = []
+            with file_writer.locked(file_path):
+                date_key = index_completed_day(report_date, file_path)
+                entry = completion_index.lookup(date_key, order_id)
+                if entry:
+                    _, _, client_name, product_code, completed_by, timestamp = entry
+                    deleted_order = {'client_name': client_name, 'product_code': product_code,
+                                     'completed_by': completed_by, 'timestamp': timestamp}
+                    summary = day_summaries.updated(date_key, day_signature(file_path), removed=[deleted_order])
+                    
+                    append_tombstone(file_path, order_id, fsync=performance.WRITE_FSYNC)
+                    remaining_completions = completion_index.remove(date_key, order_id)
+                    completion_index.set_signature(date_key, day_signature(file_path))
+                    if summary is not None:
+                        report_catalog.record(date_key, summary['total'])
+                        day_summaries.store(date_key, summary)
+                    else:
+                        report_catalog.record(date_key)
+                        day_summaries.invalidate(date_key)
         except Exception as e:
-            logger.exception(f"Error reading completion file: {e}")
+            logger.exception("Error writing to completion file: %s", e)
             return jsonify({
                 'success': False,
-                'error': f'Erro ao ler arquivo de registros: {str(e)}'
+                'error': f'Erro ao atualizar arquivo de registros: {str(e)}'
             }), 500
-            
-        # Find the order to delete
-        order_to_delete = None
-        for i, order in enumerate(completed_orders):
-            if order.get('id') == order_id:
-                order_to_delete = order
-                del completed_orders[i]
-                break
                 
-        if not order_to_delete:
+        if not entry:
             return jsonify({
                 'success': False,
                 'error': 'Pedido não encontrado.'
             }), 404
-            
-        # Save the updated orders list back to the file
-        try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(completed_orders, f, ensure_ascii=False, indent=2, default=str)
-        except Exception as e:
-            logger.exception(f"Error writing to completion file: {e}")
-            return jsonify({
-                'success': False,
-                'error': f'Erro ao atualizar arquivo de registros: {str(e)}'
-            }), 500
+        
+        # Fold the tombstones into the day file once enough deletes pile up
+        if completion_index.tombstone_count(date_key) >= performance.TOMBSTONE_COMPACT_THRESHOLD:
+            compact_completed_orders(report_date)
             
         # Remove from completion tracking if needed
-        client_name = order_to_delete.get('client_name')
-        product_code = order_to_delete.get('product_code')
+        key = entry[1]
         
         if client_name and product_code:
             try:
                 # Only remove from tracking if this is the only record for this client-product combination
-                # Check if there are other completed orders for this client-product
-                other_completions_exist = False
-                for order in completed_orders:
-                    if (order.get('client_name') == client_name and 
-                        order.get('product_code') == product_code):
-                        other_completions_exist = True
-                        break
-                        
-                # If no other completions exist, remove from tracking
-                if not other_completions_exist:
-                    key = get_completion_key(client_name, product_code)
+                if not remaining_completions:
                     if key and key in COMPLETION_TRACKING['client_products']:
                         COMPLETION_TRACKING['client_products'].remove(key)
                         save_completion_tracking()
-                        logger.info(f"Removed from completion tracking: {client_name} - {product_code}")
+                        logger.info("Removed from completion tracking: %s - %s", client_name, product_code)
             except Exception as e:
-                logger.exception(f"Error updating completion tracking: {e}")
+                logger.exception("Error updating completion tracking: %s", e)
                 # Continue anyway, this is not critical
                 
         # Force refresh of the data cache
         try:
             refresh_data_cache()
         except Exception as e:
-            logger.exception(f"Error refreshing data cache: {e}")
+            logger.exception("Error refreshing data cache: %s", e)
             # Continue anyway, this is not critical
             
         return jsonify({
@@ -1018,16 +1865,66 @@ def delete_order():
         })
         
     except Exception as e:
-        logger.exception(f"Error deleting order: {str(e)}")
+        logger.exception("Error deleting order: %s", e)
         return jsonify({
             'success': False,
             'error': f'Erro interno: {str(e)}'
         }), 500
 
+# Default CSV columns for /api/reports/export?format=csv
+EXPORT_COLUMNS = ['id', 'timestamp', 'processing_date', 'completed_by', 'client_name',
+                  'product_code', 'product_name', 'separador']
+
+def iter_completed_orders(date_keys):
+    """Yield the live completed orders of several days, one order at a time"""
+    for date_key in date_keys:
+        file_path = get_completion_file_path(date_key)
+        if not os.path.exists(file_path):
+            yield from report_archive.read_day(date_key) or []
+            continue
+        tombstones = read_tombstones(file_path)
+        for order in iter_json_array(file_path):
+            if tombstones and order.get('id') in tombstones:
+                continue
+            yield order
+
+def iter_export_chunks(orders, export_format, columns):
+    """Encode orders as NDJSON or CSV, yielding chunks of about EXPORT_CHUNK_BYTES"""
+    buffer = io.StringIO()
+    writer = None
+    if export_format == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+    
+    for order in orders:
+        if writer:
+            writer.writerow([order.get(column, '') for column in columns])
+        else:
+            if columns:
+                order = {column: order.get(column) for column in columns}
+            buffer.write(json_backend.dumps(order))
+            buffer.write('\n')
+        
+        if buffer.tell() >= performance.EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
 @app.route('/api/reports/export', methods=['GET'])
 def export_report_api():
-    """API endpoint to export report data as JSON"""
+    """API endpoint to export report data.
+    
+    format=json (default) returns a single day as before. format=ndjson or format=csv streams
+    the orders of a day (date) or a range (from/to), optionally limited to columns=a,b,c.
+    """
     try:
+        export_format = request.args.get('format', 'json')
+        if export_format in ('ndjson', 'csv'):
+            return stream_report_export(export_format)
+        
         # Get date from query param, defaulting to today
         date_str = request.args.get('date')
         if date_str:
@@ -1048,12 +1945,54 @@ def export_report_api():
             'orders': completed_orders
         })
     except Exception as e:
-        logger.exception(f"Error exporting report: {str(e)}")
+        logger.exception("Error exporting report: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+def stream_report_export(export_format):
+    """Stream a day or date range as NDJSON or CSV with chunked transfer encoding"""
+    try:
+        if request.args.get('from') or request.args.get('to'):
+            start = datetime.strptime(request.args.get('from', ''), '%Y-%m-%d').date()
+            end = datetime.strptime(request.args.get('to', ''), '%Y-%m-%d').date()
+        else:
+            start = end = datetime.strptime(request.args.get('date', date.today().isoformat()), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Datas devem estar no formato AAAA-MM-DD (use date ou from e to).'
+        }), 400
+    
+    if end < start or (end - start).days + 1 > performance.REPORT_RANGE_MAX_DAYS:
+        return jsonify({
+            'success': False,
+            'error': f'Período inválido (máximo de {performance.REPORT_RANGE_MAX_DAYS} dias).'
+        }), 400
+    
+    columns = [column.strip() for column in request.args.get('columns', '').split(',') if column.strip()]
+    if export_format == 'csv' and not columns:
+        columns = EXPORT_COLUMNS
+    
+    date_keys, _ = report_catalog.query(start.isoformat(), end.isoformat(), newest_first=False)
+    
+    def generate():
+        try:
+            yield from iter_export_chunks(iter_completed_orders(date_keys), export_format, columns)
+        except Exception as e:
+            # Headers are already sent; log and end the stream
+            logger.exception("Error streaming report export: %s", e)
+    
+    extension = 'csv' if export_format == 'csv' else 'ndjson'
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    filename = f"relatorio_{start.isoformat()}" + (f"_{end.isoformat()}" if end != start else '') + f".{extension}"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
 @app.route('/api/connection/test', methods=['GET'])
 def test_connection():
     """API endpoint to test the database connection."""
@@ -1083,7 +2022,7 @@ def test_connection():
             'timestamp': datetime.now().strftime('%d/%m/%Y, %H:%M:%S')
         })
     except Exception as e:
-        logger.exception(f"Error testing connection: {str(e)}")
+        logger.exception("Error testing connection: %s", e)
         return jsonify({
             'success': False,
             'message': f"Error testing connection: {str(e)}",
@@ -1102,7 +2041,7 @@ def toggle_offline_mode():
             'message': f"Offline mode {'enabled' if OFFLINE_MODE else 'disabled'}"
         })
     except Exception as e:
-        logger.exception(f"Error toggling offline mode: {str(e)}")
+        logger.exception("Error toggling offline mode: %s", e)
         return jsonify({
             'success': False, 
             'error': str(e)
@@ -1180,7 +2119,7 @@ def api_explore_db():
             'schemas_error': schemas_error
         })
     except Exception as e:
-        logger.exception(f"Error exploring database: {str(e)}")
+        logger.exception("Error exploring database: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -1222,7 +2161,7 @@ def api_table_details(table_name):
             'columns': columns
         })
     except Exception as e:
-        logger.exception(f"Error getting table details: {str(e)}")
+        logger.exception("Error getting table details: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -1245,7 +2184,7 @@ def api_similar_tables(partial_name):
             'tables': tables
         })
     except Exception as e:
-        logger.exception(f"Error finding similar tables: {str(e)}")
+        logger.exception("Error finding similar tables: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -1254,19 +2193,73 @@ def api_similar_tables(partial_name):
 @app.route('/products')
 def products_page():
     """Render the products statistics page."""
-    return render_template('products.html',
-                          last_update=data_cache['last_update'],
-                          is_cache=data_cache['is_cache'],
-                          connection_status=data_cache['connection_status']['status'],
-                          offline_mode=OFFLINE_MODE,
-                          now=datetime.now())
+    # The charts load their data from the API; the page itself only changes with the header
+    last_update = data_cache['last_update']
+    is_cache = data_cache['is_cache']
+    connection_status = data_cache['connection_status']['status']
+    now = datetime.now()
+    key = ('products', last_update, is_cache, connection_status, OFFLINE_MODE, now.year)
+    return page_fragments.get_or_render(key, lambda: render_template('products.html',
+                                                                     last_update=last_update,
+                                                                     is_cache=is_cache,
+                                                                     connection_status=connection_status,
+                                                                     offline_mode=OFFLINE_MODE,
+                                                                     now=now))
 
-@scheduler.task('interval', id='refresh_data', seconds=180)  # Changed from 300 to 180 for 3 minute refresh
+@scheduled_task('cron', id='archive_reports', hour=3, minute=15)
+def scheduled_archive():
+    """Scheduled task to archive closed months once a day."""
+    if not performance.ARCHIVE_ENABLED:
+        return
+    try:
+        result = archive_old_reports()
+        logger.info("Report archiving finished: %s", result)
+    except Exception as e:
+        logger.exception("Error archiving reports: %s", e)
+
+@scheduled_task('interval', id='refresh_data', seconds=180)  # Changed from 300 to 180 for 3 minute refresh
 def scheduled_refresh():
     """Scheduled task to refresh data every 3 minutes."""
     with app.app_context():
         get_pending_orders()
-        logger.info(f"Data refreshed at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        logger.info("Data refreshed at %s", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+
+def start_scheduler():
+    """Import APScheduler, add the registered jobs and start it"""
+    global scheduler
+    from flask_apscheduler import APScheduler
+    
+    scheduler = APScheduler()
+    for job in SCHEDULED_JOBS:
+        scheduler.add_job(**job)
+    scheduler.init_app(app)
+    scheduler.start()
+    return scheduler
+
+# Held open by the one gunicorn worker that runs the scheduler (see start_scheduler_in_one_process)
+SCHEDULER_LOCK_FILE = os.path.join(COMPLETED_ORDERS_DIR, '.scheduler.lock')
+scheduler_lock = None
+
+def start_scheduler_in_one_process(lock_path=SCHEDULER_LOCK_FILE):
+    """Run the scheduler in exactly one of the processes calling this (the gunicorn workers).
+    
+    Each waits in a background thread for an exclusive lock on lock_path; the holder starts
+    the scheduler and keeps the lock until it exits. When that worker is recycled or dies,
+    the lock is released and one of the waiting workers takes the jobs over.
+    """
+    if fcntl is None:
+        return start_scheduler()
+    
+    def wait_for_lock():
+        global scheduler_lock
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        lock_file = open(lock_path, 'a')
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        scheduler_lock = lock_file
+        logger.info("Worker %s owns the scheduler", os.getpid())
+        start_scheduler()
+    
+    threading.Thread(target=wait_for_lock, name='scheduler-lock', daemon=True).start()
 
 def create_folders():
     """Create the necessary folders for static files and data."""
@@ -1281,6 +2274,7 @@ def get_tracking_status():
     return jsonify({
         'success': True,
         'tracking_count': len(COMPLETION_TRACKING['client_products']),
+        'tracking_window_hours': COMPLETION_TRACKING_TIME,
         'last_cleanup': COMPLETION_TRACKING['last_cleanup'].isoformat(),
         'persisted_to_disk': COMPLETION_TRACKING['persisted_to_disk'],
         'loaded_from_disk': COMPLETION_TRACKING['loaded_from_disk'],
@@ -1297,26 +2291,82 @@ def rebuild_tracking():
             'message': 'Rastreamento reconstruído com sucesso'
         })
     except Exception as e:
-        logger.exception(f"Error rebuilding tracking: {str(e)}")
+        logger.exception("Error rebuilding tracking: %s", e)
+        return jsonify({
+            'success': False,
+            'error': f'Erro: {str(e)}'
+        }), 500
+
+@app.route('/api/reports/archive', methods=['POST'])
+def archive_reports_api():
+    """API endpoint to archive closed months now"""
+    try:
+        result = archive_old_reports()
+        return jsonify({
+            'success': True,
+            **result,
+            'message': f"{result['archived_days']} dia(s) arquivado(s)"
+        })
+    except Exception as e:
+        logger.exception("Error archiving reports: %s", e)
         return jsonify({
             'success': False,
             'error': f'Erro: {str(e)}'
         }), 500
 
+# Caches are trimmed when the process goes over its memory budget; sizes at /api/debug/memory
+memory_monitor = memory.MemoryMonitor(budget_mb=performance.MEMORY_BUDGET_MB,
+                                      check_interval=performance.MEMORY_CHECK_INTERVAL)
+memory_monitor.register('data_cache', lambda: data_cache)
+memory_monitor.register('completion_tracking', lambda: COMPLETION_TRACKING['client_products'])
+memory_monitor.register('completion_index', lambda: completion_index)
+memory_monitor.register('report_digests', lambda: report_digests)
+memory_monitor.register('report_catalog', lambda: report_catalog)
+memory_monitor.register('day_orders', lambda: day_orders, day_orders.clear)
+memory_monitor.register('day_summaries', lambda: day_summaries, day_summaries.clear)
+memory_monitor.register('page_fragments', lambda: page_fragments, page_fragments.clear)
+memory_monitor.register('idempotency', lambda: (idempotency_cache, recent_completions))
+
+@app.after_request
+def check_memory_budget(response):
+    memory_monitor.tick()
+    return response
+
+@app.route('/api/debug/memory')
+def memory_stats_api():
+    """API endpoint with RSS, GC state, per-cache size estimates and top tracemalloc allocators"""
+    top = min(request.args.get('top', 20, type=int), 100)
+    return jsonify({
+        'success': True,
+        'tracing': tracemalloc.is_tracing(),
+        **memory_monitor.stats(top=top)
+    })
+
+@app.route('/api/debug/profiling')
+def profiling_stats_api():
+    """API endpoint with per-route latency histograms, in-flight counts and recent captures"""
+    if request_profiler is None:
+        return jsonify({
+            'success': False,
+            'error': 'Perfilamento desativado (PROFILING_ENABLED).'
+        }), 404
+    return jsonify({
+        'success': True,
+        'slow_threshold': request_profiler.slow_threshold,
+        'sample_rate': request_profiler.sample_rate,
+        'page_fragments': page_fragments.stats(),
+        **request_profiler.stats()
+    })
+
 if __name__ == '__main__':
     # Create necessary folders before starting the app
     create_folders()
     
     # Start the scheduler
-    scheduler.init_app(app)
-    scheduler.start()
+    start_scheduler()
     
-    # Load the completion tracking data with improved persistence
-    try:
-        load_completion_tracking()
-    except Exception as e:
-        logger.error(f"Error loading completion tracking: {e}")
-        # Continue anyway, this is not critical
+    # Load completion tracking, test the database and fill the cache while the app starts serving
+    start_warmup()
     
     # Run the app
     app.run(debug=True, host='0.0.0.0', port=5003)
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""Async read-only server for long-lived kiosk connections.
+
+Serves /api/pending-orders and /api/stats from the snapshot published by the Flask app, and
+the report reads (/api/reports/dates, /api/reports/range, /api/reports/orders) from the data
+files. One process holds hundreds of idle keep-alive or long-poll connections; the Flask app
+keeps every write endpoint.
+
+Long polling: GET /api/pending-orders?since=<version>[&timeout=30] waits until the snapshot
+version differs from <version> (or the timeout passes) and then returns the current orders.
+
+Usage:
+    python async_server.py [--host 0.0.0.0] [--port 5004]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+from config import performance
+from utils import json_backend
+from utils.report_archive import ReportArchive
+from utils.report_catalog import GENERATION_FILE, ReportCatalog
+from utils.report_orders import DayOrdersCache, SORT_FIELDS
+from utils.report_store import count_day, day_file_path, load_day
+from utils.report_summary import DaySummaryCache, GROUP_FIELDS, aggregate_range
+from utils.snapshot import SnapshotReader
+from utils.logging_setup import setup_logging
+
+logger = logging.getLogger('async_server')
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(PROJECT_DIR, 'data')
+
+MAX_HEADER_BYTES = 16 * 1024
+
+STATUS_TEXT = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+class HttpError(Exception):
+    """Error answered with {'success': False, 'error': message}"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def parse_date(value, message='Data deve estar no formato AAAA-MM-DD.'):
+    try:
+        return datetime.strptime(value or '', '%Y-%m-%d').date()
+    except ValueError:
+        raise HttpError(400, message)
+
+def int_param(params, name, default):
+    try:
+        return int(params.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+class ReadOnlyServer:
+    """Request handling and shared state for one server process"""
+
+    def __init__(self, data_dir):
+        self.snapshot = SnapshotReader(os.path.join(data_dir, 'snapshot.json'))
+        self.archive = ReportArchive(os.path.join(data_dir, 'archive'))
+
+        path_for = lambda date_key: day_file_path(data_dir, date_key)
+        load_orders = lambda date_key: load_day(data_dir, date_key, self.archive)
+        # No cache_path: the Flask app owns report_catalog.json
+        self.catalog = ReportCatalog(data_dir, path_for,
+                                     count_for=lambda date_key: count_day(data_dir, date_key, self.archive),
+                                     archive=self.archive,
+                                     generation_path=os.path.join(data_dir, GENERATION_FILE))
+        self.summaries = DaySummaryCache(path_for, load_orders,
+                                         max_days=performance.REPORT_SUMMARY_CACHE_DAYS,
+                                         sidecar_dir=os.path.join(data_dir, 'summaries'))
+        self.orders = DayOrdersCache(path_for, load_orders, max_days=performance.REPORT_ORDERS_CACHE_DAYS)
+
+        self.bodies = {}  # Pre-encoded snapshot responses, rebuilt once per snapshot
+        self.version = None
+        self.changed = None  # asyncio.Event replaced (and set) whenever the version changes
+        self.connections = 0
+
+    # Snapshot
+
+    async def watch_snapshot(self):
+        """Reload the snapshot when the file changes and wake long-poll waiters on a new version"""
+        self.changed = asyncio.Event()
+        while True:
+            try:
+                if self.snapshot.refresh():
+                    self._snapshot_reloaded()
+            except Exception as e:
+                logger.error("Error reloading snapshot: %s", e)
+            await asyncio.sleep(performance.SNAPSHOT_POLL_INTERVAL)
+
+    def _snapshot_reloaded(self):
+        snapshot = self.snapshot.snapshot
+        common = {
+            'is_cache': snapshot['is_cache'],
+            'last_update': snapshot['last_update'],
+            'connection_status': snapshot['connection_status'],
+            'version': snapshot['version'],
+        }
+        self.bodies = {
+            'pending': json_backend.dumps_bytes(dict(common, orders=snapshot['orders'])),
+            'stats': json_backend.dumps_bytes(dict(common, stats=snapshot['stats'])),
+        }
+        if snapshot['version'] != self.version:
+            self.version = snapshot['version']
+            changed, self.changed = self.changed, asyncio.Event()
+            changed.set()
+            logger.info("Serving snapshot %s", self.version)
+
+    def _snapshot_body(self, name):
+        if name not in self.bodies:
+            raise HttpError(503, 'Dados ainda não publicados pelo aplicativo principal.')
+        return self.bodies[name]
+
+    async def pending_orders(self, params):
+        since = params.get('since')
+        if since and since == self.version:
+            timeout = min(float(int_param(params, 'timeout', performance.LONG_POLL_TIMEOUT)),
+                          performance.LONG_POLL_MAX_TIMEOUT)
+            try:
+                await asyncio.wait_for(self.changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._snapshot_body('pending')
+
+    async def stats(self, params):
+        return self._snapshot_body('stats')
+
+    # Report reads (file IO runs in the default thread pool)
+
+    def report_dates(self, params):
+        start, end = params.get('from'), params.get('to')
+        for value in (start, end):
+            if value:
+                parse_date(value, 'Datas devem estar no formato AAAA-MM-DD.')
+
+        per_page = params.get('per_page')
+        page = max(int_param(params, 'page', 1), 1)
+        if per_page is not None:
+            per_page = min(max(int_param(params, 'per_page', 1), 1), performance.REPORT_DATES_MAX_PER_PAGE)
+        offset = (page - 1) * per_page if per_page else 0
+
+        date_keys, total = self.catalog.query(start, end, offset, per_page)
+        dates = [{
+            'date': date_key,
+            'formatted_date': datetime.strptime(date_key, '%Y-%m-%d').strftime('%d/%m/%Y'),
+            'count': self.catalog.count(date_key),
+        } for date_key in date_keys]
+        response = {'success': True, 'dates': dates, 'total': total}
+        if per_page is not None:
+            response.update(page=page, per_page=per_page)
+        return response
+
+    def report_range(self, params):
+        group_by = params.get('group_by', 'employee')
+        if group_by not in GROUP_FIELDS:
+            raise HttpError(400, f'group_by deve ser um de: {", ".join(GROUP_FIELDS)}.')
+        message = 'Parâmetros from e to são obrigatórios no formato AAAA-MM-DD.'
+        start = parse_date(params.get('from'), message)
+        end = parse_date(params.get('to'), message)
+        if end < start:
+            raise HttpError(400, 'A data final deve ser igual ou posterior à data inicial.')
+        if (end - start).days + 1 > performance.REPORT_RANGE_MAX_DAYS:
+            raise HttpError(400, f'O período máximo é de {performance.REPORT_RANGE_MAX_DAYS} dias.')
+
+        date_keys, _ = self.catalog.query(start.isoformat(), end.isoformat(), newest_first=False)
+        result = aggregate_range(date_keys, group_by, self.summaries)
+        return dict(success=True, group_by=group_by, **{'from': start.isoformat(), 'to': end.isoformat()}, **result)
+
+    def report_orders(self, params):
+        report_date = parse_date(params['date']) if params.get('date') else datetime.now().date()
+        sort = params.get('sort') or None
+        if sort is not None and sort not in SORT_FIELDS:
+            raise HttpError(400, f'sort deve ser um de: {", ".join(SORT_FIELDS)}.')
+        page = max(int_param(params, 'page', 1), 1)
+        per_page = min(max(int_param(params, 'per_page', 100), 1), performance.REPORT_ORDERS_MAX_PER_PAGE)
+
+        orders = self.orders.query(
+            report_date.isoformat(),
+            employee=params.get('employee') or None,
+            product=params.get('product') or None,
+            client=params.get('client') or None,
+            query=params.get('q') or None,
+            sort=sort,
+            descending=params.get('order', 'asc') == 'desc'
+        )
+        offset = (page - 1) * per_page
+        return {
+            'success': True,
+            'date': report_date.isoformat(),
+            'orders': orders[offset:offset + per_page],
+            'total': len(orders),
+            'page': page,
+            'per_page': per_page,
+        }
+
+    # HTTP
+
+    async def dispatch(self, method, target):
+        """Return (status, body bytes) for a request"""
+        if method not in ('GET', 'HEAD'):
+            raise HttpError(405, 'Este servidor atende apenas leituras (GET).')
+
+        url = urlsplit(target)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+
+        snapshot_routes = {
+            '/api/pending-orders': self.pending_orders,
+            '/api/stats': self.stats,
+        }
+        report_routes = {
+            '/api/reports/dates': self.report_dates,
+            '/api/reports/range': self.report_range,
+            '/api/reports/orders': self.report_orders,
+        }
+        if url.path in snapshot_routes:
+            return 200, await snapshot_routes[url.path](params)
+        if url.path in report_routes:
+            result = await asyncio.to_thread(report_routes[url.path], params)
+            return 200, json_backend.dumps_bytes(result)
+        raise HttpError(404, 'Endereço não encontrado.')
+
+    async def handle(self, reader, writer):
+        """Serve the requests of one connection (keep-alive until idle or closed)"""
+        if self.connections >= performance.ASYNC_MAX_CONNECTIONS:
+            writer.close()
+            return
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'),
+                                                  performance.ASYNC_KEEPALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                        asyncio.LimitOverrunError, ConnectionError):
+                    break
+
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, http_version = lines[0].split(' ', 2)
+                except ValueError:
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if http_version == 'HTTP/1.1' else connection == 'keep-alive'
+
+                # Read-only endpoints take no body; drain a small one if a client sent it anyway.
+                # A body left unread would be parsed as the next request, so those connections close.
+                request_error = None
+                try:
+                    body_length = int(headers.get('content-length') or 0)
+                    if body_length < 0:
+                        raise ValueError(body_length)
+                except ValueError:
+                    request_error = HttpError(400, 'Cabeçalho Content-Length inválido.')
+                    body_length = 0
+                    keep_alive = False
+                if 'transfer-encoding' in headers or body_length > MAX_HEADER_BYTES:
+                    keep_alive = False
+                elif body_length:
+                    await reader.readexactly(body_length)
+
+                try:
+                    if request_error is not None:
+                        raise request_error
+                    status, body = await self.dispatch(method, target)
+                except HttpError as e:
+                    status, body = e.status, json_backend.dumps_bytes({'success': False, 'error': e.message})
+                except Exception as e:
+                    logger.exception("Error serving %s: %s", target, e)
+                    status, body = 500, json_backend.dumps_bytes({'success': False, 'error': str(e)})
+
+                response_headers = [
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                    'Content-Type: application/json; charset=utf-8',
+                    f'Content-Length: {len(body)}',
+                    'Cache-Control: no-store',
+                    'Access-Control-Allow-Origin: *',
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                ]
+                if self.version:
+                    response_headers.append(f'X-Snapshot-Version: {self.version}')
+                writer.write(('\r\n'.join(response_headers) + '\r\n\r\n').encode('latin-1'))
+                if method != 'HEAD':
+                    writer.write(body)
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+async def serve(host, port, data_dir=DATA_DIR):
+    state = ReadOnlyServer(data_dir)
+    watcher = asyncio.create_task(state.watch_snapshot())
+    server = await asyncio.start_server(state.handle, host, port, limit=MAX_HEADER_BYTES,
+                                        backlog=performance.ASYNC_MAX_CONNECTIONS)
+    logger.info("Async read-only server listening on %s:%s", host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        watcher.cancel()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Async read-only server for kiosk connections')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=performance.ASYNC_SERVER_PORT)
+    args = parser.parse_args()
+
+    # Same log file as the Flask app: SharedRotatingFileHandler coordinates rotation between processes
+    setup_logging(
+        os.path.join(PROJECT_DIR, performance.LOG_FILE),
+        level=performance.LOG_LEVEL,
+        logger_levels=performance.LOG_LEVELS,
+        max_bytes=performance.LOG_FILE_MAX_BYTES,
+        backup_count=performance.LOG_FILE_BACKUP_COUNT,
+        queue_size=performance.LOG_QUEUE_SIZE,
+        console=performance.LOG_CONSOLE
+    )
+
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for completion key normalization (per-row cost before/after)"""
+
+import argparse
+import logging
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils import normalization  # noqa: E402
+
+logger = logging.getLogger('app')
+
+CLIENTS = [
+    "Farmácia São João", "Drogaria Moderna", "Farmácia Popular", "Drogaria Saúde",
+    "Farmácia Central", "Drogaria Bem Estar", "Farmácia Vida", "Drogaria Esperança",
+]
+PRODUCTS = ["P500", "I600", "D1000", "A500", "L10", "O20", "VC1000", "CB", 78912, "AB-12_3"]
+
+
+def legacy_completion_key(client_name, product_code):
+    """Implementation of app.get_completion_key before the normalization module"""
+    if not client_name or product_code is None:
+        logger.warning(f"Invalid completion key generation attempt: client='{client_name}', product='{product_code}'")
+        return None
+    if not isinstance(product_code, str):
+        product_code = str(product_code)
+        logger.debug(f"Converted product_code from {type(product_code)} to string: '{product_code}'")
+    if not isinstance(client_name, str):
+        client_name = str(client_name)
+        logger.debug(f"Converted client_name from {type(client_name)} to string: '{client_name}'")
+    normalized_client = ''.join(c.lower() for c in client_name if c.isalnum())
+    normalized_product = ''.join(c.lower() for c in product_code if c not in ' -_')
+    key = f"{normalized_client}:{normalized_product}"
+    logger.debug(f"Generated completion key: {key} from client='{client_name}', product='{product_code}'")
+    return key
+
+
+def make_rows(count, seed=42):
+    """Build (client, product) pairs resembling the pending orders view"""
+    rng = random.Random(seed)
+    return [(f"{rng.choice(CLIENTS)} {rng.randint(1, count)}", rng.choice(PRODUCTS)) for _ in range(count)]
+
+
+def per_row_ns(func, rows, repeat):
+    """Best-of-N time of func(rows), in nanoseconds per row"""
+    best = min(timeit.repeat(lambda: func(rows), number=1, repeat=repeat))
+    return best * 1e9 / len(rows)
+
+
+def run(rows_count, repeat):
+    rows = make_rows(rows_count)
+
+    def legacy(rows):
+        return [legacy_completion_key(c, p) for c, p in rows]
+
+    def memo_cold(rows):
+        normalization.clear_cache()
+        return [normalization.completion_key(c, p) for c, p in rows]
+
+    def memo_warm(rows):
+        return [normalization.completion_key(c, p) for c, p in rows]
+
+    def bulk_warm(rows):
+        return normalization.keys_for(rows)
+
+    assert legacy(rows) == memo_cold(rows) == bulk_warm(rows)
+
+    results = {
+        'legacy': per_row_ns(legacy, rows, repeat),
+        'completion_key (cold cache)': per_row_ns(memo_cold, rows, repeat),
+        'completion_key (warm cache)': per_row_ns(memo_warm, rows, repeat),
+        'keys_for (warm cache)': per_row_ns(bulk_warm, rows, repeat),
+    }
+
+    print(f"{rows_count} rows, best of {repeat}")
+    for name, value in results.items():
+        print(f"  {name:<30} {value:8.0f} ns/row  ({results['legacy'] / value:4.1f}x)")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2000, help='rows per refresh (<= key cache size to measure warm hits)')
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Benchmark JSON backends on realistic day files and /api/pending-orders payloads"""
+
+import argparse
+import json
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils import json_backend  # noqa: E402
+from utils.mock_data import get_mock_orders  # noqa: E402
+
+
+def make_day_file(count, seed=42):
+    """Completed orders shaped like the records written by save_completed_order"""
+    rng = random.Random(seed)
+    start = datetime.now().replace(hour=7, minute=0, second=0, microsecond=0)
+    employees = ['Richard', 'Cassio', 'Matheus', 'Marlon']
+    orders = []
+    for i in range(count):
+        when = start + timedelta(seconds=rng.randint(0, 12 * 3600))
+        product_code = f"P{rng.randint(100, 9999)}"
+        client_name = f"Farmácia São João {rng.randint(1, 300)}"
+        orders.append({
+            'product_code': product_code,
+            'product_name': f"Produto {product_code} 500mg",
+            'client_name': client_name,
+            'completed_by': rng.choice(employees),
+            'separador': 'N/A',
+            'client_ip': f"192.168.0.{rng.randint(2, 254)}",
+            'user_agent': 'Mozilla/5.0 (X11; Linux armv7l) AppleWebKit/537.36 (KHTML, like Gecko) Chromium/92.0',
+            'timestamp': when.isoformat(),
+            'processing_date': when.date().isoformat(),
+            'id': f"{when.strftime('%Y%m%d%H%M%S')}-Farm{i % 10}-{product_code[:5]}-{rng.randint(100, 999)}",
+        })
+    return orders
+
+
+def make_pending_payload(products, seed=42):
+    """Payload shaped like the /api/pending-orders response"""
+    random.seed(seed)
+    orders = []
+    while len(orders) < products:
+        orders.extend(get_mock_orders())
+    return {
+        'orders': orders[:products],
+        'is_cache': False,
+        'last_update': datetime.now().strftime('%d/%m/%Y, %H:%M:%S'),
+        'connection_status': 'connected',
+    }
+
+
+def best_ms(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def bench(label, data, repeat):
+    print(f"\n{label}")
+    print(f"  {'backend':<22} {'encode ms':>10} {'decode ms':>10} {'bytes':>10}")
+
+    legacy = json.dumps(data, ensure_ascii=False, indent=2, default=str)
+    rows = [('json (indent=2, old)',
+             best_ms(lambda: json.dumps(data, ensure_ascii=False, indent=2, default=str), repeat),
+             best_ms(lambda: json.loads(legacy), repeat),
+             len(legacy.encode('utf-8')))]
+
+    for name in reversed(json_backend.available_backends()):
+        json_backend.select_backend(name)
+        encoded = json_backend.dumps_bytes(data)
+        rows.append((f"{name} (compact)",
+                     best_ms(lambda: json_backend.dumps_bytes(data), repeat),
+                     best_ms(lambda: json_backend.loads(encoded), repeat),
+                     len(encoded)))
+    json_backend.select_backend('auto')
+
+    for name, encode, decode, size in rows:
+        print(f"  {name:<22} {encode:10.2f} {decode:10.2f} {size:10d}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=2000, help='completed orders in the day file')
+    parser.add_argument('--products', type=int, default=200, help='pending products in the API payload')
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    bench(f"Day file ({args.orders} completed orders)", make_day_file(args.orders), args.repeat)
+    bench(f"/api/pending-orders ({args.products} products)", make_pending_payload(args.products), args.repeat)
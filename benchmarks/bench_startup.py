@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Measure `import app` time in fresh interpreters and check it against IMPORT_TIME_BUDGET_MS"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from config import performance  # noqa: E402
+
+# Prints the import wall time in ms; -X importtime writes per-module times to stderr
+IMPORT_SCRIPT = (
+    "import time; started = time.perf_counter(); import app; "
+    "print((time.perf_counter() - started) * 1000)"
+)
+
+
+def import_once(module_times):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', IMPORT_SCRIPT],
+        cwd=PROJECT_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"import app failed:\n{result.stderr[-2000:]}")
+
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if len(name) - len(name.lstrip()) != 3:
+            continue  # Keep the modules imported directly by app (one level below it)
+        module_times.setdefault(name.strip(), []).append(int(cumulative) / 1000)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=performance.IMPORT_TIME_BUDGET_MS)
+    parser.add_argument('--top', type=int, default=10, help='Slowest direct imports to list')
+    args = parser.parse_args()
+
+    module_times = {}
+    runs = [import_once(module_times) for _ in range(args.runs)]
+    median = statistics.median(runs)
+
+    print(f"import app: median {median:.0f} ms, min {min(runs):.0f} ms, max {max(runs):.0f} ms "
+          f"({args.runs} fresh interpreters)")
+    print(f"\n  {'direct import':<40} {'median ms':>10}")
+    slowest = sorted(module_times.items(), key=lambda item: -statistics.median(item[1]))
+    for name, times in slowest[:args.top]:
+        print(f"  {name:<40} {statistics.median(times):>10.1f}")
+
+    within = median <= args.budget_ms
+    print(f"\nBudget {args.budget_ms:.0f} ms: {'OK' if within else 'EXCEEDED'}")
+    return 0 if within else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""HTTP load test: how many kiosks can one server take?
+
+Boots the app on a local threaded server, with a stand-in for the ERP database that answers
+the pending-orders query with canned rows after a configurable latency. Closed-loop clients
+(one keep-alive connection each) then drive a weighted mix of page loads, API polls and
+completions. The report gives throughput, p50/p95/p99 latency and error rates per endpoint,
+for each concurrency level.
+
+    python benchmarks/load_test.py --concurrency 1 4 16 --duration 20 --db-latency 0.3
+    python benchmarks/load_test.py --url http://pi.local:5000 --concurrency 8   # a running server (e.g. gunicorn)
+
+Against --url the completions are left out of the mix unless --allow-writes is given,
+since they write to that server's real report files.
+"""
+
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from run_benchmarks import Sandbox, git_commit, make_view_rows
+
+DEFAULT_MIX = {
+    '/': 15,
+    '/api/pending-orders': 40,
+    '/api/stats': 25,
+    '/api/complete-order': 5,
+    '/completed': 15,
+}
+
+
+def parse_mix(text):
+    """'/=20,/api/stats=10' -> {'/': 20, '/api/stats': 10}"""
+    mix = {}
+    for part in text.split(','):
+        path, _, weight = part.strip().rpartition('=')
+        mix[path] = float(weight)
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def start_local_server(rows, db_latency, db_jitter):
+    """Import the app in a scratch directory with the fake ERP and serve it; returns (url, close)"""
+    from werkzeug.serving import make_server
+
+    sandbox = Sandbox()
+    app = sandbox.import_app()
+    from utils.db_connection import DatabaseConnection
+    from utils.profiling import timed
+
+    class FakeDatabaseConnection(DatabaseConnection):
+        """DatabaseConnection answering every query with the canned view rows after a delay"""
+
+        def _wait(self):
+            time.sleep(max(db_latency + random.uniform(-db_jitter, db_jitter), 0))
+
+        def connect(self):
+            return True
+
+        def disconnect(self):
+            pass
+
+        @timed('db')
+        def execute_query(self, query, params=None):
+            self._wait()
+            return [dict(row) for row in rows], None
+
+        @timed('db')
+        def execute_non_query(self, query, params=None):
+            self._wait()
+            return 0, None
+
+        @timed('db')
+        def test_connection(self):
+            self._wait()
+            return True, 'Fake ERP', {'server': 'fake'}
+
+    app.db = FakeDatabaseConnection('fake', 'fake', 'fake', 'fake')
+    server = make_server('127.0.0.1', 0, app.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name='load-test-server', daemon=True)
+    thread.start()
+
+    def close():
+        server.shutdown()
+        sandbox.close()
+
+    return f"http://127.0.0.1:{server.server_port}", close
+
+
+class Client:
+    """One simulated kiosk: a keep-alive connection issuing requests back to back"""
+
+    def __init__(self, url, mix, completions, think_time, rng):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.paths = list(mix)
+        self.weights = list(mix.values())
+        self.completions = completions
+        self.think_time = think_time
+        self.rng = rng
+        self.connection = None
+
+    def request(self, path):
+        """Send one request; returns (status, seconds), status None on a connection error"""
+        method, body, headers = 'GET', None, {}
+        if path == '/api/complete-order':
+            product_code, client_name = self.rng.choice(self.completions)
+            method = 'POST'
+            body = json.dumps({'product_code': product_code, 'product_name': f"Produto {product_code}",
+                               'client_name': client_name, 'completed_by': 'Teste de carga',
+                               'separador': 'N/A'})
+            headers = {'Content-Type': 'application/json', 'Idempotency-Key': uuid.uuid4().hex}
+
+        started = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+            if response.getheader('Connection', '').lower() == 'close':
+                self.close()
+            return response.status, time.perf_counter() - started
+        except (OSError, http.client.HTTPException):
+            self.close()
+            return None, time.perf_counter() - started
+
+    def run(self, stop_at, record):
+        while time.perf_counter() < stop_at:
+            path = self.rng.choices(self.paths, self.weights)[0]
+            status, seconds = self.request(path)
+            record(path, status, seconds)
+            if self.think_time:
+                time.sleep(self.rng.uniform(0, 2 * self.think_time))
+        self.close()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def run_level(url, mix, completions, concurrency, duration, warmup, think_time, seed):
+    """Drive the mix with `concurrency` clients; returns the per-endpoint report"""
+    samples = {path: [] for path in mix}
+    statuses = {path: Counter() for path in mix}
+    lock = threading.Lock()
+    measure_from = time.perf_counter() + warmup
+    stop_at = measure_from + duration
+
+    def record(path, status, seconds):
+        if time.perf_counter() - seconds < measure_from:
+            return  # Started during the warm-up
+        with lock:
+            samples[path].append(seconds)
+            statuses[path][status or 'connection_error'] += 1
+
+    clients = [Client(url, mix, completions, think_time, random.Random(seed + index))
+               for index in range(concurrency)]
+    threads = [threading.Thread(target=client.run, args=(stop_at, record), daemon=True) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    endpoints = {}
+    for path in mix:
+        latencies = sorted(samples[path])
+        count = len(latencies)
+        errors = sum(n for status, n in statuses[path].items()
+                     if status == 'connection_error' or status >= 500)
+        endpoints[path] = {
+            'requests': count,
+            'throughput_rps': round(count / duration, 2),
+            'error_rate': round(errors / count, 4) if count else None,
+            'statuses': {str(status): n for status, n in sorted(statuses[path].items(), key=str)},
+            'p50_ms': _ms(percentile(latencies, 0.50)),
+            'p95_ms': _ms(percentile(latencies, 0.95)),
+            'p99_ms': _ms(percentile(latencies, 0.99)),
+            'max_ms': _ms(latencies[-1] if latencies else None),
+        }
+    total = sum(endpoint['requests'] for endpoint in endpoints.values())
+    return {
+        'concurrency': concurrency,
+        'duration_s': duration,
+        'throughput_rps': round(total / duration, 2),
+        'endpoints': endpoints,
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def load_completions(url, rows):
+    """(product_code, client_name) pairs to complete: from the canned rows, or the server's pending list"""
+    if rows:
+        return [(row['Produto_Codigo'], row['Cliente']) for row in rows]
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    try:
+        connection.request('GET', '/api/pending-orders')
+        orders = json.loads(connection.getresponse().read())['orders']
+    finally:
+        connection.close()
+    return [(order['codigo'], client_name) for order in orders for client_name in order['clientes']]
+
+
+def print_level(level):
+    print(f"\n{level['concurrency']} concurrent clients: {level['throughput_rps']:.1f} req/s", file=sys.stderr)
+    print(f"  {'endpoint':<24} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}", file=sys.stderr)
+    for path, endpoint in level['endpoints'].items():
+        error_rate = '-' if endpoint['error_rate'] is None else f"{endpoint['error_rate']:.1%}"
+        print(f"  {path:<24} {endpoint['throughput_rps']:8.1f} {_fmt(endpoint['p50_ms'])} "
+              f"{_fmt(endpoint['p95_ms'])} {_fmt(endpoint['p99_ms'])} {error_rate:>7}", file=sys.stderr)
+
+
+def _fmt(value):
+    return f"{'-':>8}" if value is None else f"{value:8.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the app with a weighted request mix')
+    parser.add_argument('--url', help='test a running server instead of booting one with the fake ERP')
+    parser.add_argument('--allow-writes', action='store_true', help='keep completions in the mix against --url')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8, 16], help='clients per level')
+    parser.add_argument('--duration', type=float, default=15, help='measured seconds per level')
+    parser.add_argument('--warmup', type=float, default=2, help='unmeasured seconds before each level')
+    parser.add_argument('--think-time', type=float, default=0, help='mean pause between a client\'s requests (s)')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX, help="weights, e.g. '/=20,/api/stats=10'")
+    parser.add_argument('--rows', type=int, default=2000, help='rows returned by the fake ERP view')
+    parser.add_argument('--db-latency', type=float, default=0.2, help='seconds each fake ERP query takes')
+    parser.add_argument('--db-jitter', type=float, default=0.05, help='+/- seconds of random query latency')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args()
+
+    mix = dict(args.mix)
+    if args.url and not args.allow_writes:
+        mix.pop('/api/complete-order', None)
+
+    rows = None
+    close = None
+    url = args.url
+    if url is None:
+        rows = make_view_rows(args.rows)
+        url, close = start_local_server(rows, args.db_latency, args.db_jitter)
+    try:
+        completions = load_completions(url, rows) if '/api/complete-order' in mix else []
+        if '/api/complete-order' in mix and not completions:
+            mix.pop('/api/complete-order')
+        levels = []
+        for concurrency in args.concurrency:
+            level = run_level(url, mix, completions, concurrency, args.duration, args.warmup,
+                              args.think_time, args.seed)
+            print_level(level)
+            levels.append(level)
+    finally:
+        if close is not None:
+            close()
+
+    results = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'target': args.url or 'local threaded server with fake ERP',
+        'db_latency_s': None if args.url else args.db_latency,
+        'rows': None if args.url else args.rows,
+        'mix': mix,
+        'think_time_s': args.think_time,
+        'levels': levels,
+    }
+    encoded = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(encoded + '\n')
+    else:
+        print(encoded)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""Time the hot paths of app.py on synthetic data at growing sizes, without the ERP.
+
+The app is imported from a scratch copy of the project (symlinks) so every file it writes
+lands in a temporary data/ directory. The ERP query is answered with canned view rows.
+
+    python benchmarks/run_benchmarks.py                          # 1k, 10k and 100k rows
+    python benchmarks/run_benchmarks.py --sizes 1000 --output results.json
+    python benchmarks/run_benchmarks.py --compare baseline.json  # exit 1 on a regression
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+PROJECT_ENTRIES = ['app.py', 'utils', 'config', 'templates', 'static']
+
+RESULTS_FORMAT = 1
+
+CLIENTS = [
+    "Farmácia São João", "Drogaria Moderna", "Farmácia Popular", "Drogaria Saúde",
+    "Farmácia Central", "Drogaria Bem Estar", "Farmácia Vida", "Drogaria Esperança",
+]
+EMPLOYEES = ['Richard', 'Cassio', 'Matheus', 'Marlon']
+
+# Rows of the view queried by the delete benchmark's cache refresh (keeps the day file dominant)
+REFRESH_ROWS = 100
+
+
+def make_view_rows(count, seed=42):
+    """Rows shaped like VIEW_PB_NF_Cancelada as returned by DatabaseConnection.execute_query"""
+    rng = random.Random(seed)
+    products = max(count // 20, 50)
+    clients = max(count // 5, 50)
+    start = datetime(2025, 1, 1, 7, 0)
+    rows = []
+    for _ in range(count):
+        code = f"P{rng.randint(1, products):05d}"
+        when = start + timedelta(minutes=rng.randint(0, 60 * 24 * 60))
+        rows.append({
+            'Data_Ocorrencia': when.strftime('%d/%m/%Y, %H:%M:%S'),
+            'Separador': rng.choice(EMPLOYEES),
+            'Cliente': f"{rng.choice(CLIENTS)} {rng.randint(1, clients)}",
+            'Produto': f"Produto {code} 500mg",
+            'Pedido_Status': 'Conferido',
+            'Ocorrencia_Tipo': 'Espera por Produto',
+            'Ocorrencia_Texto': 'Aguardando reposição do fornecedor',
+            'Produto_Codigo': code,
+        })
+    return rows
+
+
+def make_day_orders(count, day, seed=42):
+    """Completed orders shaped like the records written by save_completed_order"""
+    rng = random.Random(seed)
+    start = datetime.combine(day, datetime.min.time()).replace(hour=7)
+    orders = []
+    for i in range(count):
+        when = start + timedelta(seconds=rng.randint(0, 12 * 3600))
+        code = f"P{rng.randint(1, 5000):05d}"
+        orders.append({
+            'product_code': code,
+            'product_name': f"Produto {code} 500mg",
+            'client_name': f"{rng.choice(CLIENTS)} {rng.randint(1, 2000)}",
+            'completed_by': rng.choice(EMPLOYEES),
+            'separador': 'N/A',
+            'client_ip': '192.168.0.10',
+            'user_agent': 'Mozilla/5.0 (X11; Linux armv7l) Chromium/92.0',
+            'timestamp': when.isoformat(),
+            'processing_date': day.isoformat(),
+            'id': f"{when.strftime('%Y%m%d%H%M%S')}-bench-{code}-{i}",
+        })
+    return orders
+
+
+def summarize(timings):
+    """Milliseconds per operation: median, min, mean and max over the runs"""
+    values = [seconds * 1000 for seconds in timings]
+    return {
+        'runs': len(values),
+        'median_ms': round(statistics.median(values), 3),
+        'min_ms': round(min(values), 3),
+        'mean_ms': round(statistics.fmean(values), 3),
+        'max_ms': round(max(values), 3),
+    }
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+class Sandbox:
+    """Scratch project directory sharing the sources, with its own data/ and log files"""
+
+    def __init__(self):
+        self.root = Path(tempfile.mkdtemp(prefix='monitor-bench-'))
+        for entry in PROJECT_ENTRIES:
+            os.symlink(PROJECT_DIR / entry, self.root / entry)
+        self.data_dir = self.root / 'data'
+
+    def import_app(self):
+        os.environ.setdefault('DB_RETRIES', '1')
+        os.environ.setdefault('DB_RETRY_DELAY', '0')
+        os.environ['OFFLINE_MODE'] = 'false'
+        sys.path.insert(0, str(self.root))
+        import app
+        return app
+
+    def close(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+class Benchmarks:
+    def __init__(self, app, repeat):
+        from utils import normalization
+        self.app = app
+        self.repeat = repeat
+        self.clear_key_cache = normalization.clear_cache
+
+    def reset(self):
+        """Empty data/ and every in-memory structure that mirrors it"""
+        app = self.app
+        for entry in os.listdir(app.COMPLETED_ORDERS_DIR):
+            path = os.path.join(app.COMPLETED_ORDERS_DIR, entry)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        app.COMPLETION_TRACKING['client_products'].clear()
+        self.reset_digests()
+        app.day_orders.clear()
+        app.day_summaries.clear()
+        self.clear_key_cache()
+
+    def write_day(self, day, orders):
+        path = self.app.get_completion_file_path(day)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(orders, f, ensure_ascii=False)
+        self.app.completion_index.invalidate(day.isoformat())
+        return path
+
+    def canned_view(self, rows):
+        self.app.db.execute_query = lambda query, *args, **kwargs: (rows, None)
+
+    # Benchmarks; each returns {name: summary}
+
+    def pending_orders(self, size):
+        app = self.app
+        self.reset()
+        rows = make_view_rows(size)
+        self.canned_view(rows)
+        # A tenth of the waiting pairs already completed, so the filter has work to do
+        for row in rows[::10]:
+            app.COMPLETION_TRACKING['client_products'].add(app.get_completion_key(row['Cliente'], row['Produto_Codigo']))
+        app.fetch_pending_orders()  # Warm the key memo, as after the first refresh
+        return {
+            'fetch_pending_orders': summarize(measure(app.fetch_pending_orders, self.repeat)),
+            'get_pending_orders': summarize(measure(app.get_pending_orders, self.repeat)),
+        }
+
+    def completion_key(self, size):
+        app = self.app
+        rows = [(row['Cliente'], row['Produto_Codigo']) for row in make_view_rows(size)]
+
+        def cold():
+            self.clear_key_cache()
+            for client_name, product_code in rows:
+                app.get_completion_key(client_name, product_code)
+
+        def warm():
+            for client_name, product_code in rows:
+                app.get_completion_key(client_name, product_code)
+
+        return {
+            'get_completion_key (cold)': summarize(measure(cold, self.repeat)),
+            'get_completion_key (warm)': summarize(measure(warm, self.repeat)),
+        }
+
+    def save_completed_order(self, size):
+        app = self.app
+        self.reset()
+        self.write_day(date.today(), make_day_orders(size, date.today()))
+        counter = iter(range(10 ** 9))
+
+        def save():
+            i = next(counter)
+            success, error = app.save_completed_order({
+                'product_code': f"B{i:05d}", 'product_name': 'Produto de teste',
+                'client_name': f"Cliente Bench {i}", 'completed_by': 'Richard', 'separador': 'N/A',
+            })
+            if not success:
+                raise RuntimeError(error)
+
+        save()  # First save indexes the day
+        return {'save_completed_order': summarize(measure(save, self.repeat))}
+
+    def delete_order(self, size):
+        app = self.app
+        self.reset()
+        self.canned_view(make_view_rows(REFRESH_ROWS))
+        orders = make_day_orders(size, date.today())
+        self.write_day(date.today(), orders)
+        # Stay under the tombstone compaction threshold so each delete is the plain append
+        order_ids = iter(order['id'] for order in orders[::max(size // 50, 1)])
+        client = app.app.test_client()
+
+        def delete():
+            response = client.post('/api/delete-order', json={'order_id': next(order_ids),
+                                                              'report_date': date.today().isoformat()})
+            status = response.status_code
+            response.close()
+            if status != 200:
+                raise RuntimeError(f"delete-order returned {status}")
+
+        first = measure(delete, 1)
+        repeat = min(self.repeat, app.performance.TOMBSTONE_COMPACT_THRESHOLD - 2)
+        return {
+            'delete_order (first, builds index)': summarize(first),
+            'delete_order': summarize(measure(delete, repeat)),
+        }
+
+    def rebuild_tracking(self, size):
+        app = self.app
+        self.reset()
+        today = date.today()
+        per_day = max(size // 30, 1)
+        for offset in range(30):
+            day = today - timedelta(days=offset)
+            self.write_day(day, make_day_orders(per_day, day, seed=offset))
+
+        def cold():
+            self.reset_digests()
+            app.rebuild_tracking_from_all_reports()
+
+        return {
+            'rebuild_tracking_from_all_reports (cold)': summarize(measure(cold, self.repeat)),
+            'rebuild_tracking_from_all_reports (warm)': summarize(measure(app.rebuild_tracking_from_all_reports,
+                                                                          self.repeat)),
+        }
+
+    def reset_digests(self):
+        app = self.app
+        try:
+            os.remove(os.path.join(app.COMPLETED_ORDERS_DIR, 'report_digests.json'))
+        except FileNotFoundError:
+            pass
+        app.report_digests = app.ReportDigestCache(
+            os.path.join(app.COMPLETED_ORDERS_DIR, 'report_digests.json'),
+            executor=app.performance.REPORT_DIGEST_EXECUTOR,
+            max_workers=app.performance.REPORT_DIGEST_WORKERS
+        )
+
+    def pending_orders_json(self, size):
+        app = self.app
+        self.reset()
+        self.canned_view(make_view_rows(size))
+        orders = app.fetch_pending_orders()
+        payload = {
+            'orders': orders,
+            'is_cache': app.data_cache['is_cache'],
+            'last_update': app.data_cache['last_update'],
+            'connection_status': app.data_cache['connection_status']['status'],
+        }
+
+        def serialize():
+            with app.app.app_context():
+                app.jsonify(payload).get_data()
+
+        return {'/api/pending-orders JSON': summarize(measure(serialize, self.repeat))}
+
+    def run(self, size):
+        results = {}
+        for bench in (self.pending_orders, self.completion_key, self.save_completed_order,
+                      self.delete_order, self.rebuild_tracking, self.pending_orders_json):
+            results.update(bench(size))
+        return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Return (size, benchmark, baseline ms, current ms) for medians slower than baseline by > tolerance"""
+    regressions = []
+    for size, benchmarks in results['sizes'].items():
+        for name, summary in benchmarks.items():
+            previous = baseline.get('sizes', {}).get(size, {}).get(name)
+            if previous and summary['median_ms'] > previous['median_ms'] * (1 + tolerance):
+                regressions.append((size, name, previous['median_ms'], summary['median_ms']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the hot paths of app.py on synthetic data')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='rows per dataset')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per benchmark')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='baseline results JSON; exit 1 if a median is slower beyond --tolerance')
+    parser.add_argument('--tolerance', type=float, default=0.20, help='allowed slowdown against the baseline')
+    args = parser.parse_args()
+
+    sandbox = Sandbox()
+    try:
+        app = sandbox.import_app()
+        from utils import json_backend
+        benchmarks = Benchmarks(app, args.repeat)
+
+        results = {
+            'format': RESULTS_FORMAT,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'json_backend': json_backend.backend_name(),
+            'write_fsync': app.performance.WRITE_FSYNC,
+            'repeat': args.repeat,
+            'sizes': {},
+        }
+        # Untimed pass: one-off costs (lazy imports, first files and threads) stay out of the results
+        benchmarks.run(min(min(args.sizes), 1000))
+        for size in args.sizes:
+            print(f"\n{size} rows", file=sys.stderr)
+            size_results = benchmarks.run(size)
+            results['sizes'][str(size)] = size_results
+            for name, summary in size_results.items():
+                print(f"  {name:<45} median {summary['median_ms']:10.2f} ms  "
+                      f"(min {summary['min_ms']:.2f}, max {summary['max_ms']:.2f})", file=sys.stderr)
+    finally:
+        sandbox.close()
+
+    encoded = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(encoded + '\n')
+    else:
+        print(encoded)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for size, name, previous, current in regressions:
+            print(f"REGRESSION {size} rows {name}: {previous:.2f} ms -> {current:.2f} ms", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""Build the static assets served in production.
+
+Each asset listed in ASSETS is minified, named after a hash of its contents
+(js/main.js -> dist/js/main.3f9a0c12d4.js) and gzipped next to it. The mapping is written to
+static/dist/manifest.json, which asset_url() in the templates reads. Since a changed file gets a
+new name, the built files are served with immutable cache headers and kiosks only download
+them again after a deploy.
+
+Usage:
+    python build_assets.py           # Build static/dist/
+    python build_assets.py --check   # Exit 1 if static/dist/ is missing or out of date
+"""
+
+import argparse
+import gzip
+import hashlib
+import os
+import re
+import sys
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(PROJECT_DIR))
+
+from utils import json_backend  # noqa: E402
+from utils.assets import DIST_DIR, MANIFEST_NAME  # noqa: E402
+
+STATIC_DIR = PROJECT_DIR / 'static'
+
+ASSETS = [
+    'js/main.js',
+    'js/products.js',
+    'js/completed.js',
+    'css/styles.css',
+    'css/print.css',
+]
+
+GZIP_LEVEL = 9
+
+# JavaScript
+
+_WORD_CHARS = re.compile(r'[A-Za-z0-9_$\\\u0080-\uffff]')
+
+# A '/' after these starts a regular expression literal rather than a division
+_REGEX_AFTER_CHARS = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_AFTER_WORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void',
+                      'throw', 'instanceof', 'yield', 'await'}
+
+# A line break after or before these can go without changing how the code parses
+_NO_BREAK_AFTER = set('{[(,;:=')
+_NO_BREAK_BEFORE = set(')]},;.:')
+
+def _is_word(char):
+    return bool(_WORD_CHARS.match(char))
+
+class _JsMinifier:
+    """Drops comments and collapses whitespace; strings, template literals and regexes are kept as is.
+
+    Line breaks are kept wherever dropping one could change automatic semicolon insertion.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.index = 0
+        self.out = []
+        self.pending = ''  # Whitespace seen since the last token: '', ' ' or '\n'
+
+    def minify(self):
+        self._code(nested=False)
+        return ''.join(self.out).strip() + '\n'
+
+    def _emit(self, text):
+        if self.pending and self.out:
+            last, first = self.out[-1][-1], text[0]
+            if self.pending == '\n' and last not in _NO_BREAK_AFTER and first not in _NO_BREAK_BEFORE:
+                self.out.append('\n')
+            elif (_is_word(last) and _is_word(first)) or (last in '+-' and first in '+-'):
+                self.out.append(' ')
+        self.pending = ''
+        self.out.append(text)
+
+    def _code(self, nested):
+        """Copy code up to the end of the source, or up to the '}' closing a template ${...}"""
+        source = self.source
+        depth = 0
+        while self.index < len(source):
+            char = source[self.index]
+            if char in ' \t\r\n':
+                end = self.index
+                while end < len(source) and source[end] in ' \t\r\n':
+                    end += 1
+                self._whitespace('\n' in source[self.index:end])
+                self.index = end
+            elif source.startswith('//', self.index):
+                end = source.find('\n', self.index)
+                self.index = len(source) if end == -1 else end
+            elif source.startswith('/*', self.index):
+                end = source.find('*/', self.index + 2)
+                end = len(source) if end == -1 else end + 2
+                self._whitespace('\n' in source[self.index:end])
+                self.index = end
+            elif char in '\'"':
+                self._emit(self._quoted(char))
+            elif char == '`':
+                self._template()
+            elif char == '/' and self._regex_allowed():
+                self._emit(self._regex())
+            elif _is_word(char):
+                end = self.index
+                while end < len(source) and _is_word(source[end]):
+                    end += 2 if source[end] == '\\' else 1
+                self._emit(source[self.index:end])
+                self.index = end
+            else:
+                if nested and char == '{':
+                    depth += 1
+                elif nested and char == '}':
+                    if depth == 0:
+                        self.pending = ''
+                        return
+                    depth -= 1
+                self._emit(char)
+                self.index += 1
+
+    def _whitespace(self, newline):
+        if newline:
+            self.pending = '\n'
+        elif not self.pending:
+            self.pending = ' '
+
+    def _quoted(self, quote):
+        source = self.source
+        end = self.index + 1
+        while end < len(source) and source[end] != quote:
+            end += 2 if source[end] == '\\' else 1
+        text = source[self.index:end + 1]
+        self.index = end + 1
+        return text
+
+    def _template(self):
+        source = self.source
+        self._emit('`')
+        self.index += 1
+        start = self.index
+        while self.index < len(source):
+            char = source[self.index]
+            if char == '\\':
+                self.index += 2
+            elif char == '`':
+                self.out.append(source[start:self.index + 1])
+                self.index += 1
+                return
+            elif source.startswith('${', self.index):
+                self.out.append(source[start:self.index + 2])
+                self.index += 2
+                self._code(nested=True)
+                self.out.append('}')
+                self.index += 1
+                start = self.index
+            else:
+                self.index += 1
+        self.out.append(source[start:])
+
+    def _regex_allowed(self):
+        if not self.out:
+            return True
+        text = self.out[-1]
+        if text[-1] in _REGEX_AFTER_CHARS:
+            return True
+        return _is_word(text[0]) and text in _REGEX_AFTER_WORDS
+
+    def _regex(self):
+        source = self.source
+        end = self.index + 1
+        in_class = False
+        while end < len(source):
+            char = source[end]
+            if char == '\\':
+                end += 2
+                continue
+            if char == '[':
+                in_class = True
+            elif char == ']':
+                in_class = False
+            elif char == '/' and not in_class:
+                break
+            end += 1
+        end += 1
+        while end < len(source) and _is_word(source[end]):
+            end += 1
+        text = source[self.index:end]
+        self.index = end
+        return text
+
+def minify_js(source):
+    return _JsMinifier(source).minify()
+
+# CSS
+
+_CSS_STRING_OR_COMMENT = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.S)
+_CSS_STRING = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+
+def minify_css(source):
+    """Drop comments and whitespace around braces, semicolons, commas and child selectors"""
+    source = _CSS_STRING_OR_COMMENT.sub(lambda match: match.group(1) or ' ', source)
+    parts = _CSS_STRING.split(source)
+    for index in range(0, len(parts), 2):  # Odd indexes are string literals
+        text = re.sub(r'\s+', ' ', parts[index])
+        text = re.sub(r' ?([{};,>]) ?', r'\1', text)
+        parts[index] = text.replace(';}', '}')
+    return ''.join(parts).strip() + '\n'
+
+MINIFIERS = {'.js': minify_js, '.css': minify_css}
+
+# Build
+
+def fingerprint(content):
+    return hashlib.blake2b(content, digest_size=5).hexdigest()
+
+def build_asset(name):
+    """Minify one asset; returns (fingerprinted name, minified bytes)"""
+    path = STATIC_DIR / name
+    source = path.read_text(encoding='utf-8')
+    content = MINIFIERS[path.suffix](source).encode('utf-8')
+    stem, extension = os.path.splitext(name)
+    return f"{stem}.{fingerprint(content)}{extension}", content
+
+def read_manifest(dist_dir):
+    try:
+        return json_backend.loads((dist_dir / MANIFEST_NAME).read_bytes())
+    except (OSError, ValueError):
+        return {}
+
+def write_file(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(path.name + '.tmp')
+    temp_path.write_bytes(content)
+    os.replace(temp_path, path)
+
+def build(dist_dir):
+    previous = read_manifest(dist_dir)
+    manifest = {}
+    for name in ASSETS:
+        built_name, content = build_asset(name)
+        manifest[name] = built_name
+        target = dist_dir / built_name
+        if not target.exists():
+            write_file(target, content)
+            # mtime=0 keeps the .gz identical between builds of the same content
+            write_file(target.with_name(target.name + '.gz'), gzip.compress(content, GZIP_LEVEL, mtime=0))
+        original = (STATIC_DIR / name).stat().st_size
+        print(f"  {name:<20} -> {built_name:<28} {original:>7} B -> {len(content):>7} B "
+              f"({target.with_name(target.name + '.gz').stat().st_size} B gzipped)")
+    write_file(dist_dir / MANIFEST_NAME, json_backend.dumps_bytes(manifest, pretty=True))
+
+    # Keep the previous build's files: workers started before this build still link to them
+    keep = set(manifest.values()) | set(previous.values())
+    keep |= {name + '.gz' for name in keep}
+    keep.add(MANIFEST_NAME)
+    for path in dist_dir.rglob('*'):
+        if path.is_file() and path.relative_to(dist_dir).as_posix() not in keep:
+            path.unlink()
+    return manifest
+
+def is_current(dist_dir):
+    manifest = read_manifest(dist_dir)
+    for name in ASSETS:
+        built_name, _ = build_asset(name)
+        if manifest.get(name) != built_name or not (dist_dir / built_name).exists():
+            return False
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description='Minify, fingerprint and gzip the static assets')
+    parser.add_argument('--check', action='store_true', help='Only check that static/dist/ is up to date')
+    args = parser.parse_args()
+
+    dist_dir = STATIC_DIR / DIST_DIR
+    if args.check:
+        current = is_current(dist_dir)
+        print('static/dist is up to date' if current else 'static/dist is out of date: run build_assets.py')
+        return 0 if current else 1
+
+    print(f"Building {len(ASSETS)} assets into {dist_dir}")
+    build(dist_dir)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,3 @@
+# This file makes the config directory a Python package
+# It allows importing settings using the syntax:
+# from config import performance
\ No newline at end of file
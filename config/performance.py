@@ -9,12 +9,84 @@ DB_POOL_TIMEOUT = 30
 CACHE_ENABLED = True
 CACHE_TYPE = 'simple'  # Use simple cache for lower memory usage
 CACHE_DEFAULT_TIMEOUT = 300  # 5 minutes
-CACHE_THRESHOLD = 1000  # Maximum number of items in cache
 
-# Logging settings
+# File write settings
+WRITE_BATCH_WINDOW_MS = 5  # Wait this long to group concurrent writes into one disk commit
+WRITE_FSYNC = True  # fsync every commit so a power cut never leaves a truncated file
+WRITE_ACK_TIMEOUT = 10  # Seconds a request waits for its write to be committed
+TOMBSTONE_COMPACT_THRESHOLD = 50  # Fold deleted orders into a day file after this many deletes
+
+# Completion request settings
+IDEMPOTENCY_TTL = 600  # Seconds a completion response is replayed for a repeated Idempotency-Key
+IDEMPOTENCY_MAX_KEYS = 1000  # Idempotency keys remembered per worker
+DUPLICATE_COMPLETION_WINDOW = 10  # Seconds in which the same client/product is not completed twice
+
+# JSON serialization settings
+JSON_BACKEND = 'auto'  # 'auto' (orjson, then ujson, then stdlib), 'orjson', 'ujson' or 'json'
+JSON_PRETTY_FILES = False  # Compact data files; use `python -m utils.json_backend pretty` to read them
+
+# Report digest settings (completion tracking rebuild)
+# 'thread' or 'process' pool for parsing changed day files. Threads share the GIL but are safe in the
+# multithreaded workers; 'process' starts fresh (spawned) interpreters per rebuild, which only pays
+# off for a cold rebuild of many days
+REPORT_DIGEST_EXECUTOR = 'thread'
+REPORT_DIGEST_WORKERS = 4  # One per Raspberry Pi core
+REPORT_DATES_MAX_PER_PAGE = 366  # Upper bound for /api/reports/dates?per_page=
+REPORT_ORDERS_MAX_PER_PAGE = 500  # Upper bound for /api/reports/orders?per_page=
+REPORT_ORDERS_CACHE_DAYS = 3  # Parsed days (and their sorted views) kept for paging
+REPORT_RANGE_MAX_DAYS = 366  # Longest range accepted by /api/reports/range
+REPORT_SUMMARY_CACHE_DAYS = 400  # Per-day summaries kept in memory for range reports
+EXPORT_CHUNK_BYTES = 64 * 1024  # Streamed export rows are flushed to the client in chunks of this size
+
+# Report archive settings (closed months rolled into data/archive/)
+TRACKING_REBUILD_DAYS = 30  # Days of report files read when the completion tracking is rebuilt
+ARCHIVE_ENABLED = True  # Archive closed months every night at 03:15
+ARCHIVE_AFTER_DAYS = 45  # Days kept as plain files; a month is archived once its last day is older
+ARCHIVE_RETENTION_MONTHS = 0  # Delete archived months older than this (0 keeps them forever)
+ARCHIVE_COMPRESSION_LEVEL = 6  # gzip level for the monthly bundles
+
+# Archived days are read-only and skipped by the tracking rebuild, so that window stays plain files
+if ARCHIVE_AFTER_DAYS <= TRACKING_REBUILD_DAYS:
+    raise ValueError(f"ARCHIVE_AFTER_DAYS ({ARCHIVE_AFTER_DAYS}) must be greater than "
+                     f"TRACKING_REBUILD_DAYS ({TRACKING_REBUILD_DAYS})")
+
+# Async read-only server settings (async_server.py)
+ASYNC_SERVER_PORT = 5004
+ASYNC_MAX_CONNECTIONS = 500  # Idle kiosk connections held per process
+ASYNC_KEEPALIVE_TIMEOUT = 75  # Seconds an idle keep-alive connection stays open
+LONG_POLL_TIMEOUT = 30  # Default seconds a ?since= request waits for a new snapshot
+LONG_POLL_MAX_TIMEOUT = 60
+SNAPSHOT_POLL_INTERVAL = 0.5  # Seconds between snapshot file checks
+
+# Request profiling settings (utils/profiling.py, stats at /api/debug/profiling)
+PROFILING_ENABLED = True
+SLOW_REQUEST_THRESHOLD = 2.0  # Seconds; slower requests are logged and their sampled stacks saved to data/profiles/
+PROFILE_SAMPLE_RATE = 0.0  # Fraction of requests also profiled with cProfile (e.g. 0.01)
+PROFILE_STACK_INTERVAL = 0.02  # Seconds between stack samples of requests slower than SLOW_REQUEST_THRESHOLD
+PROFILE_MAX_FILES = 100  # Captures kept in data/profiles/
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Startup settings
+WARMUP_TRACKING_WAIT = 10  # Seconds an early request waits for the warm-up to load completion tracking
+IMPORT_TIME_BUDGET_MS = 1500  # `import app` budget checked by benchmarks/bench_startup.py (Raspberry Pi 4)
+
+# Page rendering settings
+FRAGMENT_CACHE_ENTRIES = 8  # Rendered order tables and page shells kept per worker, keyed by snapshot version
+JINJA_BYTECODE_CACHE_DIR = 'cache/jinja'  # Compiled templates kept across worker restarts ('' disables)
+ASSET_MAX_AGE = 365 * 24 * 3600  # Browser cache lifetime of fingerprinted assets (build_assets.py)
+
+# Logging settings (utils/logging_setup.py)
 LOG_LEVEL = 'WARNING'  # Reduce logging verbosity
+LOG_LEVELS = {  # Per-logger overrides of LOG_LEVEL
+    'app': 'INFO',
+    'async_server': 'INFO',
+    'werkzeug': 'INFO',  # Dev server request lines
+}
+LOG_FILE = 'app.log'  # Relative to the project directory; rotated by size
 LOG_FILE_MAX_BYTES = 1024 * 1024  # 1MB
 LOG_FILE_BACKUP_COUNT = 3
+LOG_QUEUE_SIZE = 10000  # Records buffered for the writer thread; newer records are dropped when full
+LOG_CONSOLE = True  # Also write records to stderr
 
 # Scheduler settings
 SCHEDULER_JOBS = {
@@ -26,12 +98,22 @@ SCHEDULER_JOBS = {
     }
 }
 
-# WSGI server settings
+# WSGI server settings (read by gunicorn.conf.py)
+BIND = '0.0.0.0:5000'
 WORKERS = 2  # Reduced number of workers for Raspberry Pi
-THREADS = 2  # Reduced number of threads per worker
+WORKER_CLASS = 'gthread'  # 'gthread' or 'gevent' (pyodbc calls block a gevent worker while they run)
+THREADS = 2  # Reduced number of threads per worker (gthread)
+WORKER_CONNECTIONS = 100  # Concurrent connections per worker (gevent)
 TIMEOUT = 120  # Increased timeout for slower hardware
+GRACEFUL_TIMEOUT = 30
 KEEPALIVE = 2  # Reduced keepalive connections
+PRELOAD_APP = True  # Import the app once in the master; workers fork from it and share its memory
 
-# Memory optimization
-GC_THRESHOLD = 700  # Lower garbage collection threshold
-MAX_REQUESTS = 1000  # Restart workers after handling this many requests
\ No newline at end of file
+# Memory optimization (utils/memory.py, stats at /api/debug/memory)
+GC_THRESHOLD = 700  # Generation-0 collection threshold, applied with gc.set_threshold at startup
+GC_FREEZE_AFTER_PRELOAD = True  # gc.freeze() the preloaded app in the gunicorn master, so workers keep sharing its pages
+MEMORY_BUDGET_MB = 200  # Resident memory per process; caches are trimmed above it (0 disables)
+MEMORY_CHECK_INTERVAL = 100  # Requests between memory budget checks
+TRACEMALLOC_FRAMES = 0  # Trace allocations (frames per trace) for /api/debug/memory; 0 is off, tracing costs memory and CPU
+MAX_REQUESTS = 1000  # Restart workers after handling this many requests
+MAX_REQUESTS_JITTER = 100  # Spread worker restarts so they do not all recycle at once
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""Gunicorn settings for the Raspberry Pi deployment, taken from config/performance.py.
+
+Gunicorn reads this file from the working directory, so the app starts with just:
+
+    gunicorn app:app
+
+With PRELOAD_APP the master imports the app once (templates compiled, warm-start snapshot
+loaded) and each worker is a cheap fork sharing that memory copy-on-write. The hooks below
+reset what must not cross the fork and warm each worker before it accepts traffic.
+
+The scheduled jobs (ERP refresh that publishes the snapshot read by async_server.py, nightly
+report archiving) run in exactly one worker: the one holding data/.scheduler.lock. The
+others wait on that lock and take over when the owner is recycled.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import performance  # noqa: E402
+
+wsgi_app = 'app:app'
+bind = performance.BIND
+workers = performance.WORKERS
+worker_class = performance.WORKER_CLASS
+if worker_class == 'gevent':
+    worker_connections = performance.WORKER_CONNECTIONS
+else:
+    threads = performance.THREADS
+timeout = performance.TIMEOUT
+graceful_timeout = performance.GRACEFUL_TIMEOUT
+keepalive = performance.KEEPALIVE
+max_requests = performance.MAX_REQUESTS
+max_requests_jitter = performance.MAX_REQUESTS_JITTER
+preload_app = performance.PRELOAD_APP
+
+loglevel = performance.LOG_LEVEL.lower()
+errorlog = '-'  # The app's own records go to the rotating app.log
+
+def when_ready(server):
+    """Master is up: compile templates once so every fork inherits them, then freeze the heap"""
+    if preload_app:
+        import app
+        app.warm_templates()
+        if performance.GC_FREEZE_AFTER_PRELOAD:
+            from utils import memory
+            memory.freeze_startup_objects()
+
+def post_fork(server, worker):
+    """New worker: drop the master's DB connection and logging thread"""
+    import app
+    app.reset_after_fork()
+
+def post_worker_init(worker):
+    """Before accepting traffic: reload the warm-start snapshot, start the background warm-up
+    and compete for the scheduler"""
+    import app
+    app.warm_worker()
+    app.start_scheduler_in_one_process()
@@ -107,22 +107,15 @@ export PYTHONDONTWRITEBYTECODE=1
 export PYTHONUNBUFFERED=1
 export PYTHONHASHSEED=random
 
-# Set garbage collection thresholds
-export PYTHONGC={performance.GC_THRESHOLD}
-
 # Use optimized .env file
 cp .env.optimized .env
 
-# Start with gunicorn for better performance
-echo "Starting with gunicorn ({performance.WORKERS} workers, {performance.THREADS} threads)..."
-exec gunicorn --workers {performance.WORKERS} \
-             --threads {performance.THREADS} \
-             --timeout {performance.TIMEOUT} \
-             --keep-alive {performance.KEEPALIVE} \
-             --max-requests {performance.MAX_REQUESTS} \
-             --log-level {performance.LOG_LEVEL.lower()} \
-             --bind 0.0.0.0:5000 \
-             app:app
+# Minify and fingerprint the static files (static/dist/)
+python3 build_assets.py
+
+# Start with gunicorn; workers, threads, timeouts and worker hooks come from gunicorn.conf.py
+echo "Starting with gunicorn ({performance.WORKERS} {performance.WORKER_CLASS} workers)..."
+exec gunicorn --config gunicorn.conf.py app:app
 """
     
     script_path = project_dir / "start_optimized.sh"
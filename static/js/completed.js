@@ -0,0 +1,335 @@
+// Completed orders page: summary charts, virtual-scrolled order table and print
+
+const ROW_HEIGHT = 42;  // Fixed row height (px) used to position the rendered window
+const PAGE_SIZE = 100;  // Orders fetched per /api/reports/orders request
+const OVERSCAN = 10;  // Extra rows rendered above and below the visible area
+
+document.addEventListener('DOMContentLoaded', function() {
+    // Date selector functionality
+    const dateSelector = document.getElementById('dateSelector');
+    dateSelector.addEventListener('change', function() {
+        window.location.href = '/completed?date=' + this.value;
+    });
+
+    // Refresh button functionality
+    const refreshBtn = document.getElementById('refreshBtn');
+    refreshBtn.addEventListener('click', function() {
+        window.location.reload();
+    });
+
+    // Charts read the day's totals, hours and employees rendered by the server
+    const summary = JSON.parse(document.getElementById('summaryData').textContent);
+    renderSummaryCharts(summary);
+
+    const table = new VirtualOrderTable(dateSelector.value);
+    table.reset();
+
+    // Search functionality (server-side, over every order of the day)
+    const searchInput = document.getElementById('searchInput');
+    const searchButton = document.getElementById('searchButton');
+    const employeeFilter = document.getElementById('employeeFilter');
+
+    function performSearch() {
+        table.filters.q = searchInput.value.trim();
+        table.filters.employee = employeeFilter.value;
+        table.reset();
+    }
+
+    searchButton.addEventListener('click', performSearch);
+    employeeFilter.addEventListener('change', performSearch);
+    searchInput.addEventListener('keyup', function(e) {
+        if (e.key === 'Enter') {
+            performSearch();
+        }
+    });
+
+    // Sorting functionality (server-side)
+    document.querySelectorAll('.sortable').forEach(header => {
+        header.addEventListener('click', function() {
+            const column = this.getAttribute('data-sort');
+            const order = column === table.sort && table.order === 'asc' ? 'desc' : 'asc';
+            table.sort = column;
+            table.order = order;
+            table.reset();
+        });
+    });
+
+    // Print report button functionality: print every order of the day, not just the rendered rows
+    const printReportBtn = document.getElementById('printReportBtn');
+    printReportBtn.addEventListener('click', function() {
+        fillPrintTable(dateSelector.value).then(() => window.print());
+    });
+
+    // Delete order functionality (rows are rendered on demand, so listen on the table body)
+    table.tbody.addEventListener('click', function(event) {
+        const button = event.target.closest('.delete-order');
+        if (!button) return;
+
+        const orderId = button.getAttribute('data-order-id');
+        const productName = button.getAttribute('data-product-name');
+        const clientName = button.getAttribute('data-client-name');
+
+        if (confirm(`Deseja realmente excluir o pedido de ${productName} para ${clientName}?`)) {
+            // Show loading state
+            button.innerHTML = '<span class="spinner-border spinner-border-sm" role="status" aria-hidden="true"></span>';
+            button.disabled = true;
+
+            // Send delete request
+            fetch('/api/delete-order', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({
+                    order_id: orderId,
+                    report_date: dateSelector.value
+                })
+            })
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    // Reload the page to reflect the changes
+                    window.location.reload();
+                } else {
+                    alert('Erro ao excluir pedido: ' + data.error);
+                    // Reset button
+                    button.innerHTML = '<i class="bi bi-trash"></i>';
+                    button.disabled = false;
+                }
+            })
+            .catch(error => {
+                console.error('Error deleting order:', error);
+                alert('Erro ao excluir pedido. Por favor, tente novamente.');
+                // Reset button
+                button.innerHTML = '<i class="bi bi-trash"></i>';
+                button.disabled = false;
+            });
+        }
+    });
+});
+
+/**
+ * Table that only renders the rows in view and fetches pages of orders as they are needed.
+ * Spacer rows above and below the rendered window keep the scrollbar sized for all orders.
+ */
+class VirtualOrderTable {
+    constructor(reportDate) {
+        this.reportDate = reportDate;
+        this.viewport = document.getElementById('ordersViewport');
+        this.tbody = document.getElementById('completedTable').getElementsByTagName('tbody')[0];
+        this.countLabel = document.getElementById('ordersCount');
+        this.filters = { q: '', employee: '' };
+        this.sort = null;
+        this.order = 'asc';
+        this.viewport.addEventListener('scroll', () => this.scheduleRender());
+        window.addEventListener('resize', () => this.scheduleRender());
+    }
+
+    reset() {
+        this.generation = (this.generation || 0) + 1;  // Ignore responses for an older query
+        this.pages = new Map();  // page number -> orders (or a pending promise)
+        this.total = null;
+        this.viewport.scrollTop = 0;
+        this.showMessage('<span class="spinner-border spinner-border-sm" role="status" aria-hidden="true"></span> Carregando pedidos...', true);
+        this.fetchPage(1);
+    }
+
+    fetchPage(page) {
+        if (this.pages.has(page)) return;
+        const generation = this.generation;
+        const params = new URLSearchParams({ date: this.reportDate, page: page, per_page: PAGE_SIZE });
+        if (this.filters.q) params.set('q', this.filters.q);
+        if (this.filters.employee) params.set('employee', this.filters.employee);
+        if (this.sort) {
+            params.set('sort', this.sort);
+            params.set('order', this.order);
+        }
+
+        this.pages.set(page, null);
+        fetch('/api/reports/orders?' + params.toString())
+            .then(response => response.json())
+            .then(data => {
+                if (generation !== this.generation) return;
+                if (!data.success) {
+                    throw new Error(data.error);
+                }
+                this.pages.set(page, data.orders);
+                this.total = data.total;
+                this.countLabel.textContent = `${data.total} pedido(s)`;
+                this.render();
+            })
+            .catch(error => {
+                if (generation !== this.generation) return;
+                console.error('Error loading completed orders:', error);
+                this.pages.delete(page);
+                this.showMessage('Erro ao carregar pedidos. Por favor, tente novamente.');
+            });
+    }
+
+    scheduleRender() {
+        if (this.renderPending) return;
+        this.renderPending = true;
+        window.requestAnimationFrame(() => {
+            this.renderPending = false;
+            this.render();
+        });
+    }
+
+    render() {
+        if (this.total === null) return;
+        if (this.total === 0) {
+            this.showMessage('Nenhum pedido completado encontrado para esta data.');
+            return;
+        }
+
+        const first = Math.max(Math.floor(this.viewport.scrollTop / ROW_HEIGHT) - OVERSCAN, 0);
+        const visible = Math.ceil(this.viewport.clientHeight / ROW_HEIGHT) + 2 * OVERSCAN;
+        const last = Math.min(first + visible, this.total);
+
+        const fragment = document.createDocumentFragment();
+        fragment.appendChild(spacerRow(first * ROW_HEIGHT));
+        for (let index = first; index < last; index++) {
+            const page = Math.floor(index / PAGE_SIZE) + 1;
+            const orders = this.pages.get(page);
+            if (!orders) {
+                this.fetchPage(page);
+                fragment.appendChild(placeholderRow());
+                continue;
+            }
+            fragment.appendChild(orderRow(orders[index % PAGE_SIZE]));
+        }
+        fragment.appendChild(spacerRow((this.total - last) * ROW_HEIGHT));
+        this.tbody.replaceChildren(fragment);
+    }
+
+    showMessage(html, isHtml) {
+        const row = document.createElement('tr');
+        const cell = document.createElement('td');
+        cell.colSpan = 6;
+        cell.className = 'text-center';
+        if (isHtml) {
+            cell.innerHTML = html;
+        } else {
+            cell.textContent = html;
+        }
+        row.appendChild(cell);
+        this.tbody.replaceChildren(row);
+        if (!isHtml) this.countLabel.textContent = '';
+    }
+}
+
+function spacerRow(height) {
+    const row = document.createElement('tr');
+    row.className = 'virtual-spacer';
+    row.style.height = height + 'px';
+    return row;
+}
+
+function placeholderRow() {
+    const row = document.createElement('tr');
+    row.style.height = ROW_HEIGHT + 'px';
+    const cell = document.createElement('td');
+    cell.colSpan = 6;
+    cell.className = 'text-muted';
+    cell.textContent = '...';
+    row.appendChild(cell);
+    return row;
+}
+
+function formatTime(timestamp) {
+    // ISO timestamps (YYYY-MM-DDTHH:MM:SS...) are shown as HH:MM:SS, like the server filter
+    return timestamp && timestamp.length >= 19 ? timestamp.substring(11, 19) : (timestamp || '');
+}
+
+function orderCells(row, order) {
+    [order.product_name, order.product_code, order.client_name, order.completed_by, formatTime(order.timestamp)]
+        .forEach(value => {
+            const cell = document.createElement('td');
+            cell.textContent = value == null ? '' : value;
+            row.appendChild(cell);
+        });
+}
+
+function orderRow(order) {
+    const row = document.createElement('tr');
+    row.style.height = ROW_HEIGHT + 'px';
+    orderCells(row, order);
+
+    const actions = document.createElement('td');
+    const button = document.createElement('button');
+    button.className = 'btn btn-sm btn-danger delete-order';
+    button.dataset.orderId = order.id;
+    button.dataset.productName = order.product_name;
+    button.dataset.clientName = order.client_name;
+    button.innerHTML = '<i class="bi bi-trash"></i>';
+    actions.appendChild(button);
+    row.appendChild(actions);
+    return row;
+}
+
+function fillPrintTable(reportDate) {
+    // The print table lists every order of the day in file order
+    return fetch('/api/reports/export?date=' + encodeURIComponent(reportDate))
+        .then(response => response.json())
+        .then(data => {
+            const fragment = document.createDocumentFragment();
+            (data.orders || []).forEach(order => {
+                const row = document.createElement('tr');
+                orderCells(row, order);
+                fragment.appendChild(row);
+            });
+            document.getElementById('printTable').getElementsByTagName('tbody')[0].replaceChildren(fragment);
+        })
+        .catch(error => {
+            console.error('Error loading orders for printing:', error);
+        });
+}
+
+function renderSummaryCharts(summary) {
+    if (!summary.total || typeof Chart === 'undefined') return;
+
+    const hours = Object.keys(summary.hour).sort();
+    new Chart(document.getElementById('hourChart').getContext('2d'), {
+        type: 'bar',
+        data: {
+            labels: hours.map(hour => hour + 'h'),
+            datasets: [{
+                label: 'Pedidos',
+                data: hours.map(hour => summary.hour[hour]),
+                backgroundColor: 'rgba(0, 88, 81, 0.6)',
+                borderColor: 'rgba(0, 88, 81, 1)',
+                borderWidth: 1,
+                borderRadius: 4
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: { legend: { display: false } },
+            scales: { y: { beginAtZero: true, ticks: { precision: 0 } } }
+        }
+    });
+
+    const employees = Object.entries(summary.employee).sort((a, b) => b[1] - a[1]);
+    new Chart(document.getElementById('employeeChart').getContext('2d'), {
+        type: 'bar',
+        data: {
+            labels: employees.map(entry => entry[0]),
+            datasets: [{
+                label: 'Pedidos',
+                data: employees.map(entry => entry[1]),
+                backgroundColor: 'rgba(0, 88, 81, 0.6)',
+                borderColor: 'rgba(0, 88, 81, 1)',
+                borderWidth: 1,
+                borderRadius: 4
+            }]
+        },
+        options: {
+            indexAxis: 'y',
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: { legend: { display: false } },
+            scales: { x: { beginAtZero: true, ticks: { precision: 0 } } }
+        }
+    });
+}
@@ -209,6 +209,36 @@ function markOrderComplete(productCode, clients) {
     return;
 }
 
+// Unique key per completion, so a resent request is recognized by the server
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    // crypto.randomUUID needs HTTPS; kiosks on plain HTTP use this instead
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2) + Math.random().toString(36).slice(2);
+}
+
+// POST a completion, resending it with the same Idempotency-Key if the network fails
+function postCompletion(url, payload, retries = 2) {
+    const idempotencyKey = newIdempotencyKey();
+    const attempt = (remaining) => fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Idempotency-Key': idempotencyKey
+        },
+        body: JSON.stringify(payload)
+    })
+    .catch(error => {
+        if (remaining <= 0) {
+            throw error;
+        }
+        return new Promise(resolve => setTimeout(resolve, 1000))
+            .then(() => attempt(remaining - 1));
+    });
+    return attempt(retries);
+}
+
 // Complete order after employee selection
 function completeOrderWithEmployee(productCode, clients, completedBy) {
     // Get product name from the table
@@ -225,18 +255,12 @@ function completeOrderWithEmployee(productCode, clients, completedBy) {
         const clientName = clients[0];
         
         // Send the completion request to the API
-        fetch('/api/complete-order', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({
-                product_code: productCode,
-                product_name: productName,
-                client_name: clientName,
-                completed_by: completedBy,
-                separador: 'N/A'
-            })
+        postCompletion('/api/complete-order', {
+            product_code: productCode,
+            product_name: productName,
+            client_name: clientName,
+            completed_by: completedBy,
+            separador: 'N/A'
         })
         .then(response => response.json())
         .then(data => {
@@ -252,42 +276,33 @@ function completeOrderWithEmployee(productCode, clients, completedBy) {
             alert('Erro ao marcar como concluído. Por favor, tente novamente.');
         });
     } else {
-        // This is a batch operation - we need to handle each client separately
-        // Create a promise for each client
-        const promises = clients.map(clientName => {
-            return fetch('/api/complete-order', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    product_code: productCode,
-                    product_name: productName,
-                    client_name: clientName,
-                    completed_by: completedBy,
-                    separador: 'N/A'
-                })
-            }).then(response => response.json());
-        });
-        
-        // Wait for all requests to complete
-        Promise.all(promises)
-            .then(results => {
-                // Check if all operations were successful
-                const allSuccessful = results.every(result => result.success);
-                if (allSuccessful) {
+        // This is a batch operation - complete every client in a single request
+        postCompletion('/api/complete-orders', {
+            product_code: productCode,
+            product_name: productName,
+            completed_by: completedBy,
+            separador: 'N/A',
+            items: clients.map(clientName => ({ client_name: clientName }))
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                window.location.reload();
+            } else {
+                const errors = (data.results || [])
+                    .filter(result => !result.success)
+                    .map(result => `${result.client_name}: ${result.error}`)
+                    .join(', ');
+                alert('Alguns pedidos não puderam ser concluídos: ' + (errors || data.error));
+                if (data.completed) {
                     window.location.reload();
-                } else {
-                    const errors = results.filter(result => !result.success)
-                        .map(result => result.error)
-                        .join(', ');
-                    alert('Alguns pedidos não puderam ser concluídos: ' + errors);
                 }
-            })
-            .catch(error => {
-                console.error('Error marking as complete:', error);
-                alert('Erro ao marcar como concluído. Por favor, tente novamente.');
-            });
+            }
+        })
+        .catch(error => {
+            console.error('Error marking as complete:', error);
+            alert('Erro ao marcar como concluído. Por favor, tente novamente.');
+        });
     }
 }
 
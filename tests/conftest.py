@@ -0,0 +1,26 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_ENTRIES = ['app.py', 'utils', 'config', 'templates', 'static']
+
+@pytest.fixture(scope='session')
+def app_module():
+    """The Flask app imported from a scratch project directory, so data/ and the logs are its own"""
+    root = tempfile.mkdtemp(prefix='monitor-tests-')
+    for entry in PROJECT_ENTRIES:
+        os.symlink(os.path.join(PROJECT_DIR, entry), os.path.join(root, entry))
+    os.environ.setdefault('DB_RETRIES', '1')
+    os.environ.setdefault('DB_RETRY_DELAY', '0')
+    os.environ['OFFLINE_MODE'] = 'false'
+    sys.path.insert(0, root)
+    try:
+        import app
+    except ImportError as e:  # pyodbc needs the unixODBC driver manager
+        pytest.skip(f"app cannot be imported here: {e}")
+    yield app
+    shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,107 @@
+import threading
+from datetime import date
+
+import pytest
+
+def order(client_name, product_code='100'):
+    return {
+        'product_code': product_code,
+        'product_name': f'Produto {product_code}',
+        'client_name': client_name,
+        'completed_by': 'Ana',
+        'separador': 'N/A',
+    }
+
+def save_concurrently(app, orders):
+    barrier = threading.Barrier(len(orders))
+    results = []
+
+    def save(order_data):
+        barrier.wait()
+        results.append(app.save_completed_order(order_data))
+
+    threads = [threading.Thread(target=save, args=(order_data,)) for order_data in orders]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def assert_summary_matches_file(app, date_key):
+    orders = app.load_completed_orders(date_key)
+    summary = app.day_summaries.get(date_key)
+    assert summary['total'] == len(orders)
+    assert sum(summary['client'].values()) == len(orders)
+    assert app.report_catalog.count(date_key) == len(orders)
+    # The in-memory summary was stored under the current signature: a fresh cache reads the same sidecar
+    app.day_summaries.clear()
+    assert app.day_summaries.get(date_key)['total'] == len(orders)
+
+@pytest.fixture
+def today(app_module):
+    return date.today().isoformat()
+
+def test_concurrent_saves_keep_the_day_summary_exact(app_module, today):
+    # Start from a cached summary, so every write of the batch can update it instead of rebuilding
+    assert app_module.save_completed_order(order('Cliente inicial'))[0]
+    app_module.day_summaries.get(today)
+    results = save_concurrently(app_module, [order(f'Cliente {index}') for index in range(8)])
+
+    assert all(success for success, _ in results)
+    assert_summary_matches_file(app_module, today)
+
+    # Later single writes build on the stored summary
+    assert app_module.save_completed_order(order('Cliente extra'))[0]
+    assert_summary_matches_file(app_module, today)
+
+def test_delete_writes_a_tombstone_and_updates_the_summary(app_module, today):
+    assert app_module.save_completed_order(order('Cliente apagado', '200'))[0]
+    target = next(saved for saved in app_module.load_completed_orders(today)
+                  if saved['client_name'] == 'Cliente apagado')
+    before = len(app_module.load_completed_orders(today))
+
+    client = app_module.app.test_client()
+    response = client.post('/api/delete-order', json={'order_id': target['id'], 'report_date': today})
+    assert response.status_code == 200
+    response.close()
+
+    file_path = app_module.get_completion_file_path(today)
+    assert target['id'] in app_module.read_tombstones(file_path)
+    assert len(app_module.load_completed_orders(today)) == before - 1
+    assert_summary_matches_file(app_module, today)
+
+    # Compaction folds the tombstone into the day file and keeps the summary
+    assert app_module.compact_completed_orders(today)
+    assert not app_module.read_tombstones(file_path)
+    raw_ids = [saved['id'] for saved in app_module.read_day_file(file_path)]
+    assert target['id'] not in raw_ids
+    assert_summary_matches_file(app_module, today)
+
+def test_compaction_batched_with_saves_keeps_the_summary(app_module, today):
+    for index in range(3):
+        assert app_module.save_completed_order(order(f'Cliente lote {index}', '300'))[0]
+    file_path = app_module.get_completion_file_path(today)
+    for saved in app_module.load_completed_orders(today)[:2]:
+        with app_module.file_writer.locked(file_path):
+            app_module.append_tombstone(file_path, saved['id'])
+    app_module.day_summaries.invalidate(today)
+    app_module.day_summaries.get(today)
+
+    # Saves and a compaction submitted together land in one group commit
+    barrier = threading.Barrier(4)
+
+    def compact():
+        barrier.wait()
+        app_module.compact_completed_orders(today)
+
+    def save(index):
+        barrier.wait()
+        app_module.save_completed_order(order(f'Cliente junto {index}', '400'))
+
+    threads = [threading.Thread(target=compact)] + [threading.Thread(target=save, args=(index,)) for index in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert_summary_matches_file(app_module, today)
@@ -0,0 +1,59 @@
+import json
+import subprocess
+import sys
+import threading
+
+from utils.idempotency import ClaimStore, DuplicateWindow, IdempotencyCache
+
+def worker_caches(tmp_path, **kwargs):
+    """Two caches sharing one claims directory, as two gunicorn workers do"""
+    shared_dir = str(tmp_path / 'idempotency')
+    return (IdempotencyCache(shared_dir=shared_dir, poll_interval=0.01, **kwargs),
+            IdempotencyCache(shared_dir=shared_dir, poll_interval=0.01, **kwargs))
+
+def test_retry_on_another_worker_replays_the_response(tmp_path):
+    first, second = worker_caches(tmp_path)
+    assert first.begin('/api/complete-order:k1') == (IdempotencyCache.NEW, None)
+
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(second.begin('/api/complete-order:k1')))
+    waiter.start()
+    first.finish('/api/complete-order:k1', b'{"success": true}', 200)
+    waiter.join()
+
+    assert result == [(IdempotencyCache.REPLAY, (b'{"success": true}', 200))]
+    # Later repeats on that worker are answered from memory
+    assert second.begin('/api/complete-order:k1') == (IdempotencyCache.REPLAY, (b'{"success": true}', 200))
+
+def test_abandoned_key_runs_again_on_another_worker(tmp_path):
+    first, second = worker_caches(tmp_path)
+    assert first.begin('k2')[0] == IdempotencyCache.NEW
+    first.abandon('k2')
+    assert second.begin('k2')[0] == IdempotencyCache.NEW
+
+def test_unfinished_key_is_in_progress_elsewhere(tmp_path):
+    first, second = worker_caches(tmp_path, wait_timeout=0.05)
+    assert first.begin('k3')[0] == IdempotencyCache.NEW
+    assert second.begin('k3') == (IdempotencyCache.IN_PROGRESS, None)
+    first.finish('k3', b'{}', 200)
+    assert second.begin('k3') == (IdempotencyCache.REPLAY, (b'{}', 200))
+
+def test_claim_of_a_dead_worker_is_taken_over(tmp_path):
+    shared_dir = str(tmp_path / 'idempotency')
+    store = ClaimStore(shared_dir, ttl=600)
+    finished = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                              capture_output=True, text=True, check=True)
+    with open(store._path('k4'), 'w', encoding='utf-8') as f:
+        json.dump({'pid': int(finished.stdout)}, f)
+
+    cache = IdempotencyCache(shared_dir=shared_dir, wait_timeout=0.05, poll_interval=0.01)
+    assert cache.begin('k4')[0] == IdempotencyCache.NEW
+
+def test_duplicate_window_is_shared(tmp_path):
+    shared_dir = str(tmp_path / 'completions')
+    first, second = DuplicateWindow(shared_dir=shared_dir), DuplicateWindow(shared_dir=shared_dir)
+    assert first.claim('cliente|100')
+    assert not second.claim('cliente|100')
+    first.release('cliente|100')
+    assert second.claim('cliente|100')
+    assert not first.claim('cliente|100')
@@ -0,0 +1,22 @@
+import pytest
+
+from utils import json_backend
+
+@pytest.fixture(params=json_backend.available_backends())
+def backend(request):
+    previous = json_backend.backend_name()
+    yield json_backend.select_backend(request.param)
+    json_backend.select_backend(previous)
+
+def test_installed_backends_produce_the_same_bytes():
+    assert json_backend.check_backends() == {}
+
+def test_sort_keys_sorts_nested_objects(backend):
+    record = {'b': 1, 'a': [{'z': 1, 'y': 2}]}
+    assert json_backend.dumps(record, sort_keys=True) == '{"a":[{"y":2,"z":1}],"b":1}'
+    assert json_backend.dumps(record) == '{"b":1,"a":[{"z":1,"y":2}]}'
+
+def test_flask_provider_keeps_its_sort_keys_setting(app_module):
+    provider = app_module.app.json
+    assert provider.dumps({'b': 1, 'a': 2}) == '{"a":2,"b":1}'
+    assert provider.dumps({'b': 1, 'a': 2}, sort_keys=False) == '{"b":1,"a":2}'
@@ -0,0 +1,36 @@
+import os
+
+from utils.report_catalog import GENERATION_FILE, ReportCatalog
+
+def make_catalog(directory):
+    """A catalog over directory, as one worker process holds it"""
+    return ReportCatalog(
+        str(directory),
+        path_for=lambda date_key: os.path.join(directory, f'completed_{date_key}.json'),
+        count_for=lambda date_key: 1,
+        generation_path=os.path.join(directory, GENERATION_FILE),
+    )
+
+def write_day(directory, date_key):
+    (directory / f'completed_{date_key}.json').write_text('[{"id": "1"}]', encoding='utf-8')
+
+def test_date_added_by_another_process_is_not_hidden(tmp_path):
+    first, second = make_catalog(tmp_path), make_catalog(tmp_path)
+    assert first.query() == ([], 0)
+    assert second.query() == ([], 0)
+
+    write_day(tmp_path, '2025-01-30')
+    second.record('2025-01-30', 1)
+    write_day(tmp_path, '2025-01-31')
+    first.record('2025-01-31', 1)
+
+    assert first.query() == (['2025-01-31', '2025-01-30'], 2)
+    assert second.query() == (['2025-01-31', '2025-01-30'], 2)
+
+def test_own_new_date_needs_no_rescan(tmp_path):
+    catalog = make_catalog(tmp_path)
+    catalog.query()
+    write_day(tmp_path, '2025-01-31')
+    catalog.record('2025-01-31', 1)
+    assert catalog.refresh() is False
+    assert '2025-01-31' in catalog
@@ -0,0 +1,106 @@
+import json
+import os
+
+import pytest
+
+from utils.completion_index import append_tombstone, day_signature, read_tombstones
+from utils.report_summary import DaySummaryCache, summarize_orders
+
+DATE_KEY = '2025-01-31'
+
+def make_order(order_id, hour, client_name='Mercado', completed_by='Ana'):
+    return {'id': order_id, 'client_name': client_name, 'product_code': '100', 'product_name': 'Produto 100',
+            'completed_by': completed_by, 'timestamp': f'{DATE_KEY}T{hour:02d}:00:00'}
+
+class Day:
+    """A day file with its tombstone log, read the way the app reads it"""
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, f'completed_{DATE_KEY}.json')
+        self.loads = 0
+
+    def write(self, orders):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(orders, f)
+
+    def load(self, date_key):
+        self.loads += 1
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            orders = json.load(f)
+        tombstones = read_tombstones(self.path)
+        return [order for order in orders if order['id'] not in tombstones]
+
+@pytest.fixture
+def day(tmp_path):
+    return Day(str(tmp_path))
+
+@pytest.fixture
+def summaries(tmp_path, day):
+    return DaySummaryCache(lambda date_key: day.path, day.load, sidecar_dir=str(tmp_path / 'summaries'))
+
+def test_updated_then_store_follows_an_append(day, summaries):
+    orders = [make_order('1', 8), make_order('2', 9)]
+    day.write(orders)
+    assert summaries.get(DATE_KEY)['total'] == 2
+
+    previous = day_signature(day.path)
+    added = [make_order('3', 10, client_name='Padaria')]
+    summary = summaries.updated(DATE_KEY, previous, added=added)
+    day.write(orders + added)
+    summaries.store(DATE_KEY, summary)
+
+    loads = day.loads
+    assert summaries.get(DATE_KEY) == summarize_orders(orders + added)
+    assert day.loads == loads  # Served from the stored summary, not rebuilt
+
+def test_updated_needs_the_summary_of_the_previous_files(day, summaries):
+    day.write([make_order('1', 8)])
+    summaries.get(DATE_KEY)
+    stale = day_signature(day.path)
+    day.write([make_order('1', 8), make_order('2', 9)])
+    assert summaries.updated(DATE_KEY, day_signature(day.path), added=[make_order('3', 10)]) is None
+    assert summaries.updated(DATE_KEY, stale) is not None
+
+def test_updated_does_not_touch_the_cached_summary(day, summaries):
+    day.write([make_order('1', 8)])
+    cached = summaries.get(DATE_KEY)
+    summaries.updated(DATE_KEY, day_signature(day.path), added=[make_order('2', 9)])
+    assert cached['total'] == 1
+
+def test_removing_the_first_or_last_order_asks_for_a_rebuild(day, summaries):
+    orders = [make_order('1', 8), make_order('2', 9), make_order('3', 10)]
+    day.write(orders)
+    summaries.get(DATE_KEY)
+    signature = day_signature(day.path)
+
+    assert summaries.updated(DATE_KEY, signature, removed=[orders[0]]) is None
+    assert summaries.updated(DATE_KEY, signature, removed=[orders[2]]) is None
+    assert summaries.updated(DATE_KEY, signature, removed=[orders[1]])['total'] == 2
+
+def test_tombstone_changes_the_signature_and_the_summary(day, summaries):
+    orders = [make_order('1', 8), make_order('2', 9), make_order('3', 10)]
+    day.write(orders)
+    summaries.get(DATE_KEY)
+
+    previous = day_signature(day.path)
+    summary = summaries.updated(DATE_KEY, previous, removed=[orders[1]])
+    append_tombstone(day.path, '2', fsync=False)
+    assert day_signature(day.path) != previous
+    summaries.store(DATE_KEY, summary)
+
+    summaries.clear()  # Read back from the sidecar
+    assert summaries.get(DATE_KEY) == summarize_orders([orders[0], orders[2]])
+
+def test_store_survives_a_restart(tmp_path, day, summaries):
+    day.write([make_order('1', 8)])
+    summaries.get(DATE_KEY)
+    restarted = DaySummaryCache(lambda date_key: day.path, day.load, sidecar_dir=str(tmp_path / 'summaries'))
+    loads = day.loads
+    assert restarted.get(DATE_KEY)['total'] == 1
+    assert day.loads == loads
+
+def test_missing_day_leaves_no_sidecar(tmp_path, summaries):
+    assert summaries.get(DATE_KEY)['total'] == 0
+    assert not os.path.exists(tmp_path / 'summaries' / f'{DATE_KEY}.json')
@@ -0,0 +1,48 @@
+import logging
+import os
+
+from utils import json_backend
+
+logger = logging.getLogger('assets')
+
+# Built assets live in static/dist/ (see build_assets.py)
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+class AssetManifest:
+    """Maps static asset names to their fingerprinted builds listed in static/dist/manifest.json.
+
+    Without a build (development) names resolve to the original files.
+    """
+
+    def __init__(self, static_dir):
+        self.dist_dir = os.path.join(static_dir, DIST_DIR)
+        self.assets = {}
+        self.built_files = set()
+        self.load()
+
+    def load(self):
+        path = os.path.join(self.dist_dir, MANIFEST_NAME)
+        try:
+            with open(path, 'rb') as f:
+                self.assets = json_backend.loads(f.read())
+            logger.info("Loaded %s built assets from %s", len(self.assets), path)
+        except FileNotFoundError:
+            self.assets = {}
+            logger.info("No asset manifest at %s; serving unbuilt static files", path)
+        except ValueError as e:
+            self.assets = {}
+            logger.error("Ignoring unreadable asset manifest %s: %s", path, e)
+        self.built_files = set(self.assets.values())
+
+    def resolve(self, filename):
+        """Return the static path to link for an asset ('js/main.js' -> 'dist/js/main.<hash>.js')"""
+        built = self.assets.get(filename)
+        return f"{DIST_DIR}/{built}" if built else filename
+
+    def gzipped_path(self, filename):
+        """Path of the precompressed copy of a built file, or None if there is none"""
+        if filename not in self.built_files:
+            return None
+        path = os.path.join(self.dist_dir, filename + '.gz')
+        return path if os.path.isfile(path) else None
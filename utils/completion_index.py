@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import threading
+from collections import Counter
+
+from utils.normalization import completion_key
+
+logger = logging.getLogger('completion_index')
+
+def tombstone_path(day_path):
+    """Return the path of the tombstone log that sits next to a day file"""
+    base, _ = os.path.splitext(day_path)
+    return f"{base}.tombstones"
+
+def read_tombstones(day_path):
+    """Return the set of deleted order ids recorded for a day file"""
+    path = tombstone_path(day_path)
+    if not os.path.exists(path):
+        return set()
+
+    tombstones = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                tombstones.add(json.loads(line))
+            except ValueError:
+                continue  # Ignore a partially written last line
+    return tombstones
+
+def append_tombstone(day_path, order_id, fsync=True):
+    """Record a deleted order id with an O(1) append (caller holds the day file lock)"""
+    with open(tombstone_path(day_path), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(order_id, ensure_ascii=False) + '\n')
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+
+def remove_tombstones(day_path):
+    """Drop the tombstone log once it has been folded into the day file"""
+    try:
+        os.remove(tombstone_path(day_path))
+    except FileNotFoundError:
+        pass
+
+def day_signature(day_path):
+    """Return (mtime_ns, size) of a day file and its tombstone log, used to detect outside changes"""
+    signature = []
+    for path in (day_path, tombstone_path(day_path)):
+        try:
+            stat = os.stat(path)
+            signature.extend((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.extend((0, 0))
+    return tuple(signature)
+
+class CompletionIndex:
+    """In-memory index of live completed orders per day.
+
+    Maps order id -> (position, completion key, client, product, employee, timestamp) and
+    completion key -> number of live completions, so deletes and the "other completions exist"
+    check are O(1).
+    """
+
+    def __init__(self):
+        self._days = {}  # date_key -> day index dict
+        self._lock = threading.RLock()
+
+    def is_current(self, date_key, signature):
+        """Return True if the day is indexed and its files have not changed since"""
+        day = self._days.get(date_key)
+        return day is not None and day['signature'] == signature
+
+    def index_day(self, date_key, orders, signature=None, tombstones=0):
+        """(Re)build the index for a day from its live orders"""
+        day = {'signature': signature, 'orders': {}, 'key_counts': Counter(), 'tombstones': tombstones}
+        with self._lock:
+            self._days[date_key] = day
+            self._add_orders(day, orders, 0)
+        return day
+
+    def append(self, date_key, orders, start):
+        """Index orders[start:] after they were appended to an indexed day"""
+        with self._lock:
+            day = self._days.get(date_key)
+            if day is None:
+                return False
+            self._add_orders(day, orders[start:], start)
+            return True
+
+    def _add_orders(self, day, orders, start):
+        for position, order in enumerate(orders, start):
+            order_id = order.get('id')
+            if not order_id:
+                continue
+            client_name = order.get('client_name')
+            product_code = order.get('product_code')
+            key = completion_key(client_name, product_code)
+            day['orders'][order_id] = (position, key, client_name, product_code,
+                                       order.get('completed_by'), order.get('timestamp'))
+            if key:
+                day['key_counts'][key] += 1
+
+    def lookup(self, date_key, order_id):
+        """Return (position, key, client_name, product_code, completed_by, timestamp) for a live order, or None"""
+        day = self._days.get(date_key)
+        return day['orders'].get(order_id) if day else None
+
+    def remove(self, date_key, order_id):
+        """Remove a deleted order; returns how many live completions its key still has"""
+        with self._lock:
+            day = self._days.get(date_key)
+            entry = day['orders'].pop(order_id, None) if day else None
+            if entry is None:
+                return None
+            day['tombstones'] += 1
+            key = entry[1]
+            if not key:
+                return 0
+            day['key_counts'][key] -= 1
+            if day['key_counts'][key] <= 0:
+                del day['key_counts'][key]
+                return 0
+            return day['key_counts'][key]
+
+    def live_count(self, date_key, key):
+        """Return how many live completions a key has on a day"""
+        day = self._days.get(date_key)
+        return day['key_counts'].get(key, 0) if day else 0
+
+    def tombstone_count(self, date_key):
+        """Return how many deletes are waiting to be folded into a day file"""
+        day = self._days.get(date_key)
+        return day['tombstones'] if day else 0
+
+    def set_signature(self, date_key, signature):
+        """Record the file signature after this process changed the day"""
+        with self._lock:
+            day = self._days.get(date_key)
+            if day is not None:
+                day['signature'] = signature
+
+    def invalidate(self, date_key):
+        """Forget a day so it is rebuilt on next use"""
+        with self._lock:
+            self._days.pop(date_key, None)
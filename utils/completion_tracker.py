@@ -0,0 +1,131 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger('completion_tracker')
+
+class CompletionTracker:
+    """Set-like store of completion keys that expire after a fixed time window"""
+
+    def __init__(self, ttl_hours):
+        """Initialize the tracker; ttl_hours <= 0 disables expiry"""
+        self.ttl_seconds = ttl_hours * 3600 if ttl_hours and ttl_hours > 0 else None
+        self._timestamps = {}  # key -> epoch seconds of the last completion
+        self._heap = []  # (timestamp, key) min-heap, may hold stale entries
+        self._lock = threading.RLock()
+
+    def __contains__(self, key):
+        return key in self._timestamps
+
+    def __len__(self):
+        return len(self._timestamps)
+
+    def __iter__(self):
+        return iter(list(self._timestamps))
+
+    def cutoff(self, now=None):
+        """Return the epoch time before which completions are considered expired"""
+        if self.ttl_seconds is None:
+            return None
+        return (now if now is not None else time.time()) - self.ttl_seconds
+
+    def add(self, key, when=None):
+        """Track a key as completed at `when` (epoch seconds, defaults to now).
+
+        Returns False if the completion is already outside the tracking window.
+        """
+        if when is None:
+            when = time.time()
+
+        with self._lock:
+            cutoff = self.cutoff()
+            if cutoff is not None and when <= cutoff:
+                return False
+
+            current = self._timestamps.get(key)
+            if current is not None and current >= when:
+                return True
+
+            self._timestamps[key] = when
+            heapq.heappush(self._heap, (when, key))
+            self._maybe_compact()
+            return True
+
+    def remove(self, key):
+        """Stop tracking a key, raising KeyError if it is not tracked"""
+        with self._lock:
+            del self._timestamps[key]
+            self._maybe_compact()
+
+    def discard(self, key):
+        """Stop tracking a key if it is tracked"""
+        with self._lock:
+            if self._timestamps.pop(key, None) is not None:
+                self._maybe_compact()
+
+    def clear(self):
+        """Remove every tracked key"""
+        with self._lock:
+            self._timestamps.clear()
+            self._heap.clear()
+
+    def last_completed(self, key):
+        """Return the epoch time of the last completion for a key, or None"""
+        return self._timestamps.get(key)
+
+    def expire(self, now=None):
+        """Drop every key whose last completion is outside the tracking window.
+
+        Each heap entry is popped at most once, so eviction is amortized O(log n).
+        Returns the number of keys removed.
+        """
+        cutoff = self.cutoff(now)
+        if cutoff is None:
+            return 0
+
+        removed = 0
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= cutoff:
+                when, key = heapq.heappop(heap)
+                # Skip stale entries left behind by re-completions or removals
+                if self._timestamps.get(key) == when:
+                    del self._timestamps[key]
+                    removed += 1
+
+        if removed:
+            logger.info("Expired %s completion tracking entries", removed)
+        return removed
+
+    def _maybe_compact(self):
+        """Rebuild the heap when stale entries outnumber live ones"""
+        if len(self._heap) > 2 * len(self._timestamps) + 64:
+            self._heap = [(when, key) for key, when in self._timestamps.items()]
+            heapq.heapify(self._heap)
+
+    def to_dict(self):
+        """Return a JSON serializable mapping of key -> ISO timestamp"""
+        with self._lock:
+            return {key: datetime.fromtimestamp(when).isoformat()
+                    for key, when in self._timestamps.items()}
+
+    def load(self, entries):
+        """Load entries from to_dict() output or from a legacy list of keys"""
+        if isinstance(entries, dict):
+            items = entries.items()
+        else:
+            # Legacy format stored a bare list of keys without timestamps
+            now = datetime.now().isoformat()
+            items = ((key, now) for key in entries)
+
+        loaded = 0
+        for key, when in items:
+            try:
+                timestamp = datetime.fromisoformat(when).timestamp()
+            except (TypeError, ValueError):
+                timestamp = time.time()
+            if self.add(key, timestamp):
+                loaded += 1
+        return loaded
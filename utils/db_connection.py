@@ -1,18 +1,16 @@
-import pyodbc
 import logging
 import time
 from datetime import datetime
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('db_connection.log')
-    ]
-)
+from utils.profiling import timed
+
 logger = logging.getLogger('db_connection')
 
+def _pyodbc():
+    """Import pyodbc on first use: loading the ODBC driver manager slows down app startup"""
+    import pyodbc
+    return pyodbc
+
 class DatabaseConnection:
     """Class to handle database connections and query execution"""
     
@@ -28,7 +26,7 @@ class DatabaseConnection:
         self.retry_delay = retry_delay
         self.connection = None
         
-        logger.info(f"DatabaseConnection initialized for server: {server}, database: {database}")
+        logger.info("DatabaseConnection initialized for server: %s, database: %s", server, database)
     
     def get_connection_string(self):
         """Generate the connection string for SQL Server"""
@@ -41,20 +39,20 @@ class DatabaseConnection:
         
         while attempts < self.retries:
             try:
-                logger.info(f"Connecting to database (attempt {attempts + 1}/{self.retries})")
+                logger.info("Connecting to database (attempt %s/%s)", attempts + 1, self.retries)
                 connection_string = self.get_connection_string()
-                self.connection = pyodbc.connect(connection_string)
+                self.connection = _pyodbc().connect(connection_string)
                 logger.info("Database connection established successfully")
                 return True, None
             except Exception as e:
                 last_error = str(e)
-                logger.error(f"Connection attempt {attempts + 1} failed: {last_error}")
+                logger.error("Connection attempt %s failed: %s", attempts + 1, last_error)
                 attempts += 1
                 if attempts < self.retries:
-                    logger.info(f"Retrying in {self.retry_delay} seconds...")
+                    logger.info("Retrying in %s seconds...", self.retry_delay)
                     time.sleep(self.retry_delay)
         
-        logger.error(f"Failed to connect after {self.retries} attempts. Last error: {last_error}")
+        logger.error("Failed to connect after %s attempts. Last error: %s", self.retries, last_error)
         return False, last_error
     
     def disconnect(self):
@@ -71,6 +69,14 @@ class DatabaseConnection:
                 return False, error_msg
         return True, None  # Already disconnected
     
+    def reset_after_fork(self):
+        """Forget a connection inherited from the parent process without closing it.
+        
+        The socket is shared with the parent, so closing it here would break the parent's session.
+        """
+        self.connection = None
+    
+    @timed('db')
     def execute_query(self, query, params=None):
         """Execute a query and return the results"""
         try:
@@ -97,7 +103,7 @@ class DatabaseConnection:
                 results.append({columns[i]: row[i] for i in range(len(columns))})
             
             cursor.close()
-            logger.info(f"Query executed successfully, returned {len(results)} rows")
+            logger.debug("Query executed successfully, returned %s rows", len(results))
             return results, None
             
         except Exception as e:
@@ -124,7 +130,7 @@ class DatabaseConnection:
                     results.append({columns[i]: row[i] for i in range(len(columns))})
                 
                 cursor.close()
-                logger.info(f"Query retry successful, returned {len(results)} rows")
+                logger.info("Query retry successful, returned %s rows", len(results))
                 return results, None
                 
             except Exception as retry_error:
@@ -132,6 +138,7 @@ class DatabaseConnection:
                 logger.error(error_msg)
                 return None, error_msg
     
+    @timed('db')
     def execute_non_query(self, query, params=None):
         """Execute a non-query statement (INSERT, UPDATE, DELETE)"""
         try:
@@ -155,7 +162,7 @@ class DatabaseConnection:
             affected_rows = cursor.rowcount
             cursor.close()
             
-            logger.info(f"Non-query executed successfully, affected {affected_rows} rows")
+            logger.debug("Non-query executed successfully, affected %s rows", affected_rows)
             return True, None
             
         except Exception as e:
@@ -180,7 +187,7 @@ class DatabaseConnection:
                 affected_rows = cursor.rowcount
                 cursor.close()
                 
-                logger.info(f"Non-query retry successful, affected {affected_rows} rows")
+                logger.info("Non-query retry successful, affected %s rows", affected_rows)
                 return True, None
                 
             except Exception as retry_error:
@@ -188,6 +195,7 @@ class DatabaseConnection:
                 logger.error(error_msg)
                 return False, error_msg
     
+    @timed('db')
     def test_connection(self):
         """Test the database connection and return diagnostics"""
         diagnostics = {
@@ -204,6 +212,7 @@ class DatabaseConnection:
         
         try:
             # Try to connect
+            pyodbc = _pyodbc()
             connection_string = self.get_connection_string()
             conn = pyodbc.connect(connection_string)
             
@@ -230,12 +239,12 @@ class DatabaseConnection:
             
         except Exception as e:
             error_msg = str(e)
-            logger.error(f"Connection test failed: {error_msg}")
+            logger.error("Connection test failed: %s", error_msg)
             diagnostics["error"] = error_msg
             
             # Try to determine if it's a driver issue
             try:
-                drivers = pyodbc.drivers()
+                drivers = _pyodbc().drivers()
                 diagnostics["available_drivers"] = drivers
                 if not any("SQL Server" in driver for driver in drivers):
                     diagnostics["possible_cause"] = "No SQL Server drivers found"
@@ -30,7 +30,7 @@ class DatabaseExplorer:
                 tables, error = self.db.execute_query(query)
             
             if error:
-                logger.error(f"Error listing tables: {error}")
+                logger.error("Error listing tables: %s", error)
                 return [], error
             
             return tables, None
@@ -55,7 +55,7 @@ class DatabaseExplorer:
             schemas, error = self.db.execute_query(query)
             
             if error:
-                logger.error(f"Error listing schemas: {error}")
+                logger.error("Error listing schemas: %s", error)
                 return [], error
             
             return schemas, None
@@ -91,7 +91,7 @@ class DatabaseExplorer:
             columns, error = self.db.execute_query(query, params)
             
             if error:
-                logger.error(f"Error listing columns for table {table_name}: {error}")
+                logger.error("Error listing columns for table %s: %s", table_name, error)
                 return [], error
             
             return columns, None
@@ -121,7 +121,7 @@ class DatabaseExplorer:
             result, error = self.db.execute_query(query, params)
             
             if error:
-                logger.error(f"Error checking if table {table_name} exists: {error}")
+                logger.error("Error checking if table %s exists: %s", table_name, error)
                 return False, error
             
             return len(result) > 0, None
@@ -153,7 +153,7 @@ class DatabaseExplorer:
             tables, error = self.db.execute_query(query, [search_pattern])
             
             if error:
-                logger.error(f"Error searching for similar tables: {error}")
+                logger.error("Error searching for similar tables: %s", error)
                 return [], error
             
             return tables, None
@@ -173,7 +173,7 @@ class DatabaseExplorer:
             result, error = self.db.execute_query(query)
             
             if error:
-                logger.error(f"Error getting row count for table {full_table_name}: {error}")
+                logger.error("Error getting row count for table %s: %s", full_table_name, error)
                 return 0, error
             
             if result and len(result) > 0:
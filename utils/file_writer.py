@@ -0,0 +1,269 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from utils import json_backend
+
+try:
+    import fcntl  # Cross-process locking (Linux / Raspberry Pi)
+except ImportError:  # pragma: no cover - Windows development machines
+    fcntl = None
+
+logger = logging.getLogger('file_writer')
+
+# Returned by a mutation to signal that it did not change the data
+NO_CHANGE = object()
+
+class CommitTicket:
+    """Durability acknowledgment for a write submitted to GroupCommitWriter"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.error = None
+
+    @property
+    def done(self):
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the write is on disk; returns True if it committed without error"""
+        if not self._event.wait(timeout):
+            self.error = self.error or f"Timed out after {timeout}s waiting for write commit"
+            return False
+        return self.error is None
+
+    def _resolve(self, error=None):
+        self.error = error
+        self._event.set()
+
+class GroupCommitWriter:
+    """Batches JSON file updates and commits each batch with one fsync'd temp-file + rename.
+
+    Writers submit mutations (callables that take the current file contents and return the
+    new contents). The first submitter for a file waits `batch_window` seconds, then applies
+    every mutation queued for that file in order and commits the result once. All submitters
+    receive a CommitTicket that resolves when their change is durable.
+    """
+
+    def __init__(self, batch_window=0.005, fsync=True, encoder=None):
+        """Initialize the writer; encoder(data) -> str overrides the JSON encoding"""
+        self.batch_window = batch_window
+        self.fsync = fsync
+        self.encoder = encoder or json_backend.dumps
+        self._lock = threading.Lock()  # Guards _pending and _file_locks
+        self._pending = {}  # path -> list of (mutation, replaces, ticket, on_commit)
+        self._file_locks = {}
+        self.commits = 0
+        self.writes = 0
+
+    def submit(self, path, mutation, default=list, on_commit=None):
+        """Queue mutation(data) -> data for path and return its CommitTicket.
+
+        on_commit(stamp) runs after a successful commit, once the file locks are released (so it
+        may submit again). stamp is the file_stamp() of the committed file: a callback that
+        needs the file exactly as committed re-takes locked(path) and compares the two.
+        """
+        return self._enqueue(path, mutation, False, default, on_commit)
+
+    def replace(self, path, data):
+        """Queue a full replacement of the file contents and return its CommitTicket"""
+        return self._enqueue(path, lambda _: data, True, dict)
+
+    def _enqueue(self, path, mutation, replaces, default, on_commit=None):
+        path = os.path.abspath(path)
+        ticket = CommitTicket()
+
+        with self._lock:
+            batch = self._pending.get(path)
+            is_leader = batch is None
+            if is_leader:
+                batch = self._pending[path] = []
+            batch.append((mutation, replaces, ticket, on_commit))
+            self.writes += 1
+
+        if is_leader:
+            # Give concurrent writers a moment to join this batch
+            if self.batch_window > 0:
+                time.sleep(self.batch_window)
+            self._commit(path, default)
+
+        return ticket
+
+    def file_lock(self, path):
+        """Return the in-process lock that serializes commits to path"""
+        path = os.path.abspath(path)
+        with self._lock:
+            lock = self._file_locks.get(path)
+            if lock is None:
+                lock = self._file_locks[path] = threading.Lock()
+            return lock
+
+    @contextmanager
+    def locked(self, path):
+        """Hold the in-process and cross-process locks used when committing path"""
+        with self.file_lock(path), ProcessFileLock(os.path.abspath(path)):
+            yield
+
+    def _commit(self, path, default):
+        error, stamp, applied = self._commit_batch(path, default)
+
+        # Callbacks run once the file locks are released, so they may write through the writer again
+        for ticket, on_commit in applied:
+            if on_commit is not None and error is None:
+                try:
+                    on_commit(stamp)
+                except Exception as e:
+                    logger.exception("Error in commit callback for %s: %s", path, e)
+            ticket._resolve(error)
+
+    def _commit_batch(self, path, default):
+        """Apply and commit the pending batch of path; returns (error, stamp, [(ticket, on_commit)])"""
+        with self.file_lock(path), ProcessFileLock(path):
+            # Take the batch only once the file lock is held, so later writers start a new batch
+            with self._lock:
+                batch = self._pending.pop(path, [])
+
+            if not batch:
+                return None, None, []
+
+            # Mutations queued before the last full replacement would be overwritten anyway
+            start = 0
+            for index, (_, replaces, _, _) in enumerate(batch):
+                if replaces:
+                    start = index
+
+            try:
+                data = default() if batch[start][1] else read_json_file(path, default)
+            except Exception as e:
+                logger.exception("Error reading %s for commit: %s", path, e)
+                for _, _, ticket, _ in batch:
+                    ticket._resolve(f"Error reading file: {e}")
+                return None, None, []
+
+            changed = False
+            applied = []
+            for mutation, _, ticket, on_commit in batch[start:]:
+                try:
+                    result = mutation(data)
+                except Exception as e:
+                    logger.exception("Error applying write to %s: %s", path, e)
+                    ticket._resolve(str(e))
+                    continue
+                if result is not NO_CHANGE:
+                    data = result
+                    changed = True
+                applied.append((ticket, on_commit))
+
+            error = None
+            stamp = file_stamp(path)
+            if changed:
+                try:
+                    atomic_write_text(path, self.encoder(data), fsync=self.fsync)
+                    self.commits += 1
+                    stamp = file_stamp(path)
+                except Exception as e:
+                    logger.exception("Error committing %s: %s", path, e)
+                    error = f"Error writing to file: {e}"
+
+            for _, _, ticket, _ in batch[:start]:
+                ticket._resolve(error)
+
+            if changed and len(batch) > 1:
+                logger.debug("Group commit of %s writes to %s", len(batch), os.path.basename(path))
+            return error, stamp, applied
+
+def file_stamp(path):
+    """Return (inode, mtime_ns, size) of a file, or None if it does not exist.
+
+    Every commit renames a new file into place, so the stamp changes with each commit.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def lock_file_path(path):
+    """Return the path of the lock file used for cross-process commits to path"""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.lock")
+
+class ProcessFileLock:
+    """Advisory lock shared by every process writing the same file (no-op without fcntl)"""
+
+    def __init__(self, path):
+        self.lock_path = lock_file_path(path)
+        self._fd = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._fd = os.open(self.lock_path, os.O_CREAT | os.O_RDWR, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+def atomic_write_text(path, text, fsync=True):
+    """Write text to path through a temp file + rename so readers never see a partial file"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    if fsync:
+        _fsync_directory(directory)
+
+def _fsync_directory(directory):
+    """Persist the rename itself (not supported on every platform)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def read_json_file(path, default=list):
+    """Read a JSON file, returning default() if it is missing or empty.
+
+    A file that fails to parse is moved aside (never silently overwritten) and default()
+    is returned.
+    """
+    if not os.path.exists(path):
+        return default()
+
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read().strip()
+    if not content:
+        return default()
+
+    try:
+        return json_backend.loads(content)
+    except ValueError as e:
+        corrupt_path = f"{path}.corrupt-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        logger.error("JSON decode error in %s: %s; moving it to %s", path, e, corrupt_path)
+        os.replace(path, corrupt_path)
+        return default()
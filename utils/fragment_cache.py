@@ -0,0 +1,45 @@
+import threading
+from collections import OrderedDict
+
+from markupsafe import Markup
+
+class FragmentCache:
+    """Small LRU of rendered HTML fragments.
+
+    Keys must include everything the fragment depends on (e.g. the snapshot version), so an
+    entry never needs invalidating: new data gets a new key and old entries age out.
+    """
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._fragments = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        """Return the fragment cached under key, calling render() to build it on a miss"""
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+
+        # Rendered outside the lock; two threads missing the same key both render it once
+        fragment = Markup(render())
+        with self._lock:
+            self._fragments[key] = fragment
+            self._fragments.move_to_end(key)
+            while len(self._fragments) > self.max_entries:
+                self._fragments.popitem(last=False)
+        return fragment
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._fragments), 'hits': self.hits, 'misses': self.misses}
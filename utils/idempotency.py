@@ -0,0 +1,228 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.file_writer import ProcessFileLock, atomic_write_text
+
+class ClaimStore:
+    """Claims shared by every worker process: one small file per key, changed under a flock.
+
+    A claim file holds the claiming pid and, once the request finished, its response. Claims
+    older than ttl seconds count as free and are swept from time to time.
+    """
+
+    def __init__(self, directory, ttl):
+        self.directory = directory
+        self.ttl = ttl
+        self._next_sweep = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def claim(self, key, check_owner=False):
+        """Take the key; returns None if claimed, else the current holder's record.
+
+        With check_owner, an unfinished claim whose process is gone is taken over.
+        """
+        path = self._path(key)
+        with ProcessFileLock(self.directory):
+            now = time.time()
+            self._sweep(now)
+            record = self._read(path, now)
+            if record is not None and check_owner and record.get('status') is None and not _alive(record.get('pid')):
+                record = None
+            if record is not None:
+                return record
+            atomic_write_text(path, json.dumps({'pid': os.getpid()}), fsync=False)
+            return None
+
+    def finish(self, key, body, status):
+        """Attach the response to a key claimed by this process"""
+        record = {'pid': os.getpid(), 'status': status, 'body': base64.b64encode(body).decode('ascii')}
+        with ProcessFileLock(self.directory):
+            atomic_write_text(self._path(key), json.dumps(record), fsync=False)
+
+    def release(self, key):
+        """Drop a claim so the key can be taken again"""
+        with ProcessFileLock(self.directory):
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def _read(self, path, now):
+        try:
+            if now - os.path.getmtime(path) >= self.ttl:
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _sweep(self, now):
+        """Remove claims nobody can hold any more (caller holds the lock)"""
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + min(self.ttl, 60)
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and now - entry.stat().st_mtime >= self.ttl:
+                        os.remove(entry.path)
+                except OSError:
+                    continue
+
+def _alive(pid):
+    """True if a process with that pid still exists"""
+    if not isinstance(pid, int):
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class _Entry:
+    def __init__(self, expires):
+        self.expires = expires
+        self.response = None  # (body, status) once the first request finished
+        self.done = threading.Event()
+
+class IdempotencyCache:
+    """Responses of recent requests by Idempotency-Key, so a retried request is answered, not redone.
+
+    A request arriving while the first one with its key is still running waits for it and
+    gets the same response. Keys expire after ttl seconds; at most max_keys are kept in memory.
+    With a shared_dir the keys are also claimed in a ClaimStore, so a retry reaching another
+    worker process is answered the same way.
+    """
+
+    NEW = 'new'
+    REPLAY = 'replay'
+    IN_PROGRESS = 'in_progress'
+
+    def __init__(self, ttl=600, max_keys=1000, wait_timeout=30, shared_dir=None, poll_interval=0.05):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.store = ClaimStore(shared_dir, ttl) if shared_dir else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(self, key):
+        """Claim a key; returns (NEW, None), (REPLAY, (body, status)) or (IN_PROGRESS, None)"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._expire(now)
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = self._entries[key] = _Entry(now + self.ttl)
+                    while len(self._entries) > self.max_keys:
+                        self._entries.popitem(last=False)
+                    break
+
+            if not entry.done.wait(self.wait_timeout):
+                return self.IN_PROGRESS, None
+            if entry.response is not None:
+                return self.REPLAY, entry.response
+            # The first request failed without a response worth replaying: run this one
+
+        if self.store is None:
+            return self.NEW, None
+        state, response = self._claim_shared(key)
+        if state == self.NEW:
+            return state, None
+        # Another process holds the key: answer this process's waiters the same way
+        if state == self.REPLAY:
+            entry.response = response
+        else:
+            with self._lock:
+                self._entries.pop(key, None)
+        entry.done.set()
+        return state, response
+
+    def _claim_shared(self, key):
+        """Claim the key in the store, waiting for another process's response if it holds it"""
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            record = self.store.claim(key, check_owner=True)
+            if record is None:
+                return self.NEW, None
+            if record.get('status') is not None:
+                return self.REPLAY, (base64.b64decode(record['body']), record['status'])
+            if time.monotonic() >= deadline:
+                return self.IN_PROGRESS, None
+            time.sleep(self.poll_interval)
+
+    def finish(self, key, body, status):
+        """Store the response of a claimed key for replays"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if self.store is not None:
+            self.store.finish(key, body, status)
+        if entry is not None:
+            entry.response = (body, status)
+            entry.done.set()
+
+    def abandon(self, key):
+        """Release a claimed key without a response (the request failed and may be retried)"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if self.store is not None:
+            self.store.release(key)
+        if entry is not None:
+            entry.done.set()
+
+    def _expire(self, now):
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires > now:
+                break
+            del self._entries[key]
+
+class DuplicateWindow:
+    """Remembers keys (normalized client/product pairs) seen in the last window seconds.
+
+    With a shared_dir the keys are also claimed in a ClaimStore, across worker processes.
+    """
+
+    def __init__(self, window=10, shared_dir=None):
+        self.window = window
+        self.store = ClaimStore(shared_dir, window) if shared_dir else None
+        self._seen = OrderedDict()  # key -> monotonic time it was claimed
+        self._lock = threading.Lock()
+
+    def claim(self, key):
+        """Return True and remember the key, or False if it was claimed within the window"""
+        with self._lock:
+            now = time.monotonic()
+            while self._seen:
+                oldest, claimed_at = next(iter(self._seen.items()))
+                if now - claimed_at < self.window:
+                    break
+                del self._seen[oldest]
+            if key in self._seen:
+                return False
+            self._seen[key] = now
+
+        if self.store is not None and self.store.claim(key) is not None:
+            with self._lock:
+                self._seen.pop(key, None)
+            return False
+        return True
+
+    def release(self, key):
+        """Forget a key whose request failed, so a retry is not taken for a duplicate"""
+        with self._lock:
+            self._seen.pop(key, None)
+        if self.store is not None:
+            self.store.release(key)
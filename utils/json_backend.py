@@ -0,0 +1,168 @@
+"""JSON serialization layer: orjson or ujson when installed, stdlib json otherwise.
+
+Usage as a tool:
+    python -m utils.json_backend pretty data/completed_2025-01-31.json
+    python -m utils.json_backend compact data/*.json
+    python -m utils.json_backend check
+"""
+
+import json
+import logging
+import sys
+from datetime import date, datetime, time, timedelta, timezone
+
+logger = logging.getLogger('json_backend')
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+def encode_default(value):
+    """Encode types JSON lacks the same way in every backend: dates and times as ISO 8601, others with str()"""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+class _StdlibBackend:
+    name = 'json'
+
+    @staticmethod
+    def dumps(obj, pretty=False, default=encode_default, sort_keys=False):
+        if pretty:
+            return json.dumps(obj, ensure_ascii=False, indent=2, default=default, sort_keys=sort_keys)
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=default, sort_keys=sort_keys)
+
+    @staticmethod
+    def dumps_bytes(obj, pretty=False, default=encode_default, sort_keys=False):
+        return _StdlibBackend.dumps(obj, pretty, default, sort_keys).encode('utf-8')
+
+    loads = staticmethod(json.loads)
+
+class _OrjsonBackend:
+    name = 'orjson'
+
+    @staticmethod
+    def dumps_bytes(obj, pretty=False, default=encode_default, sort_keys=False):
+        # Datetimes go through default like in the other backends instead of orjson's own format
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=default, option=option)
+
+    @staticmethod
+    def dumps(obj, pretty=False, default=encode_default, sort_keys=False):
+        return _OrjsonBackend.dumps_bytes(obj, pretty, default, sort_keys).decode('utf-8')
+
+    loads = staticmethod(orjson.loads) if orjson else None
+
+class _UjsonBackend:
+    name = 'ujson'
+
+    @staticmethod
+    def dumps(obj, pretty=False, default=encode_default, sort_keys=False):
+        return ujson.dumps(obj, ensure_ascii=False, indent=2 if pretty else 0, default=default, sort_keys=sort_keys)
+
+    @staticmethod
+    def dumps_bytes(obj, pretty=False, default=encode_default, sort_keys=False):
+        return _UjsonBackend.dumps(obj, pretty, default, sort_keys).encode('utf-8')
+
+    loads = staticmethod(ujson.loads) if ujson else None
+
+_BACKENDS = {
+    'orjson': _OrjsonBackend if orjson else None,
+    'ujson': _UjsonBackend if ujson else None,
+    'json': _StdlibBackend,
+}
+
+_backend = _BACKENDS['orjson'] or _BACKENDS['ujson'] or _StdlibBackend
+
+def select_backend(name='auto'):
+    """Select 'orjson', 'ujson', 'json' or 'auto' (fastest installed); returns the name in use"""
+    global _backend
+    if name == 'auto':
+        _backend = _BACKENDS['orjson'] or _BACKENDS['ujson'] or _StdlibBackend
+    elif _BACKENDS.get(name):
+        _backend = _BACKENDS[name]
+    else:
+        logger.warning("JSON backend '%s' is not available, using '%s'", name, _backend.name)
+    return _backend.name
+
+def available_backends():
+    """Return the names of the installed backends, fastest first"""
+    return [name for name, backend in _BACKENDS.items() if backend]
+
+def backend_name():
+    """Return the name of the backend in use"""
+    return _backend.name
+
+def dumps(obj, pretty=False, default=encode_default, sort_keys=False):
+    """Serialize obj to a str (compact unless pretty=True); default handles unknown types"""
+    return _backend.dumps(obj, pretty, default, sort_keys)
+
+def dumps_bytes(obj, pretty=False, default=encode_default, sort_keys=False):
+    """Serialize obj to UTF-8 bytes (compact unless pretty=True)"""
+    return _backend.dumps_bytes(obj, pretty, default, sort_keys)
+
+def loads(data):
+    """Deserialize a str or bytes document; raises ValueError on invalid JSON"""
+    return _backend.loads(data)
+
+def check_backends():
+    """Serialize a sample record with every installed backend; returns {name: bytes} if they differ"""
+    record = {
+        'client_name': 'Mercado São João',
+        'timestamp': datetime(2025, 1, 31, 14, 5, 9, 123456),
+        'synced_at': datetime(2025, 1, 31, 17, 5, 9, tzinfo=timezone.utc),
+        'local_time': datetime(2025, 1, 31, 14, 5, 9, tzinfo=timezone(timedelta(hours=-3))),
+        'processing_date': date(2025, 1, 31),
+        'cutoff': time(18, 30),
+        'quantity': 12,
+        'weight': 1.5,
+        'tags': [None, True, 'N/A'],
+        7: 'non-string key',
+    }
+    # The stdlib cannot sort mixed int/str keys, so sorting is checked on the string keys only
+    sortable = {key: value for key, value in record.items() if isinstance(key, str)}
+    variants = {'': (record, {}), ' pretty': (record, {'pretty': True}), ' sorted': (sortable, {'sort_keys': True})}
+    differing = {}
+    for suffix, (sample, options) in variants.items():
+        outputs = {name: _BACKENDS[name].dumps_bytes(sample, **options) for name in available_backends()}
+        if len(set(outputs.values())) > 1:
+            differing.update({f"{name}{suffix}": output for name, output in outputs.items()})
+    return differing
+
+def _main(argv):
+    if argv == ['check']:
+        differing = check_backends()
+        for name, output in differing.items():
+            print(f"{name}: {output.decode('utf-8')}")
+        print(f"Backends {'differ' if differing else 'match'}: {', '.join(available_backends())}")
+        return 1 if differing else 0
+
+    if len(argv) < 2 or argv[0] not in ('pretty', 'compact'):
+        print(__doc__)
+        return 1
+
+    command, paths = argv[0], argv[1:]
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = loads(f.read())
+        if command == 'pretty':
+            sys.stdout.write(dumps(data, pretty=True) + '\n')
+        else:
+            # Imported here so the tool does not pull in the writer for read-only use
+            from utils.file_writer import atomic_write_text
+            atomic_write_text(path, dumps(data))
+            print(f"Compacted {path}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(_main(sys.argv[1:]))
@@ -0,0 +1,71 @@
+import json
+import logging
+
+logger = logging.getLogger('json_stream')
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+def iter_json_array(path, chunk_size=64 * 1024):
+    """Yield the elements of a top-level JSON array file one at a time.
+
+    Reads the file in chunks and decodes each element with raw_decode, so memory stays at
+    about one chunk plus twice the largest element however large the file is. An empty file yields nothing;
+    malformed content raises ValueError.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = ''
+        position = 0
+        eof = False
+        started = False
+
+        def fill():
+            nonlocal buffer, position, eof
+            # Read at least as much as is pending: an element spanning many chunks is then
+            # re-decoded and copied O(log n) times instead of once per chunk
+            chunk = f.read(max(chunk_size, len(buffer) - position))
+            if not chunk:
+                eof = True
+            buffer = buffer[position:] + chunk
+            position = 0
+
+        while True:
+            # Skip whitespace and separators, reading more as needed
+            while True:
+                while position < len(buffer) and buffer[position] in _WHITESPACE:
+                    position += 1
+                if position < len(buffer) or eof:
+                    break
+                fill()
+
+            if position >= len(buffer):
+                if started:
+                    raise ValueError(f"Unterminated JSON array in {path}")
+                return  # Empty file
+
+            char = buffer[position]
+            if not started:
+                if char != '[':
+                    raise ValueError(f"Expected a JSON array in {path}")
+                started = True
+                position += 1
+                continue
+            if char == ']':
+                return
+            if char == ',':
+                position += 1
+                continue
+
+            # Decode one element; a value ending exactly at the buffer end may be truncated
+            try:
+                value, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            if end >= len(buffer) and not eof:
+                fill()
+                continue
+            position = end
+            yield value
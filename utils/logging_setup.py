@@ -0,0 +1,123 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+from utils.file_writer import ProcessFileLock
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener = None
+_settings = None  # Arguments of the last setup_logging call, reused after a fork
+
+class SharedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that several processes (gunicorn workers) can write to.
+
+    Rollovers take a cross-process lock, and a process whose file was rotated by another one
+    reopens the new file instead of writing on into the old one.
+    """
+
+    def emit(self, record):
+        if self.stream is not None and self._rotated_elsewhere():
+            self.stream.close()
+            self.stream = None  # Reopened by emit
+        super().emit(record)
+
+    def _rotated_elsewhere(self):
+        try:
+            return os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino
+        except OSError:
+            return True
+
+    def doRollover(self):
+        with ProcessFileLock(self.baseFilename):
+            # Another process may have rolled over while this one waited for the lock
+            if self.stream is not None and self._rotated_elsewhere():
+                self.stream.close()
+                self.stream = None
+            try:
+                size = os.path.getsize(self.baseFilename)
+            except OSError:
+                size = 0
+            if size >= self.maxBytes:
+                super().doRollover()
+            elif self.stream is None:
+                self.stream = self._open()
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: records are dropped (and counted) while the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            if self.dropped:
+                notice = logging.LogRecord('logging_setup', logging.WARNING, __file__, 0,
+                                           'Dropped %d log records while the log queue was full',
+                                           (self.dropped,), None)
+                self.queue.put_nowait(notice)
+                self.dropped = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def setup_logging(log_file, level='INFO', logger_levels=None, max_bytes=1024 * 1024, backup_count=3,
+                  queue_size=10000, console=True):
+    """Route every logger through a queue to a size-rotated log file (and stderr).
+
+    Callers only format and enqueue records; a single listener thread does the file writes,
+    so request threads never wait on the SD card. logger_levels maps logger names to levels
+    that override the root level. Calling it again replaces the previous setup.
+    """
+    global _listener, _settings
+    stop_logging()
+    _settings = dict(log_file=log_file, level=level, logger_levels=logger_levels, max_bytes=max_bytes,
+                     backup_count=backup_count, queue_size=queue_size, console=console)
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    file_handler = SharedRotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+    file_handler.setFormatter(formatter)
+    handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler(sys.stderr)
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(DroppingQueueHandler(log_queue))
+    root.setLevel(level)
+    for name, logger_level in (logger_levels or {}).items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def stop_logging():
+    """Flush queued records and stop the listener thread (also runs at exit)"""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+def restart_after_fork():
+    """Give a forked child its own queue and listener (the parent's thread does not survive fork)"""
+    global _listener
+    # The inherited listener and queue belong to the parent; stopping them here could deadlock
+    _listener = None
+    if _settings is not None:
+        setup_logging(**_settings)
+
+atexit.register(stop_logging)
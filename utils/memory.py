@@ -0,0 +1,145 @@
+import gc
+import logging
+import os
+import sys
+import threading
+import tracemalloc
+
+logger = logging.getLogger('memory')
+
+def configure_gc(threshold):
+    """Apply the generation-0 collection threshold (PYTHONGC is not a CPython variable)"""
+    _, generation1, generation2 = gc.get_threshold()
+    gc.set_threshold(threshold, generation1, generation2)
+
+def freeze_startup_objects():
+    """Move every object alive now out of the collector's reach.
+
+    Called in the gunicorn master after preloading the app: collections in the workers then
+    never touch (and so never copy) the memory pages they share with the master.
+    """
+    gc.collect()
+    gc.freeze()
+    logger.info("Froze %s startup objects", gc.get_freeze_count())
+
+def current_rss():
+    """Resident memory of this process in bytes (None where /proc is not available)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+def deep_sizeof(obj, max_objects=200000):
+    """Estimate the bytes held by obj and everything reachable through its containers.
+
+    Returns (bytes, complete); complete is False when the walk stopped at max_objects.
+    """
+    seen = set()
+    pending = [obj]
+    total = 0
+    while pending:
+        if len(seen) >= max_objects:
+            return total, False
+        item = pending.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            pending.extend(item)
+        elif hasattr(item, '__dict__') and not isinstance(item, type):
+            pending.append(vars(item))
+    return total, True
+
+class MemoryMonitor:
+    """Keeps a process under a resident memory budget by trimming the registered caches.
+
+    Each cache registers a function returning the objects it holds (for size estimates) and
+    optionally one that empties or shrinks it. check() runs every check_interval requests.
+    """
+
+    def __init__(self, budget_mb=0, check_interval=100):
+        self.budget = budget_mb * 1024 * 1024
+        self.check_interval = check_interval
+        self.trims = 0
+        self._caches = {}  # name -> (contents, shrink)
+        self._requests = 0
+        self._lock = threading.Lock()
+
+    def register(self, name, contents, shrink=None):
+        self._caches[name] = (contents, shrink)
+
+    def tick(self):
+        """Count a request; run the budget check every check_interval of them"""
+        if not self.budget:
+            return
+        with self._lock:
+            self._requests += 1
+            if self._requests < self.check_interval:
+                return
+            self._requests = 0
+        self.check()
+
+    def check(self):
+        """Trim the caches if the process is over budget; returns True when it trimmed"""
+        rss = current_rss()
+        if not self.budget or rss is None or rss <= self.budget:
+            return False
+
+        for name, (_, shrink) in self._caches.items():
+            if shrink is None:
+                continue
+            try:
+                shrink()
+            except Exception as e:
+                logger.error("Error trimming cache %s: %s", name, e)
+        gc.collect()
+        self.trims += 1
+        after = current_rss()
+        logger.warning("Memory %.0f MB over the %.0f MB budget: trimmed caches, now %.0f MB",
+                       rss / 1048576, self.budget / 1048576, (after or 0) / 1048576)
+        return True
+
+    def cache_sizes(self):
+        """Estimated bytes held by each registered cache"""
+        sizes = {}
+        for name, (contents, _) in self._caches.items():
+            try:
+                size, complete = deep_sizeof(contents())
+            except Exception as e:
+                sizes[name] = {'error': str(e)}
+                continue
+            sizes[name] = {'bytes': size, 'complete': complete}
+        return sizes
+
+    def stats(self, top=20):
+        """RSS, budget, GC state, cache sizes and (when tracing) the top tracemalloc allocators"""
+        rss = current_rss()
+        result = {
+            'rss_bytes': rss,
+            'budget_bytes': self.budget or None,
+            'trims': self.trims,
+            'gc': {
+                'threshold': gc.get_threshold(),
+                'counts': gc.get_count(),
+                'frozen': gc.get_freeze_count(),
+            },
+            'caches': self.cache_sizes(),
+            'tracemalloc': None,
+        }
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+            ])
+            traced, peak = tracemalloc.get_traced_memory()
+            result['tracemalloc'] = {
+                'traced_bytes': traced,
+                'peak_bytes': peak,
+                'top': [{'location': str(stat.traceback), 'bytes': stat.size, 'count': stat.count}
+                        for stat in snapshot.statistics('lineno')[:top]],
+            }
+        return result
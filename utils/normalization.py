@@ -0,0 +1,74 @@
+from functools import lru_cache
+
+# Maximum number of (client, product) pairs kept in the key memo
+KEY_CACHE_SIZE = 4096
+
+# Code points covered by the client translation table (Basic Latin through IPA Extensions),
+# which includes every accented character used in Portuguese client names
+_CLIENT_TABLE_LIMIT = 0x250
+
+def _build_client_table():
+    """Map alphanumeric characters to their lowercase form and drop everything else"""
+    table = {}
+    for code_point in range(_CLIENT_TABLE_LIMIT):
+        char = chr(code_point)
+        if not char.isalnum():
+            table[code_point] = None
+        elif char.lower() != char:
+            table[code_point] = char.lower()
+    return table
+
+_CLIENT_TABLE = _build_client_table()
+_CLIENT_TABLE_MAX_CHAR = chr(_CLIENT_TABLE_LIMIT - 1)
+
+# Product codes only drop separators before being lowercased
+_PRODUCT_TABLE = str.maketrans('', '', ' -_')
+
+def normalize_client(client_name):
+    """Lowercase a client name and keep only its alphanumeric characters"""
+    if client_name.isascii() or max(client_name) <= _CLIENT_TABLE_MAX_CHAR:
+        return client_name.translate(_CLIENT_TABLE)
+    # Rare scripts outside the table fall back to the per-character filter
+    return ''.join(c.lower() for c in client_name if c.isalnum())
+
+def normalize_product(product_code):
+    """Lowercase a product code and drop spaces, dashes and underscores"""
+    return product_code.translate(_PRODUCT_TABLE).lower()
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def _cached_key(client_name, product_code):
+    return f"{normalize_client(client_name)}:{normalize_product(product_code)}"
+
+def completion_key(client_name, product_code):
+    """Return the normalized "client:product" key, or None for invalid input"""
+    if not client_name or product_code is None:
+        return None
+    if type(client_name) is not str:
+        client_name = str(client_name)
+    if type(product_code) is not str:
+        product_code = str(product_code)
+    return _cached_key(client_name, product_code)
+
+def keys_for(pairs):
+    """Return completion keys for an iterable of (client_name, product_code) pairs"""
+    cached_key = _cached_key
+    keys = []
+    append = keys.append
+    for client_name, product_code in pairs:
+        if not client_name or product_code is None:
+            append(None)
+            continue
+        if type(client_name) is not str:
+            client_name = str(client_name)
+        if type(product_code) is not str:
+            product_code = str(product_code)
+        append(cached_key(client_name, product_code))
+    return keys
+
+def cache_info():
+    """Return hit/miss statistics for the key memo"""
+    return _cached_key.cache_info()
+
+def clear_cache():
+    """Empty the key memo"""
+    _cached_key.cache_clear()
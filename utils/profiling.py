@@ -0,0 +1,358 @@
+import bisect
+import contextvars
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import ContextDecorator
+from datetime import datetime
+
+from utils import json_backend
+from utils.file_writer import atomic_write_text
+
+logger = logging.getLogger('profiling')
+
+DEFAULT_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Timings of the request running in the current context (None outside a profiled request)
+_current = contextvars.ContextVar('profiling_request', default=None)
+
+class RequestTimings:
+    """Time spent by one request in each phase ('db', 'render'); the rest is processing"""
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.route = None
+        self.thread_id = threading.get_ident()
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.stacks = {}  # Collapsed stack -> samples (filled by the stack sampler)
+        self._phase = None
+        self._phase_started = 0
+        self._depth = 0
+
+    def start(self, phase):
+        # Nested phases (a query inside a render) are charged to the outermost one
+        if self._depth == 0:
+            self._phase = phase
+            self._phase_started = time.perf_counter()
+        self._depth += 1
+
+    def stop(self, phase):
+        if self._depth == 0:
+            return
+        self._depth -= 1
+        if self._depth == 0:
+            self.phases[self._phase] = self.phases.get(self._phase, 0) + time.perf_counter() - self._phase_started
+            self._phase = None
+
+    def breakdown(self, duration):
+        """Return {'db', 'render', 'processing'} in milliseconds"""
+        result = {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()}
+        result.setdefault('db', 0)
+        result.setdefault('render', 0)
+        result['processing'] = round(max(duration - sum(self.phases.values()), 0) * 1000, 1)
+        return result
+
+class timed(ContextDecorator):
+    """Charge the wrapped block (or function) to a phase of the current request.
+
+    No-op outside a profiled request, so it can wrap code that also runs in the scheduler.
+    """
+
+    def __init__(self, phase):
+        self.phase = phase
+
+    def __enter__(self):
+        start_phase(self.phase)
+        return self
+
+    def __exit__(self, *exc):
+        stop_phase(self.phase)
+        return False
+
+def start_phase(phase):
+    """Open a phase on the current request (for hooks that cannot wrap a block, e.g. signals)"""
+    timings = _current.get()
+    if timings is not None:
+        timings.start(phase)
+
+def stop_phase(phase):
+    timings = _current.get()
+    if timings is not None:
+        timings.stop(phase)
+
+def set_route(route):
+    """Tag the current request with its route rule, so stats group '/x/<id>' instead of each path"""
+    timings = _current.get()
+    if timings is not None:
+        timings.route = route
+
+class _RouteStats:
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.phases = {'db': 0.0, 'render': 0.0, 'processing': 0.0}
+
+class ProfilingMiddleware:
+    """WSGI middleware recording per-route latency histograms and in-flight counts.
+
+    Requests slower than slow_threshold seconds are logged and their stacks, sampled every
+    stack_interval once they cross the threshold, saved to profile_dir; a sample_rate
+    fraction of requests is also profiled with cProfile.
+    Each capture is tagged with the route and its DB/render/processing breakdown.
+    """
+
+    def __init__(self, wsgi_app, profile_dir, slow_threshold=2.0, sample_rate=0.0,
+                 stack_interval=0.02, max_files=100, buckets_ms=DEFAULT_BUCKETS_MS):
+        self.wsgi_app = wsgi_app
+        self.profile_dir = profile_dir
+        self.slow_threshold = slow_threshold
+        self.sample_rate = sample_rate
+        self.stack_interval = stack_interval
+        self.max_files = max_files
+        self.buckets = tuple(buckets_ms)
+        self._routes = {}
+        self._in_flight = {}  # id(timings) -> timings
+        self._lock = threading.Lock()
+        self._profiler_lock = threading.Lock()  # Only one cProfile session at a time
+        self._sampler = None
+        self._wakeup = threading.Event()
+        self._captures = []
+
+    def __call__(self, environ, start_response):
+        timings = RequestTimings(environ.get('REQUEST_METHOD', 'GET'), environ.get('PATH_INFO', '/'))
+        _current.set(timings)
+        status = {}
+
+        profiler = None
+        if self.sample_rate and random.random() < self.sample_rate and self._profiler_lock.acquire(blocking=False):
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        with self._lock:
+            self._in_flight[id(timings)] = timings
+        if self.slow_threshold:
+            self._start_sampler()
+
+        def recording_start_response(status_line, headers, exc_info=None):
+            status['code'] = int(status_line.split(' ', 1)[0])
+            return start_response(status_line, headers, exc_info)
+
+        try:
+            body = self.wsgi_app(environ, recording_start_response)
+        except BaseException:
+            status.setdefault('code', 500)
+            self._finish(timings, status, profiler)
+            raise
+        # Files go back to the server untouched, so it can still send them with sendfile
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if isinstance(file_wrapper, type) and isinstance(body, file_wrapper):
+            self._finish(timings, status, profiler)
+            return body
+        # Streamed bodies are timed until the server closes them
+        return _ClosingIterator(body, lambda: self._finish(timings, status, profiler))
+
+    def _finish(self, timings, status, profiler):
+        duration = time.perf_counter() - timings.started
+        if profiler is not None:
+            profiler.disable()
+            self._profiler_lock.release()
+        _current.set(None)
+
+        with self._lock:
+            self._in_flight.pop(id(timings), None)
+        try:
+            self._record(timings, status.get('code', 500), duration)
+            slow = self.slow_threshold and duration >= self.slow_threshold
+            if slow:
+                breakdown = timings.breakdown(duration)
+                logger.warning("Slow request %s %s took %.0f ms (db %.0f, render %.0f, processing %.0f)",
+                               timings.method, timings.path, duration * 1000,
+                               breakdown['db'], breakdown['render'], breakdown['processing'])
+            if slow or profiler is not None:
+                self._save_capture(timings, status.get('code', 500), duration, profiler)
+        except Exception as e:
+            logger.error("Error recording request profile: %s", e)
+
+    def _route_key(self, timings):
+        return f"{timings.method} {timings.route or '<unmatched>'}"
+
+    def _record(self, timings, status_code, duration):
+        breakdown = timings.breakdown(duration)
+        key = self._route_key(timings)
+        with self._lock:
+            stats = self._routes.get(key)
+            if stats is None:
+                stats = self._routes[key] = _RouteStats(self.buckets)
+            stats.counts[bisect.bisect_left(self.buckets, duration * 1000)] += 1
+            stats.count += 1
+            stats.total += duration
+            stats.max = max(stats.max, duration)
+            if status_code >= 500:
+                stats.errors += 1
+            for phase in stats.phases:
+                stats.phases[phase] += breakdown.get(phase, 0)
+
+    # Stack sampling
+
+    def _start_sampler(self):
+        self._wakeup.set()
+        if self._sampler is None:
+            with self._lock:
+                if self._sampler is None:
+                    self._sampler = threading.Thread(target=self._sample_loop, name='request-sampler', daemon=True)
+                    self._sampler.start()
+
+    def _sample_loop(self):
+        own_thread = threading.get_ident()
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                requests = list(self._in_flight.values())
+                if not requests:
+                    self._wakeup.clear()
+                    continue
+            # Only requests past the slow threshold are sampled: fast ones cost no sampling at all
+            now = time.perf_counter()
+            slow = [timings for timings in requests
+                    if now - timings.started >= self.slow_threshold and timings.thread_id != own_thread]
+            if not slow:
+                oldest = min(timings.started for timings in requests)
+                time.sleep(max(oldest + self.slow_threshold - now, self.stack_interval))
+                continue
+            frames = sys._current_frames()
+            samples = [(timings, frames.get(timings.thread_id)) for timings in slow]
+            del frames
+            stacks = [(timings, _collapse(frame)) for timings, frame in samples if frame is not None]
+            del samples
+            with self._lock:
+                for timings, stack in stacks:
+                    # Finished requests may be saving their capture; leave their stacks alone
+                    if id(timings) in self._in_flight:
+                        timings.stacks[stack] = timings.stacks.get(stack, 0) + 1
+            time.sleep(self.stack_interval)
+
+    # Captures
+
+    def _save_capture(self, timings, status_code, duration, profiler):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        route = timings.route or timings.path
+        name = (f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}_{timings.method}"
+                f"_{re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'}_{duration * 1000:.0f}ms")
+        capture = {
+            'route': route,
+            'method': timings.method,
+            'path': timings.path,
+            'status': status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'breakdown_ms': timings.breakdown(duration),
+            'captured_at': datetime.now().isoformat(),
+            'stack_samples': dict(sorted(timings.stacks.items(), key=lambda item: -item[1])),
+            'stack_interval_ms': self.stack_interval * 1000,
+        }
+        if profiler is not None:
+            # The .prof file opens in pstats/snakeviz; the JSON keeps the top functions readable
+            import io
+            import pstats
+            profiler.dump_stats(os.path.join(self.profile_dir, name + '.prof'))
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(30)
+            capture['cprofile'] = output.getvalue()
+
+        atomic_write_text(os.path.join(self.profile_dir, name + '.json'), json_backend.dumps(capture, pretty=True),
+                          fsync=False)
+        with self._lock:
+            self._captures.append(name)
+            del self._captures[:-20]
+        self._prune()
+
+    def _prune(self):
+        try:
+            names = sorted(entry[:-5] for entry in os.listdir(self.profile_dir) if entry.endswith('.json'))
+        except FileNotFoundError:
+            return
+        for name in names[:max(len(names) - self.max_files, 0)]:
+            for extension in ('.json', '.prof'):
+                try:
+                    os.remove(os.path.join(self.profile_dir, name + extension))
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        """Per-route latency summary (milliseconds), in-flight counts and recent captures"""
+        with self._lock:
+            in_flight = {}
+            for timings in self._in_flight.values():
+                key = self._route_key(timings)
+                in_flight[key] = in_flight.get(key, 0) + 1
+
+            routes = {}
+            for key, stats in sorted(self._routes.items()):
+                labels = [f'<={bound}' for bound in self.buckets] + [f'>{self.buckets[-1]}']
+                routes[key] = {
+                    'count': stats.count,
+                    'errors': stats.errors,
+                    'in_flight': in_flight.get(key, 0),
+                    'mean_ms': round(stats.total / stats.count * 1000, 1),
+                    'max_ms': round(stats.max * 1000, 1),
+                    'p50_ms': self._percentile(stats, 0.50),
+                    'p95_ms': self._percentile(stats, 0.95),
+                    'p99_ms': self._percentile(stats, 0.99),
+                    'mean_breakdown_ms': {phase: round(total / stats.count, 1)
+                                          for phase, total in stats.phases.items()},
+                    'histogram': dict(zip(labels, stats.counts)),
+                }
+            return {
+                'in_flight': len(self._in_flight),
+                'routes': routes,
+                'recent_captures': list(self._captures),
+            }
+
+    def _percentile(self, stats, fraction):
+        """Upper bound of the bucket holding the percentile, capped at the slowest request"""
+        target = fraction * stats.count
+        slowest = round(stats.max * 1000, 1)
+        seen = 0
+        for index, count in enumerate(stats.counts):
+            seen += count
+            if seen >= target and count:
+                return min(self.buckets[index], slowest) if index < len(self.buckets) else slowest
+        return 0
+
+class _ClosingIterator:
+    """Response iterable that calls on_close once the server is done with the body"""
+
+    def __init__(self, body, on_close):
+        self._body = body
+        self._iterator = iter(body)
+        self._on_close = on_close
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._iterator)
+
+    def close(self):
+        try:
+            if hasattr(self._body, 'close'):
+                self._body.close()
+        finally:
+            self._on_close()
+
+def _collapse(frame):
+    """Return a stack as 'file:function;...' from the outermost frame (flamegraph collapsed format)"""
+    names = []
+    while frame is not None:
+        names.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
@@ -0,0 +1,183 @@
+import gzip
+import logging
+import os
+import re
+import threading
+import time
+
+from utils import json_backend
+from utils.file_writer import atomic_write_text
+
+logger = logging.getLogger('report_archive')
+
+# Bump when the bundle layout changes
+ARCHIVE_VERSION = 1
+
+INDEX_PATTERN = re.compile(r'^completed_(\d{4}-\d{2})\.index\.json$')
+
+class ReportArchive:
+    """Monthly bundles of closed report days.
+
+    A bundle (completed_YYYY-MM.<generation>.json.gz) is a concatenation of gzip members, one
+    per day, each holding that day's compact order list. The month index
+    (completed_YYYY-MM.index.json) names the current bundle and maps day -> [offset, length,
+    count], so a single day is read with one seek and one small decompress. Bundles are
+    immutable; re-archiving a month writes a new generation and then switches the index.
+    """
+
+    def __init__(self, archive_dir, compression_level=6):
+        self.archive_dir = archive_dir
+        self.compression_level = compression_level
+        self._indexes = {}  # month_key -> {'stamp', 'bundle', 'days'}
+        self._listing_mtime_ns = None
+        self._lock = threading.Lock()
+
+    def index_path(self, month_key):
+        return os.path.join(self.archive_dir, f'completed_{month_key}.index.json')
+
+    def months(self):
+        """Return the archived month keys (YYYY-MM), oldest first"""
+        try:
+            mtime_ns = os.stat(self.archive_dir).st_mtime_ns
+        except FileNotFoundError:
+            return []
+
+        with self._lock:
+            if mtime_ns != self._listing_mtime_ns:
+                months = []
+                for filename in os.listdir(self.archive_dir):
+                    match = INDEX_PATTERN.match(filename)
+                    if match:
+                        months.append(match.group(1))
+                self._indexes = {month: self._indexes.get(month) for month in months}
+                self._listing_mtime_ns = mtime_ns
+            return sorted(self._indexes)
+
+    def _index(self, month_key):
+        """Return a month's index ({'bundle', 'days': {day: [offset, length, count]}}), reloaded if it changed"""
+        path = self.index_path(month_key)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return {'bundle': None, 'days': {}}
+        stamp = (stat.st_mtime_ns, stat.st_ino)
+
+        with self._lock:
+            cached = self._indexes.get(month_key)
+            if cached and cached['stamp'] == stamp:
+                return cached
+        try:
+            with open(path, 'rb') as f:
+                data = json_backend.loads(f.read())
+        except Exception as e:
+            logger.error("Error reading archive index %s: %s", path, e)
+            return {'bundle': None, 'days': {}}
+        if data.get('version') != ARCHIVE_VERSION:
+            return {'bundle': None, 'days': {}}
+        index = {'stamp': stamp, 'bundle': data.get('bundle'), 'days': data.get('days', {})}
+        with self._lock:
+            self._indexes[month_key] = index
+        return index
+
+    def _bundle_path(self, index):
+        return os.path.join(self.archive_dir, index['bundle'])
+
+    def dates(self):
+        """Return every archived date key"""
+        dates = []
+        for month_key in self.months():
+            dates.extend(self._index(month_key)['days'])
+        return dates
+
+    def has_day(self, date_key):
+        return date_key in self._index(date_key[:7])['days']
+
+    def count(self, date_key):
+        """Return the number of orders archived for a day, or None if it is not archived"""
+        entry = self._index(date_key[:7])['days'].get(date_key)
+        return entry[2] if entry else None
+
+    def read_day(self, date_key):
+        """Return the orders archived for a day, or None if it is not archived"""
+        month_key = date_key[:7]
+        index = self._index(month_key)
+        entry = index['days'].get(date_key)
+        if not entry:
+            return None
+        offset, length, _ = entry
+        try:
+            with open(self._bundle_path(index), 'rb') as f:
+                f.seek(offset)
+                member = f.read(length)
+        except FileNotFoundError:
+            # The month was re-archived since the index was cached; reload it once
+            with self._lock:
+                self._indexes.pop(month_key, None)
+            return self.read_day(date_key) if self._index(month_key)['bundle'] != index['bundle'] else None
+        return json_backend.loads(gzip.decompress(member))
+
+    def write_month(self, month_key, days):
+        """Write a month's bundle from {date_key: orders}, keeping days already archived.
+
+        New data for a day replaces the archived copy. The bundle is written before its index,
+        both through temp files, so readers always see a consistent pair.
+        """
+        merged = {}
+        existing = self._index(month_key)
+        if existing['days']:
+            with open(self._bundle_path(existing), 'rb') as f:
+                for date_key, (offset, length, count) in existing['days'].items():
+                    if date_key not in days:
+                        f.seek(offset)
+                        merged[date_key] = (f.read(length), count)
+
+        for date_key, orders in days.items():
+            member = gzip.compress(json_backend.dumps_bytes(orders), compresslevel=self.compression_level)
+            merged[date_key] = (member, len(orders))
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        bundle_name = f'completed_{month_key}.{time.time_ns():x}.json.gz'
+        bundle_path = os.path.join(self.archive_dir, bundle_name)
+        temp_path = f"{bundle_path}.{os.getpid()}.tmp"
+        index = {}
+        offset = 0
+        try:
+            with open(temp_path, 'wb') as f:
+                for date_key in sorted(merged):
+                    member, count = merged[date_key]
+                    f.write(member)
+                    index[date_key] = [offset, len(member), count]
+                    offset += len(member)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, bundle_path)
+        except Exception:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+        atomic_write_text(self.index_path(month_key),
+                          json_backend.dumps({'version': ARCHIVE_VERSION, 'bundle': bundle_name, 'days': index}))
+        if existing['bundle'] and existing['bundle'] != bundle_name:
+            self._remove_file(self._bundle_path(existing))
+        logger.info("Archived %s days into %s (%s bytes)", len(days), os.path.basename(bundle_path), offset)
+        return index
+
+    def remove_month(self, month_key):
+        """Delete a month's bundle and index (retention)"""
+        index = self._index(month_key)
+        self._remove_file(self.index_path(month_key))
+        if index['bundle']:
+            self._remove_file(self._bundle_path(index))
+        with self._lock:
+            self._indexes.pop(month_key, None)
+        logger.info("Removed archived month %s", month_key)
+
+    @staticmethod
+    def _remove_file(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
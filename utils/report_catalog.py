@@ -0,0 +1,201 @@
+import bisect
+import logging
+import os
+import re
+import threading
+from datetime import date
+
+from utils import json_backend
+from utils.completion_index import day_signature
+from utils.file_writer import ProcessFileLock, atomic_write_text
+
+logger = logging.getLogger('report_catalog')
+
+REPORT_FILE_PATTERN = re.compile(r'^completed_(\d{4}-\d{2}-\d{2})\.json$')
+
+# Append-only log of the report dates added through record(), next to the day files
+GENERATION_FILE = 'report_dates.log'
+
+class ReportCatalog:
+    """Sorted catalog of report dates with per-day order counts.
+
+    The directory is only rescanned when the catalog generation changes: record() appends
+    each new report date to generation_path, so every process sharing the directory sees it.
+    (The directory mtime cannot be used: snapshots, digests and the catalog itself are
+    rewritten there all the time.) Without a generation_path the directory mtime is used.
+    Counts are computed lazily (only for the dates a query returns) and persisted together
+    with each day's file signature. Days rolled into the report archive are listed too.
+    """
+
+    def __init__(self, directory, path_for, count_for, cache_path=None, archive=None, generation_path=None):
+        """Initialize the catalog.
+
+        path_for(date_key) returns a day's file path and count_for(date_key) counts its orders.
+        Day files copied in by hand are picked up on the next start (or refresh(force=True)).
+        """
+        self.directory = directory
+        self.path_for = path_for
+        self.count_for = count_for
+        self.cache_path = cache_path
+        self.archive = archive
+        self.generation_path = generation_path
+        self._dates = []  # Sorted ISO date strings
+        self._counts = {}  # date_key -> {'count', 'signature'}
+        self._dir_stamp = None
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'rb') as f:
+                self._counts = json_backend.loads(f.read()).get('counts', {})
+        except Exception as e:
+            logger.error("Error loading report catalog: %s", e)
+
+    def save(self):
+        """Persist known counts if they changed"""
+        if not self.cache_path:
+            return False
+        with self._lock:
+            if not self._dirty:
+                return False
+            payload = json_backend.dumps({'counts': self._counts})
+            self._dirty = False
+        try:
+            atomic_write_text(self.cache_path, payload)
+            return True
+        except Exception as e:
+            logger.error("Error saving report catalog: %s", e)
+            return False
+
+    def _generation_stamp(self):
+        try:
+            stat = os.stat(self.generation_path)
+            return [stat.st_size, stat.st_mtime_ns]
+        except FileNotFoundError:
+            return [0, 0]
+
+    def _directory_stamp(self):
+        if self.generation_path:
+            stamp = self._generation_stamp()
+        else:
+            stamp = [os.stat(self.directory).st_mtime_ns]
+        if self.archive:
+            try:
+                stamp.append(os.stat(self.archive.archive_dir).st_mtime_ns)
+            except FileNotFoundError:
+                stamp.append(0)
+        return tuple(stamp)
+
+    def refresh(self, force=False):
+        """Rescan the directory if the generation (or the archive's mtime) changed since the last scan"""
+        try:
+            stamp = self._directory_stamp()
+        except FileNotFoundError:
+            return False
+
+        with self._lock:
+            if not force and stamp == self._dir_stamp:
+                return False
+
+            dates = []
+            for filename in os.listdir(self.directory):
+                match = REPORT_FILE_PATTERN.match(filename)
+                if not match:
+                    continue
+                try:
+                    date.fromisoformat(match.group(1))
+                except ValueError:
+                    continue
+                dates.append(match.group(1))
+
+            if self.archive:
+                dates = list(set(dates).union(self.archive.dates()))
+            dates.sort()
+            self._dates = dates
+            for date_key in set(self._counts).difference(dates):
+                del self._counts[date_key]
+                self._dirty = True
+            self._dir_stamp = stamp
+            logger.debug("Rescanned report directory: %s report dates", len(dates))
+            return True
+
+    def record(self, date_key, count=None):
+        """Update a day's entry from the write path (caller holds the day file lock).
+
+        With count=None the day's count is dropped and recounted on next use.
+        """
+        with self._lock:
+            if self._dir_stamp is None:
+                self.refresh()
+            index = bisect.bisect_left(self._dates, date_key)
+            if index == len(self._dates) or self._dates[index] != date_key:
+                self._dates.insert(index, date_key)
+                self._bump_generation(date_key)
+            if count is None:
+                self._counts.pop(date_key, None)
+            else:
+                self._counts[date_key] = {'count': count, 'signature': list(day_signature(self.path_for(date_key)))}
+            self._dirty = True
+
+    def _bump_generation(self, date_key):
+        """Tell the other processes sharing the directory that a report date was added.
+
+        The append and the stamp read-back happen under one lock. Only when the log was still
+        at the stamp of our last scan does the new stamp skip a rescan; a date appended by
+        another process in between keeps the old stamp, so the next query rescans.
+        Without a generation_path the next query always rescans.
+        """
+        if not self.generation_path:
+            return
+        try:
+            with ProcessFileLock(self.generation_path):
+                before = self._generation_stamp()
+                with open(self.generation_path, 'a', encoding='utf-8') as f:
+                    f.write(date_key + '\n')
+                after = self._generation_stamp()
+        except OSError as e:
+            logger.error("Error updating report catalog generation: %s", e)
+            return
+        if self._dir_stamp is not None and list(self._dir_stamp[:2]) == before:
+            self._dir_stamp = (*after, *self._dir_stamp[2:])
+
+    def count(self, date_key):
+        """Return the number of orders for a day, recounting if its files changed"""
+        signature = list(day_signature(self.path_for(date_key)))
+        with self._lock:
+            entry = self._counts.get(date_key)
+            if entry and entry['signature'] == signature:
+                return entry['count']
+        try:
+            count = self.count_for(date_key)
+        except Exception as e:
+            logger.error("Error counting orders for %s: %s", date_key, e)
+            return None
+        with self._lock:
+            self._counts[date_key] = {'count': count, 'signature': signature}
+            self._dirty = True
+        return count
+
+    def query(self, start=None, end=None, offset=0, limit=None, newest_first=True):
+        """Return (date_keys, total) for dates in [start, end], paginated by offset/limit"""
+        self.refresh()
+        with self._lock:
+            low = bisect.bisect_left(self._dates, start) if start else 0
+            high = bisect.bisect_right(self._dates, end) if end else len(self._dates)
+            selected = self._dates[low:high]
+
+        total = len(selected)
+        if newest_first:
+            selected = selected[::-1]
+        page = selected[offset:offset + limit] if limit is not None else selected[offset:]
+        return page, total
+
+    def __contains__(self, date_key):
+        self.refresh()
+        with self._lock:
+            index = bisect.bisect_left(self._dates, date_key)
+            return index < len(self._dates) and self._dates[index] == date_key
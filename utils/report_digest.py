@@ -0,0 +1,162 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+from utils import json_backend
+from utils.completion_index import day_signature, read_tombstones
+from utils.file_writer import atomic_write_text
+from utils.normalization import completion_key
+
+logger = logging.getLogger('report_digest')
+
+# Bump when the digest contents change (e.g. a new key normalization) to discard old caches
+DIGEST_VERSION = 2
+
+def extract_completions(path, default_time):
+    """Parse a day file and return its [key, completed_at] pairs (epoch seconds).
+
+    Orders without a parseable timestamp use default_time and deleted (tombstoned) orders are
+    skipped. Top-level so it can run in a process pool.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read().strip()
+    orders = json_backend.loads(content) if content else []
+    tombstones = read_tombstones(path)
+
+    entries = []
+    for order in orders:
+        if tombstones and order.get('id') in tombstones:
+            continue
+        client_name = order.get('client_name')
+        product_code = order.get('product_code')
+        if not client_name or not product_code:
+            continue
+        key = completion_key(client_name, product_code)
+        if not key:
+            continue
+        try:
+            completed_at = datetime.fromisoformat(order.get('timestamp')).timestamp()
+        except (TypeError, ValueError):
+            completed_at = default_time
+        entries.append([key, completed_at])
+    return entries
+
+class ReportDigestCache:
+    """Caches the completion keys extracted from each day file, keyed by path, mtime and size.
+
+    The signature also covers the day's tombstone log, so deletes invalidate the digest.
+    """
+
+    def __init__(self, cache_path, executor='thread', max_workers=4):
+        """Initialize the cache; executor is 'thread' or 'process' for parsing changed files"""
+        self.cache_path = cache_path
+        self.executor = executor
+        self.max_workers = max_workers
+        self._digests = {}  # path -> {'signature', 'entries'}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'rb') as f:
+                data = json_backend.loads(f.read())
+            if data.get('version') == DIGEST_VERSION:
+                self._digests = data.get('files', {})
+                logger.info("Loaded %s report digests from cache", len(self._digests))
+        except Exception as e:
+            logger.error("Error loading report digest cache: %s", e)
+
+    def save(self):
+        """Persist the digests if any changed since the last save"""
+        with self._lock:
+            if not self._dirty:
+                return False
+            payload = json_backend.dumps({'version': DIGEST_VERSION, 'files': self._digests})
+            self._dirty = False
+        try:
+            atomic_write_text(self.cache_path, payload)
+            return True
+        except Exception as e:
+            logger.error("Error saving report digest cache: %s", e)
+            return False
+
+    def discard(self, paths):
+        """Drop the digests of files that no longer exist (e.g. archived days)"""
+        with self._lock:
+            self._ensure_loaded()
+            for path in paths:
+                if self._digests.pop(path, None) is not None:
+                    self._dirty = True
+
+    def get_many(self, files):
+        """Return {path: entries} for an iterable of (path, default_time) pairs.
+
+        Unchanged files are served from the cache; changed ones are parsed in parallel.
+        Missing files are skipped.
+        """
+        results = {}
+        stale = []
+
+        with self._lock:
+            self._ensure_loaded()
+            for path, default_time in files:
+                if not os.path.exists(path):
+                    continue
+                signature = list(day_signature(path))
+                digest = self._digests.get(path)
+                if digest and digest['signature'] == signature:
+                    results[path] = digest['entries']
+                else:
+                    stale.append((path, default_time, signature))
+
+        if not stale:
+            return results
+
+        for (path, _, signature), entries in zip(stale, self._parse(stale)):
+            if entries is None:
+                continue
+            results[path] = entries
+            with self._lock:
+                self._digests[path] = {'signature': signature, 'entries': entries}
+                self._dirty = True
+
+        logger.debug("Parsed %s changed report files, %s served from digest cache", len(stale), len(results) - len(stale))
+        return results
+
+    def _parse(self, stale):
+        """Parse stale files, in a pool when there is more than one"""
+        if len(stale) == 1 or self.max_workers <= 1:
+            return [self._parse_one(path, default_time) for path, default_time, _ in stale]
+
+        workers = min(self.max_workers, len(stale))
+        if self.executor == 'process':
+            # Spawn, never fork: a forked copy of a multithreaded worker can inherit held locks
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers)
+        with pool:
+            futures = [pool.submit(extract_completions, path, default_time) for path, default_time, _ in stale]
+            results = []
+            for (path, _, _), future in zip(stale, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logger.error("Error parsing report file %s: %s", path, e)
+                    results.append(None)
+            return results
+
+    def _parse_one(self, path, default_time):
+        try:
+            return extract_completions(path, default_time)
+        except Exception as e:
+            logger.error("Error parsing report file %s: %s", path, e)
+            return None
@@ -0,0 +1,104 @@
+import logging
+import threading
+from collections import OrderedDict
+
+from utils.completion_index import day_signature
+
+logger = logging.getLogger('report_orders')
+
+SORT_FIELDS = ('timestamp', 'product_name', 'product_code', 'client_name', 'completed_by')
+
+# Fields matched by the free-text search
+SEARCH_FIELDS = ('product_name', 'product_code', 'client_name', 'completed_by')
+
+def _text(value):
+    return str(value).lower() if value is not None else ''
+
+def filter_orders(orders, employee=None, product=None, client=None, query=None):
+    """Return the orders matching every given filter.
+
+    employee is an exact match on completed_by; product, client and query are case-insensitive
+    substring matches (product on code or name, query on any visible field).
+    """
+    product = _text(product) if product else None
+    client = _text(client) if client else None
+    query = _text(query) if query else None
+
+    matched = []
+    for order in orders:
+        if employee and (order.get('completed_by') or 'Desconhecido') != employee:
+            continue
+        if product and product not in _text(order.get('product_code')) and product not in _text(order.get('product_name')):
+            continue
+        if client and client not in _text(order.get('client_name')):
+            continue
+        if query and not any(query in _text(order.get(field)) for field in SEARCH_FIELDS):
+            continue
+        matched.append(order)
+    return matched
+
+def sort_orders(orders, sort=None, descending=False):
+    """Return orders sorted by one of SORT_FIELDS (file order when sort is None)"""
+    if sort is None:
+        return list(reversed(orders)) if descending else orders
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"Unknown sort field: {sort}")
+    return sorted(orders, key=lambda order: _text(order.get(sort)), reverse=descending)
+
+class DayOrdersCache:
+    """Small LRU of parsed day files and their filtered/sorted views, validated by the day signature.
+
+    Paging through a day issues many small requests for the same view; this keeps them from
+    re-reading the file and re-sorting the orders.
+    """
+
+    def __init__(self, path_for, load_orders, max_days=3, max_views=8):
+        """path_for(date_key) returns a day's file path and load_orders(date_key) its live orders"""
+        self.path_for = path_for
+        self.load_orders = load_orders
+        self.max_days = max_days
+        self.max_views = max_views
+        self._days = OrderedDict()  # date_key -> {'signature', 'orders', 'views': OrderedDict}
+        self._lock = threading.Lock()
+
+    def _day(self, date_key):
+        signature = day_signature(self.path_for(date_key))
+        with self._lock:
+            day = self._days.get(date_key)
+            if day and day['signature'] == signature:
+                self._days.move_to_end(date_key)
+                return day
+
+        day = {'signature': signature, 'orders': self.load_orders(date_key), 'views': OrderedDict()}
+        with self._lock:
+            self._days[date_key] = day
+            self._days.move_to_end(date_key)
+            while len(self._days) > self.max_days:
+                self._days.popitem(last=False)
+        return day
+
+    def clear(self):
+        """Forget every parsed day (they are read again on next use)"""
+        with self._lock:
+            self._days.clear()
+
+    def get(self, date_key):
+        """Return a day's live orders (treat as read-only)"""
+        return self._day(date_key)['orders']
+
+    def query(self, date_key, employee=None, product=None, client=None, query=None, sort=None, descending=False):
+        """Return a day's orders filtered and sorted (treat as read-only)"""
+        day = self._day(date_key)
+        view_key = (employee, product, client, query, sort, descending)
+        with self._lock:
+            view = day['views'].get(view_key)
+            if view is not None:
+                day['views'].move_to_end(view_key)
+                return view
+
+        view = sort_orders(filter_orders(day['orders'], employee, product, client, query), sort, descending)
+        with self._lock:
+            day['views'][view_key] = view
+            while len(day['views']) > self.max_views:
+                day['views'].popitem(last=False)
+        return view
@@ -0,0 +1,38 @@
+import os
+
+from utils import json_backend
+from utils.completion_index import read_tombstones
+
+def day_file_path(directory, date_key):
+    """Return the path of the completion file for a YYYY-MM-DD date"""
+    return os.path.join(directory, f'completed_{date_key}.json')
+
+def read_day_file(file_path):
+    """Read the live orders of a day file; raises on unreadable or invalid files"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read().strip()
+    if not content:  # Empty file
+        return []
+    orders = json_backend.loads(content)
+    tombstones = read_tombstones(file_path)
+    if tombstones:
+        orders = [order for order in orders if order.get('id') not in tombstones]
+    return orders
+
+def load_day(directory, date_key, archive=None):
+    """Return a day's live orders from its file, or from the archive once it was rolled up.
+
+    Raises on unreadable files; a day with no data returns [].
+    """
+    file_path = day_file_path(directory, date_key)
+    if os.path.exists(file_path):
+        return read_day_file(file_path)
+    if archive is not None:
+        return archive.read_day(date_key) or []
+    return []
+
+def count_day(directory, date_key, archive=None):
+    """Count a day's live orders (archived days are counted from the bundle index)"""
+    if not os.path.exists(day_file_path(directory, date_key)) and archive is not None:
+        return archive.count(date_key) or 0
+    return len(load_day(directory, date_key, archive))
@@ -0,0 +1,237 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from utils import json_backend
+from utils.completion_index import day_signature
+from utils.file_writer import atomic_write_text
+
+logger = logging.getLogger('report_summary')
+
+# Bump when the summary contents change to discard old sidecar files
+SUMMARY_VERSION = 1
+
+# group_by name -> order field
+GROUP_FIELDS = {
+    'employee': 'completed_by',
+    'product': 'product_code',
+    'client': 'client_name',
+}
+
+def empty_summary():
+    """Return the summary of a day without orders"""
+    summary = {group: {} for group in GROUP_FIELDS}
+    summary.update({'total': 0, 'hour': {}, 'product_names': {}, 'first': None, 'last': None})
+    return summary
+
+def copy_summary(summary):
+    """Return a copy that can be updated without touching the original"""
+    copied = dict(summary)
+    for field in (*GROUP_FIELDS, 'hour', 'product_names'):
+        copied[field] = dict(summary[field])
+    return copied
+
+def _hour_of(timestamp):
+    try:
+        return datetime.fromisoformat(timestamp).strftime('%H')
+    except (TypeError, ValueError):
+        return None
+
+def add_orders(summary, orders):
+    """Count orders into a summary in place"""
+    for order in orders:
+        summary['total'] += 1
+        for group, field in GROUP_FIELDS.items():
+            value = order.get(field) or 'Desconhecido'
+            summary[group][value] = summary[group].get(value, 0) + 1
+
+        product_code = order.get('product_code')
+        if product_code and product_code not in summary['product_names']:
+            summary['product_names'][product_code] = order.get('product_name', '')
+
+        timestamp = order.get('timestamp')
+        hour = _hour_of(timestamp)
+        if hour is not None:
+            summary['hour'][hour] = summary['hour'].get(hour, 0) + 1
+            if summary['first'] is None or timestamp < summary['first']:
+                summary['first'] = timestamp
+            if summary['last'] is None or timestamp > summary['last']:
+                summary['last'] = timestamp
+    return summary
+
+def remove_order(summary, order):
+    """Uncount one order in place; returns False if the summary must be rebuilt instead.
+
+    That happens when the order was the day's first or last completion.
+    """
+    timestamp = order.get('timestamp')
+    if timestamp is not None and timestamp in (summary['first'], summary['last']):
+        return False
+
+    summary['total'] -= 1
+    for group, field in GROUP_FIELDS.items():
+        _decrement(summary[group], order.get(field) or 'Desconhecido')
+    hour = _hour_of(timestamp)
+    if hour is not None:
+        _decrement(summary['hour'], hour)
+    return True
+
+def _decrement(counts, key):
+    if counts.get(key, 0) <= 1:
+        counts.pop(key, None)
+    else:
+        counts[key] -= 1
+
+def summarize_orders(orders):
+    """Count a day's orders per employee, product, client and hour"""
+    return add_orders(empty_summary(), orders)
+
+class DaySummaryCache:
+    """Per-day summaries kept in memory (LRU) and in sidecar files, validated by the day signature.
+
+    The write path keeps them current through updated()/store(), so pages and range reports
+    read a small summary instead of the day file; closed days only cost a stat.
+    """
+
+    def __init__(self, path_for, load_orders, max_days=400, sidecar_dir=None):
+        """path_for(date_key) returns a day's file path and load_orders(date_key) its live orders"""
+        self.path_for = path_for
+        self.load_orders = load_orders
+        self.max_days = max_days
+        self.sidecar_dir = sidecar_dir
+        self._summaries = OrderedDict()  # date_key -> (signature, summary)
+        self._lock = threading.Lock()
+
+    def _sidecar_path(self, date_key):
+        return os.path.join(self.sidecar_dir, f'{date_key}.json')
+
+    def _read_sidecar(self, date_key, signature):
+        if not self.sidecar_dir:
+            return None
+        try:
+            with open(self._sidecar_path(date_key), 'rb') as f:
+                data = json_backend.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Ignoring unreadable summary for %s: %s", date_key, e)
+            return None
+        if data.get('version') != SUMMARY_VERSION or tuple(data.get('signature', ())) != signature:
+            return None
+        return data['summary']
+
+    def _write_sidecar(self, date_key, signature, summary):
+        if not self.sidecar_dir:
+            return
+        payload = json_backend.dumps({'version': SUMMARY_VERSION, 'signature': list(signature), 'summary': summary})
+        try:
+            # Derived data: no fsync, a torn or stale sidecar fails the signature check and is rebuilt
+            atomic_write_text(self._sidecar_path(date_key), payload, fsync=False)
+        except Exception as e:
+            logger.error("Error writing summary for %s: %s", date_key, e)
+
+    def _remember(self, date_key, signature, summary):
+        with self._lock:
+            self._summaries[date_key] = (signature, summary)
+            self._summaries.move_to_end(date_key)
+            while len(self._summaries) > self.max_days:
+                self._summaries.popitem(last=False)
+
+    def _cached(self, date_key, signature):
+        with self._lock:
+            cached = self._summaries.get(date_key)
+            if cached and cached[0] == signature:
+                self._summaries.move_to_end(date_key)
+                return cached[1]
+        summary = self._read_sidecar(date_key, signature)
+        if summary is not None:
+            self._remember(date_key, signature, summary)
+        return summary
+
+    def get(self, date_key):
+        """Return the summary for a day, rebuilding it if the day's files changed"""
+        path = self.path_for(date_key)
+        signature = day_signature(path)
+        summary = self._cached(date_key, signature)
+        if summary is None:
+            orders = self.load_orders(date_key)
+            if not orders and not os.path.exists(path):
+                # No report for that day: keep no sidecar, or any date asked for would leave one
+                return empty_summary()
+            summary = summarize_orders(orders)
+            self._remember(date_key, signature, summary)
+            self._write_sidecar(date_key, signature, summary)
+        return summary
+
+    def updated(self, date_key, previous_signature, added=(), removed=()):
+        """Return a copy of the day's summary with orders added/removed, or None.
+
+        None means there was no summary matching previous_signature (the files before the
+        write) or a removal needs a rebuild. Caller holds the day file lock.
+        """
+        summary = self._cached(date_key, previous_signature)
+        if summary is None:
+            return None
+        summary = add_orders(copy_summary(summary), added)
+        for order in removed:
+            if not remove_order(summary, order):
+                return None
+        return summary
+
+    def store(self, date_key, summary):
+        """Save a day's summary after a write (caller holds the day file lock)"""
+        signature = day_signature(self.path_for(date_key))
+        self._remember(date_key, signature, summary)
+        self._write_sidecar(date_key, signature, summary)
+
+    def invalidate(self, date_key):
+        """Forget a day's summary so it is rebuilt on next use"""
+        with self._lock:
+            self._summaries.pop(date_key, None)
+
+    def clear(self):
+        """Forget every summary held in memory (sidecars stay, so days reload cheaply)"""
+        with self._lock:
+            self._summaries.clear()
+
+    def discard(self, date_key):
+        """Forget a day's summary and delete its sidecar (the day itself is gone)"""
+        self.invalidate(date_key)
+        if self.sidecar_dir:
+            try:
+                os.remove(self._sidecar_path(date_key))
+            except FileNotFoundError:
+                pass
+
+def aggregate_range(date_keys, group_by, cache):
+    """Fold the summaries of several days, one day at a time, into range totals.
+
+    Returns {'total', 'days': [{'date', 'total'}], 'groups': [{'key', 'count'}]} with groups
+    sorted by count (products also carry their name).
+    """
+    if group_by not in GROUP_FIELDS:
+        raise ValueError(f"Unknown group_by: {group_by}")
+
+    totals = {}
+    product_names = {}
+    days = []
+    total = 0
+    for date_key in date_keys:
+        summary = cache.get(date_key)
+        for key, count in summary[group_by].items():
+            totals[key] = totals.get(key, 0) + count
+        if group_by == 'product':
+            for code, name in summary['product_names'].items():
+                product_names.setdefault(code, name)
+        total += summary['total']
+        days.append({'date': date_key, 'total': summary['total']})
+
+    groups = []
+    for key, count in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+        group = {'key': key, 'count': count}
+        if group_by == 'product':
+            group['product_name'] = product_names.get(key, '')
+        groups.append(group)
+    return {'total': total, 'days': days, 'groups': groups}
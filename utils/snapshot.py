@@ -0,0 +1,157 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from utils import json_backend
+from utils.file_writer import atomic_write_text
+
+logger = logging.getLogger('snapshot')
+
+# Bump when the snapshot layout changes
+SNAPSHOT_FORMAT = 1
+
+# Bump when the last-good snapshot layout changes; files in another format are ignored
+LAST_GOOD_FORMAT = 1
+
+def content_version(content):
+    """Short digest identifying a snapshot's contents"""
+    return hashlib.blake2b(json_backend.dumps_bytes(content), digest_size=8).hexdigest()
+
+class SnapshotPublisher:
+    """Publishes the pending-orders cache to a file that read-only servers serve from.
+
+    The snapshot version is a digest of its contents (without the update time), so readers
+    waiting on a version only wake up when the data actually changed. Unchanged data is
+    rewritten at most every min_interval seconds, to keep its update time fresh.
+    """
+
+    def __init__(self, path, min_interval=30):
+        self.path = path
+        self.min_interval = min_interval
+        self.version = None
+        self._published_at = 0
+        self._lock = threading.Lock()
+
+    def publish(self, pending, stats, last_update, is_cache, connection_status):
+        """Write the snapshot if its contents changed; returns the version of the contents"""
+        content = {
+            'orders': pending,
+            'stats': stats,
+            'is_cache': is_cache,
+            'connection_status': connection_status,
+        }
+        version = content_version(content)
+
+        with self._lock:
+            now = time.time()
+            if version == self.version and now - self._published_at < self.min_interval:
+                return version
+            snapshot = dict(content, format=SNAPSHOT_FORMAT, version=version, last_update=last_update,
+                            published_at=now)
+            try:
+                # A cache, not a record: skip fsync, the rename alone keeps readers consistent
+                atomic_write_text(self.path, json_backend.dumps(snapshot), fsync=False)
+                self.version = version
+                self._published_at = now
+                logger.debug("Published snapshot %s", version)
+            except Exception as e:
+                logger.error("Error publishing snapshot: %s", e)
+            return version
+
+class SnapshotReader:
+    """Reads the published snapshot, reloading it only when the file changes"""
+
+    def __init__(self, path):
+        self.path = path
+        self.snapshot = None
+        self._stamp = None
+
+    def refresh(self):
+        """Reload the snapshot if the file changed; returns True when it was reloaded"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        stamp = (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+        if stamp == self._stamp:
+            return False
+
+        try:
+            with open(self.path, 'rb') as f:
+                snapshot = json_backend.loads(f.read())
+        except Exception as e:
+            logger.error("Error reading snapshot: %s", e)
+            return False
+        if snapshot.get('format') != SNAPSHOT_FORMAT:
+            logger.warning("Ignoring snapshot with unknown format %s", snapshot.get('format'))
+            return False
+
+        self._stamp = stamp
+        self.snapshot = snapshot
+        return True
+
+def _compact_order(order):
+    # 'clientes' and the 'cliente' summary are rebuilt from 'clientes_detalhes' on load
+    return {field: value for field, value in order.items() if field not in ('clientes', 'cliente')}
+
+def _expand_order(order):
+    clients = [detail['nome'] for detail in order['clientes_detalhes']]
+    return dict(order, clientes=clients, cliente=f"{len(clients)} cliente(s): {', '.join(clients)}")
+
+class LastGoodSnapshot:
+    """Last pending orders read from the ERP, kept on disk for warm starts and outages"""
+
+    def __init__(self, path):
+        self.path = path
+        self.version = None
+        self._lock = threading.Lock()
+
+    def save(self, orders, stats, last_update):
+        """Persist a successful ERP read if it differs from the saved one; returns its version"""
+        compact_orders = [_compact_order(order) for order in orders]
+        version = content_version({'orders': compact_orders, 'stats': stats})
+
+        with self._lock:
+            if version == self.version:
+                return version
+            snapshot = {
+                'format': LAST_GOOD_FORMAT,
+                'version': version,
+                'last_update': last_update,
+                'saved_at': time.time(),
+                'stats': stats,
+                'orders': compact_orders,
+            }
+            try:
+                # fsync: after a power cut this file is all the kiosks have until the ERP answers
+                atomic_write_text(self.path, json_backend.dumps(snapshot))
+                self.version = version
+                logger.debug("Saved last good snapshot %s", version)
+            except Exception as e:
+                logger.error("Error saving last good snapshot: %s", e)
+            return self.version
+
+    def load(self):
+        """Return {'orders', 'stats', 'last_update', 'version'} from disk, or None"""
+        try:
+            with open(self.path, 'rb') as f:
+                snapshot = json_backend.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error("Error reading last good snapshot: %s", e)
+            return None
+        if snapshot.get('format') != LAST_GOOD_FORMAT:
+            logger.warning("Ignoring last good snapshot with unknown format %s", snapshot.get('format'))
+            return None
+
+        with self._lock:
+            self.version = snapshot['version']
+        return {
+            'orders': [_expand_order(order) for order in snapshot['orders']],
+            'stats': snapshot['stats'],
+            'last_update': snapshot['last_update'],
+            'version': snapshot['version'],
+        }